@@ -0,0 +1,200 @@
+"""
+Read-only JSON API over the dashboard's data layer.
+
+    GET /api/v1/kpis?schedule_id=...&hours_before_departure=...[&date_of_journey=...&operator_id=...&seat_type=...]
+    GET /api/v1/monthly-delta?month=...&year=...
+    GET /api/v1/price-summary?date_of_journey=...
+    GET /api/v1/price-comparison?date_of_journey=...&model_operator_id=...&actual_operator_id=...&departure_time=...
+
+Responses carry an ETag derived from the data version (see data_version.py),
+the versions of the dates, month and schedule asked for, and the
+request, and are marked no-cache so clients revalidate. A client polling with
+If-None-Match gets a 304 until new data is loaded, answered from the data
+version kept in memory (the loader's notifications, or file modification times
+when they aren't available) without touching Postgres. Bodies are also kept
+per ETag, so clients without a cached copy share one computation per data
+version. Failed computations answer 503 and are not kept.
+"""
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+
+import flask
+import numpy as np
+import pandas as pd
+
+from data_version import get_data_version, get_scope_version
+from db_utils import DataUnavailable
+
+API_PREFIX = "/api/v1"
+
+# Response bodies kept per ETag, the least recently used are evicted first
+API_CACHE_MAX_ENTRIES = 256
+
+_bodies = OrderedDict()  # ETag -> JSON body
+_bodies_lock = threading.Lock()
+
+
+def require(result):
+    """Pass a data layer result through, raising DataUnavailable if it signalled a failure with None"""
+    if result is None:
+        raise DataUnavailable()
+    return result
+
+
+def to_jsonable(value):
+    """Convert data layer results (DataFrames, NumPy and pandas scalars, NaN) to plain JSON values"""
+    if isinstance(value, pd.DataFrame):
+        return [to_jsonable(record) for record in value.to_dict('records')]
+    if isinstance(value, pd.Series):
+        return to_jsonable(value.tolist())
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set, np.ndarray)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, (datetime, date, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def request_scope(args):
+    """Dates of journey, months and schedules a response depends on"""
+    scope = [args[name] for name in ("schedule_id", "date_of_journey") if args.get(name)]
+    if args.get("month") and args.get("year"):
+        scope.append(f"{int(args['year']):04d}-{int(args['month']):02d}")
+    return scope
+
+
+def make_etag(endpoint, args):
+    """ETag of an endpoint's response for the given arguments at the current data version"""
+    version = [get_data_version(), get_scope_version(request_scope(args))]
+    key = json.dumps([endpoint, sorted(args.items()), version], default=str)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def json_response(body, etag, status=200):
+    """JSON response that clients must revalidate with If-None-Match"""
+    response = flask.Response(body, status=status, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def error_response(message, status=400):
+    """JSON error, not cached"""
+    return flask.Response(json.dumps({"error": message}), status=status, mimetype="application/json")
+
+
+def serve(endpoint, args, compute):
+    """Answer from the client's copy or the body cache when the data version hasn't changed, else compute"""
+    etag = make_etag(endpoint, args)
+    if etag in flask.request.if_none_match:
+        response = flask.Response(status=304)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    with _bodies_lock:
+        body = _bodies.get(etag)
+        if body is not None:
+            _bodies.move_to_end(etag)
+    if body is None:
+        try:
+            result = compute()
+        except DataUnavailable:
+            return error_response("Data unavailable, please retry later", status=503)
+        if result is None:
+            return error_response("No data available for the given parameters", status=404)
+        body = json.dumps(to_jsonable(result))
+        with _bodies_lock:
+            _bodies[etag] = body
+            while len(_bodies) > API_CACHE_MAX_ENTRIES:
+                _bodies.popitem(last=False)
+    return json_response(body, etag)
+
+
+def get_kpis(schedule_id, hours_before_departure, date_of_journey=None, operator_id=None, seat_type=None):
+    """Data behind the KPI row: the average prices and delta, and per seat type prices, occupancy and demand"""
+    from kpis import get_kpi_summary
+    from price_utils import get_prices_by_schedule_and_hour
+    from db_utils import get_occupancy_and_demand_by_seat_type
+
+    summary = get_kpi_summary(schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
+    prices = require(get_prices_by_schedule_and_hour(schedule_id, hours_before_departure))
+    occupancy = require(get_occupancy_and_demand_by_seat_type(schedule_id, hours_before_departure))
+    if summary is None and not prices:
+        return None
+
+    seat_types = {}
+    for st in sorted(set(prices) | set(occupancy)):
+        if seat_type and st != seat_type:
+            continue
+        seat_types[st] = dict(prices.get(st, {}), **occupancy.get(st, {}))
+    return {'summary': summary, 'seat_types': seat_types}
+
+
+def get_price_comparison(date_of_journey, model_operator_id, actual_operator_id, departure_time):
+    """Price comparison of two operators, as in the price comparison page"""
+    from price_comparison import get_price_comparison_data
+    # None only when a fetch failed, no data is an empty comparison
+    return require(get_price_comparison_data(date_of_journey, model_operator_id, actual_operator_id, departure_time))
+
+
+def register_api_routes(app):
+    """Add the JSON API to the Dash app's Flask server"""
+
+    def required_args(names):
+        args = {name: flask.request.args.get(name) for name in names}
+        missing = [name for name, value in args.items() if not value]
+        return args, missing
+
+    @app.server.route(f"{API_PREFIX}/kpis")
+    def api_kpis():
+        args, missing = required_args(["schedule_id", "hours_before_departure"])
+        if missing:
+            return error_response(f"Missing parameters: {', '.join(missing)}")
+        for name in ("date_of_journey", "operator_id", "seat_type"):
+            args[name] = flask.request.args.get(name) or None
+        return serve("kpis", args, lambda: get_kpis(**args))
+
+    @app.server.route(f"{API_PREFIX}/monthly-delta")
+    def api_monthly_delta():
+        from price_utils import get_monthly_delta
+
+        args, missing = required_args(["month", "year"])
+        if missing:
+            return error_response(f"Missing parameters: {', '.join(missing)}")
+        try:
+            month, year = int(args["month"]), int(args["year"])
+        except ValueError:
+            return error_response("month and year must be integers")
+        if not 1 <= month <= 12:
+            return error_response("month must be between 1 and 12")
+        return serve("monthly-delta", args, lambda: get_monthly_delta(month, year))
+
+    @app.server.route(f"{API_PREFIX}/price-summary")
+    def api_price_summary():
+        from db_utils_summary import get_price_summary_by_date
+
+        args, missing = required_args(["date_of_journey"])
+        if missing:
+            return error_response(f"Missing parameters: {', '.join(missing)}")
+        return serve("price-summary", args, lambda: require(get_price_summary_by_date(args["date_of_journey"])))
+
+    @app.server.route(f"{API_PREFIX}/price-comparison")
+    def api_price_comparison():
+        args, missing = required_args(["date_of_journey", "model_operator_id", "actual_operator_id", "departure_time"])
+        if missing:
+            return error_response(f"Missing parameters: {', '.join(missing)}")
+        return serve("price-comparison", args, lambda: get_price_comparison(**args))
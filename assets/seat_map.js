@@ -0,0 +1,74 @@
+/*
+ * Client-side layout of the seat map.
+ *
+ * The server sends one columnar payload per seat map (see seat_map.py):
+ *   {seat_numbers: [], actual: [], model: [], delta: [], seats_per_row: 13, icons: {positive, negative}}
+ * and this function turns it into the seat grid, so the seat icons are fetched
+ * once as static assets instead of being inlined into every seat.
+ */
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    seat_map: {
+        render: function (data) {
+            if (!data || !data.seat_numbers) {
+                return null;
+            }
+
+            function div(props, children) {
+                return {
+                    type: 'Div',
+                    namespace: 'dash_html_components',
+                    props: Object.assign({children: children}, props)
+                };
+            }
+
+            function money(value) {
+                return value === null || value === undefined ? 'N/A' : '$' + value.toFixed(2);
+            }
+
+            // Seat number drawn over the seat icon
+            var numberStyle = {
+                position: 'absolute', top: '36%', left: '46%', transform: 'translate(-50%, -50%)',
+                color: 'white', fontWeight: 'bold', fontSize: '10px', textAlign: 'center',
+                width: '100%', height: '100%', display: 'flex', justifyContent: 'center',
+                alignItems: 'center', margin: '0', padding: '0', pointerEvents: 'none'
+            };
+
+            var rows = [];
+            var seats = [];
+            for (var i = 0; i < data.seat_numbers.length; i++) {
+                var seatNumber = data.seat_numbers[i];
+                var delta = data.delta[i];
+                var positive = delta !== null && delta > 0;
+                var tooltip = 'Seat: ' + seatNumber +
+                    '\nActual Price: ' + money(data.actual[i]) +
+                    '\nModel Price: ' + money(data.model[i]) +
+                    '\nDelta: ' + money(delta === null ? null : Math.abs(delta));
+
+                var seat = div({
+                    className: 'mx-1 my-1',
+                    title: tooltip,
+                    style: {display: 'inline-block', cursor: 'pointer'}
+                }, [
+                    div({style: {position: 'relative'}}, [
+                        {
+                            type: 'Img',
+                            namespace: 'dash_html_components',
+                            props: {
+                                src: positive ? data.icons.positive : data.icons.negative,
+                                style: {width: '45px', height: '45px', position: 'relative'}
+                            }
+                        },
+                        div({style: numberStyle}, String(seatNumber))
+                    ])
+                ]);
+                seats.push(div({className: 'col-auto px-0'}, seat));
+
+                if (seats.length === data.seats_per_row || i === data.seat_numbers.length - 1) {
+                    rows.push(div({className: 'row mb-2 justify-content-center'}, seats));
+                    seats = [];
+                }
+            }
+            return rows;
+        }
+    }
+});
@@ -0,0 +1,277 @@
+"""
+Batch price comparison over a range of dates and any set of operators.
+
+The single comparison looks at one date, one departure time and one pair of
+operators. Here the model operator's model prices are compared with the actual
+fares of any number of competitors on every date of a range, in one set-based
+query. Departures are matched on date, departure time and seat type, using the
+same latest snapshots as the single comparison (price_comparison.LATEST_PRICES_CTE).
+
+Rows are streamed in chunks (db_utils.stream_query) and folded into a
+per-competitor and seat type summary plus a histogram of deltas, so a long
+range never sits in memory in full.
+"""
+from dash import html, dcc, dash_table
+from dash.dependencies import Input, Output, State
+import dash_bootstrap_components as dbc
+import plotly.graph_objects as go
+import numpy as np
+import pandas as pd
+
+from db_utils import stream_query
+from component_cache import memoize_component
+from data_version import dates_between
+from metadata_cache import get_metadata
+from price_comparison import LATEST_PRICES_CTE, get_operator_name_by_id
+from seat_wise_aggregates import NUMERIC_PATTERN
+
+# Rows fetched from the database per chunk
+BATCH_CHUNK_ROWS = 10000
+
+# Bars in the delta distribution chart
+DELTA_HISTOGRAM_BINS = 40
+
+# One row per (date, departure time, seat type, competitor), delta = competitor's actual fare - model price
+BATCH_COMPARISON_QUERY = f"""
+    WITH {LATEST_PRICES_CTE.format(departure_time_filter="")},
+    departures AS (
+        SELECT
+            operator_id,
+            date_of_journey,
+            departure_time,
+            seat_type,
+            AVG(CASE WHEN price::TEXT ~ %(pattern)s THEN price::NUMERIC END) AS model_price,
+            AVG(CASE WHEN actual_fare::TEXT ~ %(pattern)s THEN actual_fare::NUMERIC END) AS actual_price
+        FROM latest_prices
+        WHERE departure_time IS NOT NULL
+        GROUP BY operator_id, date_of_journey, departure_time, seat_type
+    )
+    SELECT
+        model.date_of_journey,
+        model.departure_time,
+        model.seat_type,
+        competitor.operator_id,
+        model.model_price::DOUBLE PRECISION AS model_price,
+        competitor.actual_price::DOUBLE PRECISION AS actual_price,
+        (competitor.actual_price - model.model_price)::DOUBLE PRECISION AS delta
+    FROM departures model
+    JOIN departures competitor ON
+        competitor.date_of_journey = model.date_of_journey AND
+        competitor.departure_time = model.departure_time AND
+        competitor.seat_type = model.seat_type AND
+        competitor.operator_id <> model.operator_id
+    WHERE model.operator_id = %(model_operator_id)s
+        AND model.model_price IS NOT NULL
+        AND competitor.actual_price IS NOT NULL
+"""
+
+SUMMARY_COLUMNS = [
+    'operator_id', 'seat_type', 'comparisons', 'avg_model_price', 'avg_actual_price',
+    'avg_delta', 'min_delta', 'max_delta', 'model_cheaper_pct'
+]
+
+
+def stream_batch_comparison(date_from, date_to, model_operator_id, competitor_ids, chunk_rows=BATCH_CHUNK_ROWS):
+    """Yield the batch comparison rows in DataFrame chunks"""
+    competitor_ids = [str(operator_id) for operator_id in competitor_ids]
+    params = {
+        'date_from': date_from,
+        'date_to': date_to,
+        # Cast operator_id to string to match database column type
+        'operator_ids': [str(model_operator_id)] + competitor_ids,
+        'model_operator_id': str(model_operator_id),
+        'pattern': NUMERIC_PATTERN
+    }
+    dtypes = {'model_price': 'numeric', 'actual_price': 'numeric', 'delta': 'numeric'}
+    yield from stream_query(BATCH_COMPARISON_QUERY, params, fetch_size=chunk_rows, dtypes=dtypes)
+
+
+def summarize_batch_comparison(chunks):
+    """Fold comparison chunks into a summary and the deltas per competitor
+
+    Returns:
+        tuple: (summary DataFrame with SUMMARY_COLUMNS, dict operator_id -> float32 array of deltas)
+    """
+    partials = []
+    deltas = {}
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        chunk = chunk.assign(operator_id=chunk['operator_id'].astype(str), model_cheaper=chunk['delta'] > 0)
+        partials.append(chunk.groupby(['operator_id', 'seat_type'], sort=False).agg(
+            comparisons=('delta', 'size'),
+            model_sum=('model_price', 'sum'),
+            actual_sum=('actual_price', 'sum'),
+            delta_sum=('delta', 'sum'),
+            min_delta=('delta', 'min'),
+            max_delta=('delta', 'max'),
+            model_cheaper=('model_cheaper', 'sum')
+        ))
+        for operator_id, operator_deltas in chunk.groupby('operator_id', sort=False)['delta']:
+            deltas.setdefault(operator_id, []).append(operator_deltas.to_numpy(dtype=np.float32))
+
+    if not partials:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS), {}
+
+    totals = pd.concat(partials).groupby(level=['operator_id', 'seat_type']).agg({
+        'comparisons': 'sum', 'model_sum': 'sum', 'actual_sum': 'sum', 'delta_sum': 'sum',
+        'min_delta': 'min', 'max_delta': 'max', 'model_cheaper': 'sum'
+    })
+    summary = pd.DataFrame({
+        'comparisons': totals['comparisons'],
+        'avg_model_price': totals['model_sum'] / totals['comparisons'],
+        'avg_actual_price': totals['actual_sum'] / totals['comparisons'],
+        'avg_delta': totals['delta_sum'] / totals['comparisons'],
+        'min_delta': totals['min_delta'],
+        'max_delta': totals['max_delta'],
+        'model_cheaper_pct': totals['model_cheaper'] / totals['comparisons'] * 100
+    }).reset_index()[SUMMARY_COLUMNS]
+    return summary, {operator_id: np.concatenate(arrays) for operator_id, arrays in deltas.items()}
+
+
+def get_operator_label(operator_id):
+    """Operator name for display, falling back to the id for operators without a name"""
+    name = get_operator_name_by_id(operator_id)
+    return name if name != "Other" else f"Operator {operator_id}"
+
+
+def create_delta_distribution_chart(deltas):
+    """Histogram of deltas per competitor, binned on shared edges"""
+    values = np.concatenate(list(deltas.values()))
+    edges = np.histogram_bin_edges(values, bins=DELTA_HISTOGRAM_BINS)
+    centers = (edges[:-1] + edges[1:]) / 2
+
+    fig = go.Figure()
+    for operator_id, operator_deltas in deltas.items():
+        counts, _ = np.histogram(operator_deltas, bins=edges)
+        fig.add_trace(go.Bar(x=centers, y=counts, width=np.diff(edges), name=get_operator_label(operator_id), opacity=0.75))
+
+    fig.update_layout(
+        barmode='overlay',
+        paper_bgcolor='#27293d',
+        plot_bgcolor='#27293d',
+        font=dict(family="Poppins, sans-serif", size=12, color="white"),
+        title=dict(text="Distribution of Price Deltas (Actual Fare - Model Price)", font=dict(size=18, color="white")),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, bgcolor="rgba(39, 41, 61, 0.5)"),
+        margin=dict(l=50, r=50, t=80, b=50),
+        height=400,
+        xaxis=dict(title="Delta", color="#eee", gridcolor="rgba(255, 255, 255, 0.1)", zerolinecolor="rgba(255, 255, 255, 0.2)"),
+        yaxis=dict(title="Departures", color="#eee", gridcolor="rgba(255, 255, 255, 0.1)")
+    )
+    return dcc.Graph(figure=fig)
+
+
+@memoize_component("batch_comparison", scope=lambda date_from, date_to, *_: dates_between(date_from, date_to))
+def build_batch_comparison(date_from, date_to, model_operator_id, competitor_ids):
+    """Summary table and delta distribution for a batch comparison
+
+    competitor_ids must be a tuple, so the result can be cached.
+    """
+    summary, deltas = summarize_batch_comparison(
+        stream_batch_comparison(date_from, date_to, model_operator_id, competitor_ids))
+    if summary.empty:
+        return html.Div("No matching departures for the selected dates and operators.", className="mt-3")
+
+    summary['operator'] = summary['operator_id'].map(get_operator_label)
+    return html.Div([
+        html.H5(f"{get_operator_label(model_operator_id)} model prices vs competitors, {date_from} to {date_to}",
+                className="mb-3"),
+        dash_table.DataTable(
+            id='batch-comparison-table',
+            columns=[
+                {"name": "Competitor", "id": "operator"},
+                {"name": "Seat Type", "id": "seat_type"},
+                {"name": "Departures", "id": "comparisons", "type": "numeric"},
+                {"name": "Avg Model Price", "id": "avg_model_price", "type": "numeric", "format": {"specifier": "$.2f"}},
+                {"name": "Avg Actual Fare", "id": "avg_actual_price", "type": "numeric", "format": {"specifier": "$.2f"}},
+                {"name": "Avg Delta", "id": "avg_delta", "type": "numeric", "format": {"specifier": "$.2f"}},
+                {"name": "Min Delta", "id": "min_delta", "type": "numeric", "format": {"specifier": "$.2f"}},
+                {"name": "Max Delta", "id": "max_delta", "type": "numeric", "format": {"specifier": "$.2f"}},
+                {"name": "Model Cheaper (%)", "id": "model_cheaper_pct", "type": "numeric", "format": {"specifier": ".1f"}}
+            ],
+            data=summary.to_dict('records'),
+            sort_action='native',
+            style_table={'overflowX': 'auto'},
+            style_cell={
+                'backgroundColor': '#1e1e2f',
+                'color': 'white',
+                'textAlign': 'left'
+            },
+            style_header={
+                'backgroundColor': '#252538',
+                'fontWeight': 'bold'
+            }
+        ),
+        html.Div(create_delta_distribution_chart(deltas), className="mt-4")
+    ])
+
+
+def create_batch_comparison_layout():
+    """Batch comparison section of the price comparison page"""
+    date_options = [{'label': date, 'value': date} for date in get_metadata('dates_of_journey_with_dt')]
+    operator_options = [{'label': get_operator_label(operator_id), 'value': operator_id}
+                        for operator_id in get_metadata('operators_with_dt')]
+    dropdown_style = {'color': 'black', 'background-color': 'white'}
+
+    return dbc.Card(
+        dbc.CardBody([
+            html.H2("Batch Comparison", className="mb-4 text-center"),
+            dbc.Row([
+                dbc.Col([
+                    html.Label("From Date"),
+                    dcc.Dropdown(id='batch-comparison-date-from', options=date_options,
+                                 value=date_options[0]['value'] if date_options else None,
+                                 clearable=False, className="mb-3", style=dropdown_style, optionHeight=35)
+                ], width=3),
+                dbc.Col([
+                    html.Label("To Date"),
+                    dcc.Dropdown(id='batch-comparison-date-to', options=date_options,
+                                 value=date_options[-1]['value'] if date_options else None,
+                                 clearable=False, className="mb-3", style=dropdown_style, optionHeight=35)
+                ], width=3),
+                dbc.Col([
+                    html.Label("Model Price Operator"),
+                    dcc.Dropdown(id='batch-comparison-model-operator', options=operator_options, value=None,
+                                 clearable=False, className="mb-3", style=dropdown_style, optionHeight=35)
+                ], width=3),
+                dbc.Col([
+                    html.Label("Competitors"),
+                    dcc.Dropdown(id='batch-comparison-competitors', options=operator_options, value=[],
+                                 multi=True, className="mb-3", style=dropdown_style, optionHeight=35)
+                ], width=3)
+            ]),
+            dbc.Button("Compare", id='batch-comparison-button', color="primary", className="mb-3"),
+            dcc.Loading(
+                id="loading-batch-comparison",
+                type="circle",
+                children=html.Div(id='batch-comparison-results', className="mt-4")
+            )
+        ]),
+        className="shadow-sm mb-4 bg-dark text-white"
+    )
+
+
+def register_batch_comparison_callbacks(app):
+    """Register callbacks for the batch comparison section"""
+
+    @app.callback(
+        Output('batch-comparison-results', 'children'),
+        Input('batch-comparison-button', 'n_clicks'),
+        State('batch-comparison-date-from', 'value'),
+        State('batch-comparison-date-to', 'value'),
+        State('batch-comparison-model-operator', 'value'),
+        State('batch-comparison-competitors', 'value'),
+        prevent_initial_call=True
+    )
+    def update_batch_comparison(n_clicks, date_from, date_to, model_operator, competitors):
+        competitors = [operator_id for operator_id in competitors or [] if operator_id != model_operator]
+        if None in [date_from, date_to, model_operator] or not competitors:
+            return html.Div("Please select a date range, a model operator and at least one competitor.", className="mt-3")
+        if str(date_from) > str(date_to):
+            date_from, date_to = date_to, date_from
+
+        try:
+            return build_batch_comparison(date_from, date_to, model_operator, tuple(sorted(competitors)))
+        except Exception as e:
+            print(f"Error running batch comparison: {e}")
+            return html.Div(f"An error occurred: {str(e)}", className="mt-3 text-danger")
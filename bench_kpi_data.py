@@ -0,0 +1,130 @@
+"""
+Micro-benchmark of the KPI kernel in measures.py.
+
+Compares get_kpi_data against the previous implementation (kept below as
+legacy_get_kpi_data) on a synthetic frame with the same TEXT columns that
+get_filtered_data returns:
+    python bench_kpi_data.py --rows 1000000
+"""
+import argparse
+import contextlib
+import io
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from measures import get_kpi_data, kpi_frame, compute_kpis
+
+DEFAULT_ROWS = 1_000_000
+DEFAULT_REPEATS = 5
+
+
+def make_frame(rows, seed=42, missing=0.01):
+    """Frame shaped like get_filtered_data output, numbers stored as text with some blanks"""
+    rng = np.random.default_rng(seed)
+    actual_fare = rng.uniform(500, 3000, rows).round(2)
+    price = (actual_fare * rng.uniform(0.8, 1.2, rows)).round(2)
+    actual_occupancy = rng.uniform(0, 100, rows).round(2)
+    expected_occupancy = rng.uniform(0, 100, rows).round(2)
+
+    def as_text(values):
+        text = values.astype(str).astype(object)
+        text[rng.random(rows) < missing] = ''
+        return text
+
+    start = np.datetime64('2025-01-01T00:00:00')
+    stamps = start + rng.integers(0, 90 * 24 * 3600, rows).astype('timedelta64[s]')
+    return pd.DataFrame({
+        'schedule_id': '1001',
+        'actual_fare': as_text(actual_fare),
+        'price': as_text(price),
+        'actual_occupancy': as_text(actual_occupancy),
+        'expected_occupancy': as_text(expected_occupancy),
+        'TimeAndDateStamp': pd.to_datetime(stamps).strftime('%d-%m-%Y %H:%M:%S'),
+    })
+
+
+def legacy_get_kpi_data(df, model_price_col=None):
+    """get_kpi_data before the rewrite, condensed to the work it did (prints included)"""
+    print(f"DataFrame shape: {df.shape}")
+    print(f"First row: {df.iloc[0].to_dict()}")
+
+    df['actual_fare'] = df['actual_fare'].replace(['', None], '0')
+    df['actual_fare'] = pd.to_numeric(df['actual_fare'], errors='coerce').fillna(0)
+    print(f"actual_fare values (after conversion): {df['actual_fare'].tolist()}")
+
+    df[model_price_col] = df[model_price_col].replace(['', None], '0')
+    df[model_price_col] = pd.to_numeric(df[model_price_col], errors='coerce').fillna(0)
+    print(f"{model_price_col} values (after conversion): {df[model_price_col].tolist()}")
+
+    df['TimeAndDateStamp'] = pd.to_datetime(df['TimeAndDateStamp'], errors='coerce')
+
+    for col in ('actual_occupancy', 'expected_occupancy'):
+        df[col] = df[col].replace(['', None], '0')
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+    df['actual_fare'] = pd.to_numeric(df['actual_fare'], errors='coerce').fillna(0)
+    df[model_price_col] = pd.to_numeric(df[model_price_col], errors='coerce').fillna(0)
+    avg_model_price = float(df[model_price_col].mean())
+    avg_actual_fare = float(df['actual_fare'].mean())
+    avg_delta = avg_actual_fare - avg_model_price
+    avg_delta_pct = (avg_delta / avg_model_price) * 100 if avg_model_price != 0 else 0
+    avg_occupancy = float(df['actual_occupancy'].mean())
+    avg_expected_occupancy = float(df['expected_occupancy'].mean())
+    return {
+        'avg_actual_fare': round(avg_actual_fare, 2),
+        'avg_model_price': round(avg_model_price, 2),
+        'avg_delta': round(avg_delta, 2),
+        'avg_delta_pct': round(avg_delta_pct, 2),
+        'avg_occupancy': round(avg_occupancy, 2),
+        'avg_expected_occupancy': round(avg_expected_occupancy, 2)
+    }
+
+
+def time_it(func, repeats):
+    """Median and minimum wall time of func() over the repeats, in seconds"""
+    timings = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the KPI kernel against the previous implementation")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"Building a {args.rows:,}-row frame...")
+    df = make_frame(args.rows, args.seed)
+    values = kpi_frame(df, 'price')
+    values32 = kpi_frame(df, 'price', np.float32)
+
+    benchmarks = {
+        # The legacy version mutates its input, so it gets a fresh copy each run (the copy is timed too)
+        "legacy get_kpi_data": lambda: legacy_get_kpi_data(df.copy(), 'price'),
+        "get_kpi_data": lambda: get_kpi_data(df, 'price'),
+        "kpi_frame (float64)": lambda: kpi_frame(df, 'price'),
+        "compute_kpis (float64)": lambda: compute_kpis(values),
+        "compute_kpis (float32)": lambda: compute_kpis(values32),
+    }
+
+    results = {}
+    print(f"{'benchmark':<26} {'median':>10} {'min':>10}")
+    for name, func in benchmarks.items():
+        median, minimum, results[name] = time_it(func, args.repeats)
+        print(f"{name:<26} {median * 1000:>8.1f}ms {minimum * 1000:>8.1f}ms")
+
+    print("\nlegacy (blanks averaged in as 0):", results["legacy get_kpi_data"])
+    print("new    (blanks ignored):         ", results["get_kpi_data"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""
+End-to-end benchmark suite for the dashboard.
+
+Loads a synthetic dataset (see generate_synthetic_data.py) into a dedicated
+benchmark database using the regular loader, then times the query functions
+and every dashboard callback against it. Callbacks are replayed through the
+Flask test client the same way the browser calls them, so serialization is
+included in the timings.
+
+The report is written as JSON and can be compared against a previous run:
+    python bench_suite.py --data-dir synthetic_data --output bench_reports/after.json --compare bench_reports/before.json
+A benchmark whose median got slower than --threshold (default 20%) is reported
+as a regression and the script exits with a non-zero status.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import db_utils
+import dimension_cache
+from component_cache import clear_component_cache
+import load_to_postgres
+
+BENCH_DB_NAME = "dynamic_pricing_bench"
+DEFAULT_REPEATS = 5
+DEFAULT_WARMUP = 1
+DEFAULT_THRESHOLD = 0.20
+
+
+def configure_database(db_name, user=None, password=None, host=None, port=None):
+    """Point db_utils and the loader at the benchmark database"""
+    for module in (db_utils, load_to_postgres):
+        module.DB_NAME = db_name
+        module.DB_USER = user or module.DB_USER
+        module.DB_PASSWORD = password or module.DB_PASSWORD
+        module.DB_HOST = host or module.DB_HOST
+        module.DB_PORT = port or module.DB_PORT
+
+    # Keep the benchmark's dimension snapshot apart from the dashboard's
+    dimension_cache.DIMENSION_SNAPSHOT_PATH = os.path.join(
+        os.path.dirname(dimension_cache.DIMENSION_SNAPSHOT_PATH), f"dimensions_{db_name}.json")
+
+
+def reset_database(db_name):
+    """Drop and recreate the benchmark database"""
+    import psycopg2
+
+    conn = psycopg2.connect(dbname="postgres", user=db_utils.DB_USER, password=db_utils.DB_PASSWORD,
+                            host=db_utils.DB_HOST, port=db_utils.DB_PORT)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f'DROP DATABASE IF EXISTS "{db_name}"')
+    cur.execute(f'CREATE DATABASE "{db_name}"')
+    cur.close()
+    conn.close()
+    print(f"🛠️ Recreated database {db_name}")
+
+
+def run_ingestion(data_dir):
+    """Load the synthetic CSVs with the regular loader and return the elapsed time"""
+    from db_partitioning import setup_partitioning
+
+    load_to_postgres.SEAT_PRICES_DIR = os.path.join(data_dir, "seat_prices")
+    load_to_postgres.SEAT_WISE_PRICES_DIR = os.path.join(data_dir, "seat_wise_prices")
+    load_to_postgres.SEAT_PRICES_WITH_DT_DIR = os.path.join(data_dir, "seat_prices_with_DT")
+    load_to_postgres.SEAT_WISE_PRICES_WITH_DT_DIR = os.path.join(data_dir, "seat_wise_prices_with_DT")
+    load_to_postgres.LOG_FILE = os.path.join(data_dir, "loaded_files.txt")
+    if os.path.exists(load_to_postgres.LOG_FILE):
+        os.remove(load_to_postgres.LOG_FILE)
+
+    start = time.perf_counter()
+    # The partitioned parents are created LIKE the raw tables, so on a fresh
+    # database the raw tables have to exist before the loader runs
+    conn = load_to_postgres.get_connection()
+    load_to_postgres.ensure_tables_exist_once(conn)
+    conn.close()
+    setup_partitioning()
+    load_to_postgres.main()
+    return time.perf_counter() - start
+
+
+def summarize(timings):
+    """Summary statistics (in seconds) for a list of timings"""
+    ordered = sorted(timings)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return {
+        "runs": len(ordered),
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "p95": ordered[p95_index],
+        "mean": statistics.fmean(ordered),
+    }
+
+
+def time_call(func, repeats, warmup, verbose=False):
+    """Time repeated calls of func, after the warmup calls"""
+    timings = []
+    error = None
+    for i in range(warmup + repeats):
+        output = io.StringIO()
+        redirect = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(output)
+        # Time the builders, not the rendered-component cache
+        clear_component_cache()
+        start = time.perf_counter()
+        try:
+            with redirect:
+                func()
+        except Exception as e:
+            error = str(e)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            timings.append(elapsed)
+    result = summarize(timings)
+    if error:
+        result["error"] = error
+    return result
+
+
+def resolve_selection(manifest):
+    """Pick the date, schedule and hours used by the benchmarks from the loaded data"""
+    sample = dict(manifest["sample"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        hours = db_utils.get_hours_before_departure(sample["schedule_id"])
+    # Use the latest snapshot (the smallest hours before departure), like a user would
+    sample["hours_before_departure"] = str(min(hours, key=lambda value: float(value))) if hours else None
+    date_of_journey = datetime.strptime(sample["date_of_journey"], "%Y-%m-%d")
+    sample["month"] = date_of_journey.month
+    sample["year"] = date_of_journey.year
+    operator_ids = manifest["operator_ids"]
+    sample["model_operator_id"] = operator_ids[0]
+    sample["actual_operator_id"] = operator_ids[1] if len(operator_ids) > 1 else operator_ids[0]
+    return sample
+
+
+def function_benchmarks(selection):
+    """Query and aggregation functions to time, as name -> zero-argument callable"""
+    import measures
+    import price_utils
+    import db_utils_summary
+    import price_comparison
+
+    schedule_id = selection["schedule_id"]
+    hours = selection["hours_before_departure"]
+    date_of_journey = selection["date_of_journey"]
+    seat_type = selection["seat_type"]
+    model_operator_id = selection["model_operator_id"]
+    actual_operator_id = selection["actual_operator_id"]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        filtered_df = db_utils.get_filtered_data(schedule_id, None, None, hours, date_of_journey)
+
+    return {
+        "db_utils.get_all_dates_of_journey": lambda: db_utils.get_all_dates_of_journey(),
+        "db_utils.get_schedule_ids_by_date": lambda: db_utils.get_schedule_ids_by_date(date_of_journey),
+        "db_utils.get_hours_before_departure": lambda: db_utils.get_hours_before_departure(schedule_id),
+        "db_utils.get_seat_types_by_schedule_id": lambda: db_utils.get_seat_types_by_schedule_id(schedule_id),
+        "db_utils.get_operator_id_by_schedule_id": lambda: db_utils.get_operator_id_by_schedule_id(schedule_id),
+        "db_utils.get_origin_destination_by_schedule_id": lambda: db_utils.get_origin_destination_by_schedule_id(schedule_id),
+        "db_utils.get_filtered_data": lambda: db_utils.get_filtered_data(schedule_id, None, None, hours, date_of_journey),
+        "db_utils.get_seat_wise_prices": lambda: db_utils.get_seat_wise_prices(schedule_id, hours),
+        "db_utils.get_seat_wise_data": lambda: db_utils.get_seat_wise_data(schedule_id, hours, date_of_journey),
+        "db_utils.stream_query.seat_wise_prices": lambda: sum(
+            len(chunk["schedule_id"]) for chunk in db_utils.stream_query(
+                'SELECT "schedule_id", "final_price" FROM seat_wise_prices_partitioned',
+                dtypes={"final_price": "numeric"}, as_numpy=True)),
+        "db_utils.get_occupancy_by_seat_type": lambda: db_utils.get_occupancy_by_seat_type(schedule_id, seat_type, hours),
+        "db_utils.get_demand_index": lambda: db_utils.get_demand_index(schedule_id, hours),
+        "measures.get_kpi_data": lambda: measures.get_kpi_data(filtered_df),
+        "measures.get_price_trend_data": lambda: measures.get_price_trend_data(schedule_id, None, None, hours, date_of_journey),
+        "measures.get_price_delta_data": lambda: measures.get_price_delta_data(schedule_id, None, None, hours, date_of_journey),
+        "measures.get_occupancy_data": lambda: measures.get_occupancy_data(schedule_id),
+        "measures.get_seat_wise_price_sum_by_hour": lambda: measures.get_seat_wise_price_sum_by_hour(schedule_id),
+        "price_utils.get_total_seat_prices": lambda: price_utils.get_total_seat_prices(schedule_id, hours),
+        "price_utils.get_monthly_delta": lambda: price_utils.get_monthly_delta(selection["month"], selection["year"]),
+        "db_utils_summary.get_price_summary_by_date": lambda: db_utils_summary.get_price_summary_by_date(date_of_journey),
+        "price_comparison.get_matching_times_with_same_seat_types": lambda: price_comparison.get_matching_times_with_same_seat_types(
+            date_of_journey, model_operator_id, actual_operator_id),
+        "price_comparison.get_price_comparison_data": lambda: price_comparison.get_price_comparison_data(
+            date_of_journey, model_operator_id, actual_operator_id, selection["departure_time"]),
+    }
+
+
+def callback_benchmarks(selection):
+    """Callbacks to replay, as (name, output, input values, changed props)"""
+    values = {
+        "url.pathname": "/",
+        "date-of-journey-dropdown.value": selection["date_of_journey"],
+        "schedule-id-dropdown.value": selection["schedule_id"],
+        "hours-before-departure-dropdown.value": selection["hours_before_departure"],
+        "operator-name-container.children": None,
+        "seat-selector.value": "1",
+        "month-selector.value": selection["month"],
+        "year-selector.value": selection["year"],
+        "calculate-monthly-delta-button.n_clicks": 1,
+        "price-comparison-doj.value": selection["date_of_journey"],
+        "model-operator.value": selection["model_operator_id"],
+        "actual-operator.value": selection["actual_operator_id"],
+        "time-of-journey.value": selection["departure_time"],
+    }
+    return [
+        ("display_page", "page-content.children", values, None),
+        ("update_schedule_id_slicer", "schedule-id-dropdown.options", values, None),
+        ("update_hours_before_departure_slicer", "hours-before-departure-dropdown.options", values, None),
+        ("update_operator_by_schedule_id", "operator-name-display.children", values, None),
+        ("update_seat_types_by_schedule_id", "seat-type-dropdown.options", values, None),
+        ("update_route_info", "origin-display.children", values, None),
+        ("update_dashboard", "kpi-container.children", values, None),
+        ("update_seat_visualizations", "seat-map-container.children", values, None),
+        ("update_seat_details", "seat-details.children", values, None),
+        ("update_date_summary_kpis", "date-summary-container.children", values, None),
+        ("update_monthly_delta", "monthly-delta-kpis.children", values, ["calculate-monthly-delta-button.n_clicks"]),
+        ("update_time_of_journey_dropdown", "time-of-journey.options", values, None),
+        ("update_price_comparison_data", "price-comparison-results.children", values, None),
+    ]
+
+
+def run_callback_benchmarks(selection, repeats, warmup, verbose=False):
+    """Replay each callback through the Flask test client"""
+    from dash_requests import DEPENDENCIES_PATH, UPDATE_COMPONENT_PATH, build_update_request, find_dependency
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main
+        client = main.app.server.test_client()
+        # The first request merges globally registered callbacks into the app
+        dependencies = client.get(DEPENDENCIES_PATH).get_json()
+
+    results = {}
+    for name, output, values, changed in callback_benchmarks(selection):
+        dependency = find_dependency(dependencies, output)
+        if dependency is None:
+            results[name] = {"error": f"no callback found for {output}"}
+            continue
+        body = build_update_request(dependency, values, changed)
+
+        def replay():
+            response = client.post(UPDATE_COMPONENT_PATH, json=body)
+            # 204 is PreventUpdate, which is a valid outcome for some selections
+            if response.status_code not in (200, 204):
+                raise RuntimeError(f"HTTP {response.status_code}")
+
+        results[name] = time_call(replay, repeats, warmup, verbose)
+        print(f"   {name}: median {results[name]['median'] * 1000:.1f} ms")
+    return results
+
+
+def compare_reports(current, baseline, threshold):
+    """Compare medians against a baseline report
+
+    A benchmark that errored now is a failure, whatever its median. One that
+    errored in the baseline has no median to compare against.
+
+    Returns:
+        list: (name, baseline median, current median, relative change) for each regression,
+              the change is None for a benchmark that errored
+    """
+    regressions = []
+    for section in ("functions", "callbacks"):
+        for name, result in current.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if "error" in result:
+                print(f"   {section}/{name}: FAILED ({result['error']})")
+                regressions.append((f"{section}/{name}", (previous or {}).get("median"), result.get("median"), None))
+                continue
+            if (not previous or "error" in previous or "median" not in previous or "median" not in result
+                    or previous["median"] <= 0):
+                continue
+            change = (result["median"] - previous["median"]) / previous["median"]
+            marker = "REGRESSION" if change > threshold else ""
+            print(f"   {section}/{name}: {previous['median'] * 1000:.1f} ms -> {result['median'] * 1000:.1f} ms "
+                  f"({change:+.1%}) {marker}")
+            if change > threshold:
+                regressions.append((f"{section}/{name}", previous["median"], result["median"], change))
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion, queries and dashboard callbacks")
+    parser.add_argument("--data-dir", default="synthetic_data", help="Output of generate_synthetic_data.py")
+    parser.add_argument("--db-name", default=BENCH_DB_NAME)
+    parser.add_argument("--db-user", default=None)
+    parser.add_argument("--db-password", default=None)
+    parser.add_argument("--db-host", default=None)
+    parser.add_argument("--db-port", default=None)
+    parser.add_argument("--reset-db", action="store_true", help="Drop and recreate the benchmark database first")
+    parser.add_argument("--skip-ingest", action="store_true", help="Benchmark an already loaded database")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    parser.add_argument("--output", default=None, help="Report path, defaults to bench_reports/bench_<timestamp>.json")
+    parser.add_argument("--compare", default=None, help="Baseline report to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--verbose", action="store_true", help="Show the output of the benchmarked code")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    with open(os.path.join(args.data_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+
+    configure_database(args.db_name, args.db_user, args.db_password, args.db_host, args.db_port)
+
+    report = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "database": args.db_name,
+            "dataset": manifest["parameters"],
+            "rows": manifest["rows"],
+            "repeats": args.repeats,
+            "warmup": args.warmup,
+        },
+        "ingestion": None,
+        "functions": {},
+        "callbacks": {},
+    }
+
+    if args.reset_db:
+        reset_database(args.db_name)
+
+    if not args.skip_ingest:
+        print(f"📥 Loading {manifest['files']} files from {args.data_dir}...")
+        with contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext():
+            ingestion_seconds = run_ingestion(os.path.abspath(args.data_dir))
+        total_rows = sum(manifest["rows"].values())
+        report["ingestion"] = {
+            "seconds": ingestion_seconds,
+            "rows": total_rows,
+            "rows_per_second": total_rows / ingestion_seconds if ingestion_seconds else None,
+        }
+        print(f"✅ Ingestion took {ingestion_seconds:.1f}s ({report['ingestion']['rows_per_second']:,.0f} rows/s)")
+
+    selection = resolve_selection(manifest)
+    report["meta"]["selection"] = selection
+
+    print("⏱️ Timing query functions...")
+    for name, func in function_benchmarks(selection).items():
+        report["functions"][name] = time_call(func, args.repeats, args.warmup, args.verbose)
+        print(f"   {name}: median {report['functions'][name]['median'] * 1000:.1f} ms")
+
+    print("⏱️ Timing callbacks...")
+    report["callbacks"] = run_callback_benchmarks(selection, args.repeats, args.warmup, args.verbose)
+
+    output_path = args.output or os.path.join("bench_reports", f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Report written to {output_path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"📊 Comparing against {args.compare} (threshold {args.threshold:.0%})...")
+        regressions = compare_reports(report, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} benchmark(s) failed or regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Per-callback latency instrumentation for the Dash app.
+
+Every registered callback (app.callback and dash.callback) is wrapped to record
+wall time, database time, serialization time and payload size per output.
+The results are exposed as Prometheus-style histograms on /metrics, and a single
+request can be profiled with cProfile by adding ?profile=1 to it (or to the page URL).
+"""
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+
+import flask
+import dash._callback as dash_callback_module
+from dash.exceptions import PreventUpdate
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PAYLOAD_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Query parameter that triggers a cProfile dump, and where the dumps are written
+PROFILE_QUERY_PARAM = "profile"
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+
+METRICS_PATH = "/metrics"
+
+_metrics_lock = threading.Lock()
+_histograms = {}  # (metric_name, labels) -> {'counts': [...], 'sum': float, 'count': int}
+_counters = {}    # (metric_name, labels) -> int
+_local = threading.local()
+_original_to_json = dash_callback_module.to_json
+
+
+def _observe(metric_name, labels, value, buckets):
+    """Add a single observation to a histogram"""
+    key = (metric_name, labels)
+    with _metrics_lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = {'buckets': buckets, 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            _histograms[key] = histogram
+        for i, upper_bound in enumerate(buckets):
+            if value <= upper_bound:
+                histogram['counts'][i] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+
+def increment_counter(metric_name, labels=(), amount=1):
+    """Increment a counter exposed on the metrics endpoint"""
+    key = (metric_name, tuple(labels))
+    with _metrics_lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+@contextmanager
+def track_db_time():
+    """Add the time spent inside the block to the current callback's DB time"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_db_time(time.perf_counter() - start)
+
+
+def add_db_time(seconds):
+    """Add DB time to the callback running on this thread (no-op outside callbacks)"""
+    db_timer = getattr(_local, 'db_timer', None)
+    if db_timer is not None:
+        with _metrics_lock:
+            db_timer[0] += seconds
+
+
+def bind_db_time(func):
+    """Wrap func so DB time it spends on a worker thread counts towards the calling callback"""
+    db_timer = getattr(_local, 'db_timer', None)
+    if db_timer is None:
+        return func
+
+    @functools.wraps(func)
+    def bound(*args, **kwargs):
+        previous_timer = getattr(_local, 'db_timer', None)
+        _local.db_timer = db_timer
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.db_timer = previous_timer
+    return bound
+
+
+def _timed_to_json(data):
+    """Replacement for dash's to_json that times serialization and sizes each output"""
+    output_sizes = getattr(_local, 'output_sizes', None)
+    if output_sizes is None:
+        return _original_to_json(data)
+
+    start = time.perf_counter()
+    if isinstance(data, dict) and set(data) == {"multi", "response"}:
+        # Encode each output separately so we know its size, then stitch the
+        # response together - this produces the same JSON without encoding twice
+        component_parts = []
+        for component_id, props in data["response"].items():
+            prop_parts = []
+            for prop, value in props.items():
+                encoded_value = _original_to_json(value)
+                output_sizes[f"{component_id}.{prop}"] = len(encoded_value.encode('utf-8'))
+                prop_parts.append(f"{json.dumps(prop)}: {encoded_value}")
+            component_parts.append(f"{json.dumps(component_id)}: {{{', '.join(prop_parts)}}}")
+        encoded = '{"multi": true, "response": {' + ', '.join(component_parts) + '}}'
+    else:
+        encoded = _original_to_json(data)
+    _local.serialize_seconds += time.perf_counter() - start
+    return encoded
+
+
+def _profiling_requested(callback_name):
+    """Check the request (and the page that sent it) for the profile query parameter"""
+    if not flask.has_request_context():
+        return False
+
+    values = flask.request.args.getlist(PROFILE_QUERY_PARAM)
+    referrer = flask.request.headers.get('Referer')
+    if referrer:
+        values += parse_qs(urlparse(referrer).query).get(PROFILE_QUERY_PARAM, [])
+
+    # ?profile=1 profiles every callback, ?profile=update_dashboard only that one
+    return any(value in ('1', 'true', 'all', callback_name) for value in values)
+
+
+def _dump_profile(callback_name, profiler):
+    """Write a cProfile dump for one callback invocation and print the top entries"""
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        dump_path = os.path.join(PROFILE_DIR, f"{callback_name}_{timestamp}.prof")
+        profiler.dump_stats(dump_path)
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(25)
+        print(f"Profile for {callback_name} written to {dump_path}")
+        print(summary.getvalue())
+    except Exception as e:
+        print(f"Error writing profile for {callback_name}: {e}")
+
+
+def _record_callback(callback_name, status, wall_seconds, db_seconds, serialize_seconds, output_sizes):
+    """Record one callback invocation in the histograms"""
+    labels = (('callback', callback_name),)
+    _observe('dash_callback_wall_seconds', labels, wall_seconds, LATENCY_BUCKETS)
+    _observe('dash_callback_db_seconds', labels, db_seconds, LATENCY_BUCKETS)
+    _observe('dash_callback_serialize_seconds', labels, serialize_seconds, LATENCY_BUCKETS)
+    for output_id, size in output_sizes.items():
+        _observe('dash_callback_payload_bytes', labels + (('output', output_id),), size, PAYLOAD_BUCKETS)
+    increment_counter('dash_callback_requests_total', labels + (('status', status),))
+
+
+def instrument_callback(callback_name):
+    """Decorator that records latency metrics for a Dash callback function"""
+    def decorator(func):
+        @functools.wraps(func)
+        def instrumented(*args, **kwargs):
+            # A one-element list so worker threads can add to it (see bind_db_time)
+            _local.db_timer = [0.0]
+            _local.serialize_seconds = 0.0
+            _local.output_sizes = {}
+            profiler = cProfile.Profile() if _profiling_requested(callback_name) else None
+            status = 'ok'
+            start = time.perf_counter()
+            try:
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+            except PreventUpdate:
+                status = 'prevented'
+                raise
+            except Exception:
+                status = 'error'
+                raise
+            finally:
+                wall_seconds = time.perf_counter() - start
+                _record_callback(callback_name, status, wall_seconds, _local.db_timer[0],
+                                 _local.serialize_seconds, _local.output_sizes)
+                _local.db_timer = None
+                _local.serialize_seconds = None
+                _local.output_sizes = None
+                if profiler is not None:
+                    _dump_profile(callback_name, profiler)
+        return instrumented
+    return decorator
+
+
+def _format_labels(labels, extra=()):
+    """Format a labels tuple in Prometheus text format"""
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = [(name, str(value).replace('\\', '\\\\').replace('"', '\\"')) for name, value in pairs]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def render_metrics():
+    """Render all histograms and counters in the Prometheus text exposition format"""
+    with _metrics_lock:
+        histograms = {key: dict(value, counts=list(value['counts'])) for key, value in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    seen_types = set()
+    for (metric_name, labels), histogram in sorted(histograms.items()):
+        if metric_name not in seen_types:
+            lines.append(f"# TYPE {metric_name} histogram")
+            seen_types.add(metric_name)
+        for upper_bound, count in zip(histogram['buckets'], histogram['counts']):
+            lines.append(f"{metric_name}_bucket{_format_labels(labels, (('le', upper_bound),))} {count}")
+        lines.append(f"{metric_name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {histogram['count']}")
+        lines.append(f"{metric_name}_sum{_format_labels(labels)} {histogram['sum']:.6f}")
+        lines.append(f"{metric_name}_count{_format_labels(labels)} {histogram['count']}")
+
+    for (metric_name, labels), value in sorted(counters.items()):
+        if metric_name not in seen_types:
+            lines.append(f"# TYPE {metric_name} counter")
+            seen_types.add(metric_name)
+        lines.append(f"{metric_name}{_format_labels(labels)} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def instrument_app(app):
+    """Instrument every callback of a Dash app and expose the /metrics endpoint
+
+    Callbacks registered with dash.callback are only merged into app.callback_map
+    on the first request, so the wrapping happens lazily in a before_request hook.
+    """
+    state = {'instrumented': False}
+    state_lock = threading.Lock()
+
+    dash_callback_module.to_json = _timed_to_json
+
+    def wrap_registered_callbacks():
+        if state['instrumented']:
+            return
+        with state_lock:
+            if state['instrumented']:
+                return
+            for callback_id, callback_spec in app.callback_map.items():
+                func = callback_spec.get('callback')
+                if func is None:
+                    # Clientside callback, runs in the browser
+                    continue
+                callback_name = getattr(func, '__name__', callback_id)
+                callback_spec['callback'] = instrument_callback(callback_name)(func)
+            state['instrumented'] = True
+            print(f"Instrumented {len(app.callback_map)} callbacks")
+
+    app.server.before_request(wrap_registered_callbacks)
+
+    @app.server.route(METRICS_PATH)
+    def metrics():
+        return flask.Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    return app
@@ -0,0 +1,105 @@
+"""
+Memoization of rendered dashboard components.
+
+Analysts looking at the same schedule and hour get the same KPI row, charts and
+seat map. The builders are wrapped with memoize_component, which keeps the
+rendered component tree per (builder, arguments, data version) in a bounded LRU
+cache. Entries built from older data are dropped as soon as a new load is seen
+(see data_version.py), or, with the loader's notifications, as soon as one of
+the dates or schedules the component was built from changed, and never outlive COMPONENT_CACHE_TTL_SECONDS, so a
+placeholder rendered during a database hiccup doesn't stick.
+
+Hits and misses are counted on the metrics endpoint as
+dash_component_cache_total{component, result}.
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from callback_metrics import increment_counter
+from data_version import get_data_version, get_scope_version
+
+# Upper bound on cached component trees, the least recently used are evicted first
+COMPONENT_CACHE_MAX_ENTRIES = 256
+
+# Upper bound on the age of a cached component, even without new data
+COMPONENT_CACHE_TTL_SECONDS = 600
+
+_entries = OrderedDict()  # (name, args, kwargs) -> (scope version, expires_at, component)
+_entries_lock = threading.Lock()
+_cached_version = None
+
+
+def _lookup(key, version, scope_version, now):
+    """Cached component for the key, or None (called with the lock held)"""
+    global _cached_version
+
+    if version != _cached_version:
+        # New data was loaded, nothing cached so far is valid anymore
+        _entries.clear()
+        _cached_version = version
+        return None
+
+    entry = _entries.get(key)
+    if entry is None:
+        return None
+    if entry[0] != scope_version or entry[1] <= now:
+        del _entries[key]
+        return None
+    _entries.move_to_end(key)
+    return entry
+
+
+def _store(key, version, scope_version, component, now):
+    """Store a component, evicting the least recently used entries (called with the lock held)"""
+    if version != _cached_version:
+        return
+    _entries[key] = (scope_version, now + COMPONENT_CACHE_TTL_SECONDS, component)
+    _entries.move_to_end(key)
+    while len(_entries) > COMPONENT_CACHE_MAX_ENTRIES:
+        _entries.popitem(last=False)
+
+
+def default_scope(*args, **kwargs):
+    """Dates and schedules a component depends on: its arguments, whichever they are"""
+    return [value for value in list(args) + list(kwargs.values()) if isinstance(value, (str, int))]
+
+
+def memoize_component(name, scope=default_scope):
+    """Decorator caching a component builder's result by its (hashable) arguments and the data version
+
+    scope(*args, **kwargs) lists the dates of journey and schedule ids the
+    component is built from, notified changes to any of them invalidate it.
+    The cached component is shared between requests, callers must not modify it.
+    """
+    def decorator(build):
+        @functools.wraps(build)
+        def wrapper(*args, **kwargs):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                # Arguments that can't be keyed, build without caching
+                return build(*args, **kwargs)
+            version = get_data_version()
+            scope_version = get_scope_version(scope(*args, **kwargs))
+            with _entries_lock:
+                entry = _lookup(key, version, scope_version, time.monotonic())
+            if entry is not None:
+                increment_counter("dash_component_cache_total", (("component", name), ("result", "hit")))
+                return entry[2]
+
+            increment_counter("dash_component_cache_total", (("component", name), ("result", "miss")))
+            component = build(*args, **kwargs)
+            with _entries_lock:
+                _store(key, version, scope_version, component, time.monotonic())
+            return component
+        return wrapper
+    return decorator
+
+
+def clear_component_cache():
+    """Drop all cached components"""
+    with _entries_lock:
+        _entries.clear()
@@ -0,0 +1,78 @@
+"""
+Run independent data fetches for one dashboard selection concurrently.
+
+Callbacks submit their fetches to a shared thread pool (the queries go through
+the pooled engine in db_utils) and wait for them with a per-request deadline,
+so a callback takes about as long as its slowest query instead of the sum of
+all of them. A fetch that misses the deadline is reported as an error and the
+callback renders its fallback for that output.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from callback_metrics import bind_db_time
+
+# Worker threads shared by all callbacks, keep below db_utils.DB_POOL_SIZE + DB_MAX_OVERFLOW
+FETCH_WORKERS = 16
+
+# How long a callback waits for its fetches in total
+REQUEST_DEADLINE_SECONDS = 30
+
+_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch")
+
+
+def request_deadline(seconds=REQUEST_DEADLINE_SECONDS):
+    """Absolute deadline for the fetches of one request"""
+    return time.monotonic() + seconds
+
+
+def submit_fetches(tasks):
+    """Start fetches on the shared pool
+
+    Args:
+        tasks (dict): Name -> (function, *args)
+
+    Returns:
+        dict: Name -> Future
+    """
+    futures = {}
+    for name, task in tasks.items():
+        func, args = task[0], task[1:]
+        futures[name] = _executor.submit(bind_db_time(func), *args)
+    return futures
+
+
+def gather_fetches(futures, deadline=None):
+    """Wait for submitted fetches until the deadline
+
+    Args:
+        futures (dict): Name -> Future, as returned by submit_fetches
+        deadline (float): Value from request_deadline(), defaults to a fresh one
+
+    Returns:
+        tuple: (results, errors) - name -> result for fetches that finished,
+               name -> exception for fetches that failed or missed the deadline
+    """
+    deadline = deadline or request_deadline()
+    wait(list(futures.values()), timeout=max(deadline - time.monotonic(), 0))
+
+    results = {}
+    errors = {}
+    for name, future in futures.items():
+        if not future.done():
+            # The query keeps running in the background, we just stop waiting for it
+            future.cancel()
+            errors[name] = TimeoutError(f"{name} did not finish before the request deadline")
+            print(f"Fetch {name} timed out")
+            continue
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            errors[name] = e
+            print(f"Error in fetch {name}: {e}")
+    return results, errors
+
+
+def fetch_concurrently(tasks, deadline=None):
+    """Run fetches concurrently and wait for them, see submit_fetches and gather_fetches"""
+    return gather_fetches(submit_fetches(tasks), deadline)
@@ -0,0 +1,56 @@
+"""
+Helpers to build /_dash-update-component request bodies from the app's
+callback graph (as served by /_dash-dependencies).
+Used by the benchmark suite and the load test harness to replay callbacks.
+"""
+
+UPDATE_COMPONENT_PATH = "/_dash-update-component"
+DEPENDENCIES_PATH = "/_dash-dependencies"
+
+
+def split_output_key(output_key):
+    """Split a callback output key into a list of (component_id, property) pairs"""
+    if output_key.startswith(".."):
+        parts = output_key[2:-2].split("...")
+    else:
+        parts = [output_key]
+    return [tuple(part.rsplit(".", 1)) for part in parts]
+
+
+def find_dependency(dependencies, output):
+    """Find the callback that updates the given "component_id.property" output"""
+    component_id, prop = output.rsplit(".", 1)
+    for dependency in dependencies:
+        if (component_id, prop) in split_output_key(dependency["output"]):
+            return dependency
+    return None
+
+
+def build_update_request(dependency, values, changed=None):
+    """Build the JSON body Dash's renderer sends to run one callback
+
+    Args:
+        dependency (dict): Callback entry from /_dash-dependencies
+        values (dict): Input/state values keyed by "component_id.property"
+        changed (list): Props that triggered the callback, defaults to all inputs
+
+    Returns:
+        dict: Request body for /_dash-update-component
+    """
+    outputs = [{"id": component_id, "property": prop}
+               for component_id, prop in split_output_key(dependency["output"])]
+    inputs = [dict(item, value=values.get(f"{item['id']}.{item['property']}"))
+              for item in dependency.get("inputs", [])]
+    state = [dict(item, value=values.get(f"{item['id']}.{item['property']}"))
+             for item in dependency.get("state", [])]
+
+    if changed is None:
+        changed = [f"{item['id']}.{item['property']}" for item in inputs]
+
+    return {
+        "output": dependency["output"],
+        "outputs": outputs if dependency["output"].startswith("..") else outputs[0],
+        "inputs": inputs,
+        "state": state,
+        "changedPropIds": changed
+    }
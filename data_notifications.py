@@ -0,0 +1,229 @@
+"""
+Postgres LISTEN/NOTIFY between the loader and running dashboards.
+
+At the end of a run, once the dimension snapshot and its log are written,
+load_to_postgres.py sends a notification on DATA_CHANNEL naming the tables
+loaded, the run's sequence number and the dates of journey and schedules it
+touched:
+
+    {"tables": ["seat_prices_raw"], "version": 42, "dates": ["2025-03-01"], "schedule_ids": ["1646", ...]}
+
+In the same transaction the sequence number is written to DATA_CHANGES_TABLE
+as the version of each of those dates, their months and schedules.
+
+Each app process runs one listener thread (start_data_listener), which sets
+the versions of those dates and schedules in data_version.py, so the caches
+keyed by them miss on their next use while everything else stays cached, and
+drops the prefetched schedule bundles. On (re)connecting it reads all versions
+from DATA_CHANGES_TABLE, so processes that started at different times, or
+missed notifications, agree on them. Payloads are limited to about 8000 bytes,
+long schedule lists are split over several notifications. A load without
+dates and schedules invalidates everything.
+
+While the listener is disconnected, data_version falls back to watching the
+loader's files.
+"""
+import json
+import select
+import threading
+import time
+
+import pandas as pd
+
+import data_version
+
+DATA_CHANNEL = "seat_data_loaded"
+
+# Latest load of each date of journey, month and schedule, written by the loader
+DATA_CHANGES_TABLE = "data_changes"
+DATA_CHANGE_SEQUENCE = "data_change_seq"
+
+# Postgres rejects payloads of 8000 bytes or more
+NOTIFY_PAYLOAD_LIMIT = 7900
+
+# How long the listener waits for a notification before checking its connection
+LISTEN_POLL_SECONDS = 5
+
+# Delay before reconnecting after the listening connection failed
+LISTEN_RETRY_SECONDS = 30
+
+_listener_thread = None
+_listener_lock = threading.Lock()
+
+
+def ensure_data_change_table(conn):
+    """Create the table of load versions and the sequence numbering loads"""
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE SEQUENCE IF NOT EXISTS {DATA_CHANGE_SEQUENCE}")
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {DATA_CHANGES_TABLE} (
+                scope TEXT PRIMARY KEY,
+                version BIGINT NOT NULL
+            )
+        """)
+    conn.commit()
+
+
+def normalize_schedule_id(schedule_id):
+    """Schedule id as the dashboard names it, '1646' for an id pandas read as 1646.0"""
+    text = str(schedule_id).strip()
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    if number.is_integer():
+        return str(int(number))
+    return text
+
+
+def normalize_date(date):
+    """Date of journey as 'YYYY-MM-DD', as the dashboard names it"""
+    try:
+        return pd.Timestamp(str(date).strip()).strftime('%Y-%m-%d')
+    except (TypeError, ValueError):
+        return str(date).strip()
+
+
+def load_scope(dates=None, schedule_ids=None):
+    """Sorted, normalized dates and schedule ids a load changed
+
+    Both are empty when there are too many dates to name in a notification,
+    the load then invalidates everything.
+    """
+    dates = sorted({normalize_date(date) for date in dates or [] if not pd.isna(date)})
+    schedule_ids = sorted({normalize_schedule_id(schedule_id) for schedule_id in schedule_ids or []
+                           if not pd.isna(schedule_id)})
+    if len(json.dumps(dates)) > NOTIFY_PAYLOAD_LIMIT // 2:
+        return [], []
+    return dates, schedule_ids
+
+
+def scope_versions(dates, schedule_ids):
+    """Scopes recorded in DATA_CHANGES_TABLE for a load, as data_version.record_data_change sets them"""
+    if not dates and not schedule_ids:
+        return [data_version.UNSCOPED_VERSION_KEY]
+    return sorted(set(dates) | {date[:7] for date in dates} | set(schedule_ids))
+
+
+def notification_payloads(tables, version, dates=None, schedule_ids=None):
+    """JSON payloads describing a load, schedules split so each payload fits in a notification"""
+    dates, schedule_ids = load_scope(dates, schedule_ids)
+    base = {"tables": sorted(tables), "version": version, "dates": dates, "schedule_ids": []}
+
+    payloads = []
+    batch = []
+    size = len(json.dumps(base))
+    for schedule_id in schedule_ids:
+        item_size = len(json.dumps(schedule_id)) + 2
+        if batch and size + item_size > NOTIFY_PAYLOAD_LIMIT:
+            payloads.append(json.dumps(dict(base, schedule_ids=batch)))
+            batch, size = [], len(json.dumps(base))
+        batch.append(schedule_id)
+        size += item_size
+    payloads.append(json.dumps(dict(base, schedule_ids=batch)))
+    return payloads
+
+
+def notify_data_loaded(conn, tables, dates=None, schedule_ids=None):
+    """Record a load's version and tell listening dashboards, delivered when the transaction commits"""
+    dates, schedule_ids = load_scope(dates, schedule_ids)
+    with conn.cursor() as cur:
+        cur.execute("SELECT nextval(%s)", (DATA_CHANGE_SEQUENCE,))
+        version = cur.fetchone()[0]
+        cur.execute(f"""
+            INSERT INTO {DATA_CHANGES_TABLE} (scope, version)
+            SELECT unnest(%s::text[]), %s
+            ON CONFLICT (scope) DO UPDATE SET version = EXCLUDED.version
+        """, (scope_versions(dates, schedule_ids), version))
+        for payload in notification_payloads(tables, version, dates, schedule_ids):
+            cur.execute("SELECT pg_notify(%s, %s)", (DATA_CHANNEL, payload))
+    conn.commit()
+
+
+def read_data_versions(conn):
+    """All load versions (scope -> sequence number), empty before the loader created the table"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s)", (DATA_CHANGES_TABLE,))
+        if cur.fetchone()[0] is None:
+            return {}
+        cur.execute(f"SELECT scope, version FROM {DATA_CHANGES_TABLE}")
+        return dict(cur.fetchall())
+
+
+def handle_notification(payload):
+    """Invalidate the cache entries of the dates and schedules named by a notification
+
+    Raises ValueError for a malformed payload, the listener then reconnects and
+    reads the versions from the database instead.
+    """
+    try:
+        change = json.loads(payload)
+        version = int(change["version"])
+        dates, schedule_ids = change.get("dates") or [], change.get("schedule_ids") or []
+    except (KeyError, TypeError, ValueError, AttributeError):
+        raise ValueError(f"Malformed data notification: {payload[:200]}")
+
+    data_version.record_data_change(version, dates, schedule_ids)
+
+    # Imported here, the loader imports this module without the dashboard's modules
+    from schedule_bundle import invalidate_schedule
+    if schedule_ids:
+        for schedule_id in schedule_ids:
+            invalidate_schedule(schedule_id)
+    elif not dates:
+        invalidate_schedule()
+
+
+def _listen(conn):
+    """Handle notifications until the connection fails"""
+    conn.set_session(autocommit=True)
+    with conn.cursor() as cur:
+        cur.execute(f"LISTEN {DATA_CHANNEL}")
+    # Read after LISTEN, so a load committed in between is in the table, notified, or both
+    data_version.set_notifications_active(True, read_data_versions(conn))
+
+    # Loads may have been missed while not listening
+    from schedule_bundle import invalidate_schedule
+    invalidate_schedule()
+    print(f"Listening for data loads on {DATA_CHANNEL}")
+
+    while True:
+        if select.select([conn], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+            # Nothing arrived, check the connection is still alive
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            continue
+        conn.poll()
+        while conn.notifies:
+            handle_notification(conn.notifies.pop(0).payload)
+
+
+def _listen_loop():
+    """Listen, reconnecting after failures with the files as the data version meanwhile"""
+    from db_utils import get_connection
+
+    while True:
+        conn = get_connection()
+        if conn is not None:
+            try:
+                _listen(conn)
+            except Exception as e:
+                print(f"Data notification listener failed: {e}")
+            finally:
+                data_version.set_notifications_active(False)
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        time.sleep(LISTEN_RETRY_SECONDS)
+
+
+def start_data_listener():
+    """Start listening for the loader's notifications in the background (once per process)"""
+    global _listener_thread
+
+    with _listener_lock:
+        if _listener_thread is not None:
+            return
+        _listener_thread = threading.Thread(target=_listen_loop, name="data-listener", daemon=True)
+        _listener_thread.start()
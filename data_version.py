@@ -0,0 +1,121 @@
+"""
+Version stamp of the data in the database.
+
+Everything the loader writes becomes visible together when it appends to its log
+file, after updating the dimension snapshot. The modification times of those two
+files are used as a stamp: caches key their entries by it, so they stay valid
+until new data has been loaded.
+
+When the app listens for the loader's notifications (data_notifications.py),
+the stamp no longer follows the files: each load has a sequence number, which
+becomes the version of the dates of journey, months and schedules it names,
+and caches also key their entries by get_scope_version of the dates and
+schedules they were built from. Only the entries a load affected go stale. The
+stamp itself changes with loads that can't be scoped.
+
+The versions are the loader's, kept in the database and replaced with its
+contents whenever the listener (re)connects, so every app process (and each
+worker of a multi-worker server) derives the same stamps and ETags.
+"""
+import os
+import threading
+import time
+
+import pandas as pd
+
+import dimension_cache
+
+# How often the files are checked for a new load
+DATA_VERSION_CHECK_SECONDS = 1.0
+
+# Scope under which the loader records loads that can't be scoped
+UNSCOPED_VERSION_KEY = "*"
+
+_data_version = None
+_last_check = 0
+_version_lock = threading.Lock()
+
+_notifications_active = False
+_generation = 0  # sequence number of the latest unscoped load
+_changes = {}  # date of journey, month ('YYYY-MM') or schedule id -> sequence number of its latest load
+
+
+def get_load_log_mtime():
+    """Modification time of the loader's log, which changes whenever new files were loaded"""
+    try:
+        from load_to_postgres import LOG_FILE
+        return os.path.getmtime(LOG_FILE)
+    except Exception:
+        return None
+
+
+def _snapshot_mtime():
+    """Modification time of the dimension snapshot, also updated by each load"""
+    try:
+        return os.path.getmtime(dimension_cache.DIMENSION_SNAPSHOT_PATH)
+    except OSError:
+        return None
+
+
+def get_data_version():
+    """Stamp that changes whenever new data was loaded"""
+    global _data_version, _last_check
+
+    now = time.monotonic()
+    with _version_lock:
+        if _notifications_active:
+            return ("notify", _generation)
+        if _data_version is not None and now - _last_check < DATA_VERSION_CHECK_SECONDS:
+            return _data_version
+        _data_version = (get_load_log_mtime(), _snapshot_mtime())
+        _last_check = now
+        return _data_version
+
+
+def get_scope_version(values):
+    """Versions of dates of journey, months or schedule ids, all 0 without notifications"""
+    with _version_lock:
+        return tuple(_changes.get(str(value), 0) for value in values)
+
+
+def dates_between(date_from, date_to):
+    """Dates ('YYYY-MM-DD') from date_from to date_to, the scope of a cache entry over a range"""
+    try:
+        return [d.strftime('%Y-%m-%d') for d in pd.date_range(str(date_from), str(date_to), freq='D')]
+    except (TypeError, ValueError):
+        return [str(date_from), str(date_to)]
+
+
+def set_notifications_active(active, versions=None):
+    """Switch the stamp between the files and the loader's notifications
+
+    Notifications may have been missed while not listening, so the versions are
+    replaced with the loader's (scope -> sequence number, UNSCOPED_VERSION_KEY
+    for the unscoped loads) when listening starts, and dropped when it stops.
+    """
+    global _notifications_active, _generation, _data_version, _changes
+    with _version_lock:
+        _notifications_active = active
+        versions = dict(versions or {}) if active else {}
+        _generation = versions.pop(UNSCOPED_VERSION_KEY, 0)
+        _changes = versions
+        _data_version = None
+
+
+def record_data_change(version, dates=None, schedule_ids=None):
+    """Set the versions of the dates (and their months) and schedules a load changed
+
+    Without dates and schedules the change can't be scoped, so the stamp changes.
+    Versions only move forward, a notification may arrive after the listener
+    already read its load from the database.
+    """
+    global _generation
+    with _version_lock:
+        if not dates and not schedule_ids:
+            _generation = max(_generation, version)
+            return
+        for date in dates or []:
+            for value in (str(date), str(date)[:7]):
+                _changes[value] = max(_changes.get(value, 0), version)
+        for schedule_id in schedule_ids or []:
+            _changes[str(schedule_id)] = max(_changes.get(str(schedule_id), 0), version)
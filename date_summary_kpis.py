@@ -5,6 +5,17 @@ from db_utils_summary import get_price_summary_by_date
 from date_utils import is_past_date
 from kpis import create_kpi_card
 
+def create_unavailable_summary():
+    """Message shown in place of the date summary KPIs when they can't be loaded"""
+    return html.Div([
+        html.H4("Date Summary KPIs", className="text-center mb-3"),
+        html.Div(
+            html.P("Unable to load KPI data. Please try another date.", 
+                   className="text-center text-warning p-3"),
+            className="border border-warning rounded p-3"
+        )
+    ], id="date-summary-kpis-container", className="mt-4")
+
 def create_date_summary_kpis(date_of_journey=None):
     """
     Create 6 KPI cards (3 per row) showing price summaries for a selected past date
@@ -18,6 +29,8 @@ def create_date_summary_kpis(date_of_journey=None):
     try:
         # Get price summary data for the selected date
         price_summary = get_price_summary_by_date(date_of_journey)
+        if price_summary is None:
+            return create_unavailable_summary()
         
         # Extract data for easier access
         seat_prices = price_summary['seat_prices']
@@ -112,11 +125,4 @@ def create_date_summary_kpis(date_of_journey=None):
     except Exception as e:
         print(f"ERROR in create_date_summary_kpis: {str(e)}")
         # Return a more user-friendly error message
-        return html.Div([
-            html.H4("Date Summary KPIs", className="text-center mb-3"),
-            html.Div(
-                html.P("Unable to load KPI data. Please try another date.", 
-                       className="text-center text-warning p-3"),
-                className="border border-warning rounded p-3"
-            )
-        ], id="date-summary-kpis-container", className="mt-4")
+        return create_unavailable_summary()
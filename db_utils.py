@@ -1,6 +1,12 @@
+import threading
+import uuid
 import psycopg2
 import pandas as pd
+import numpy as np
 from sqlalchemy import create_engine
+from callback_metrics import track_db_time
+from dimension_cache import get_dimensions, get_schedule_dimension
+from demand_index import normalize_demand_index
 
 # Database connection parameters
 DB_NAME = "dynamic_pricing_db"
@@ -9,6 +15,21 @@ DB_PASSWORD = "Ghost143"
 DB_HOST = "localhost"
 DB_PORT = "5432"
 
+# Connection pool shared by all callbacks (and their concurrent fetches)
+DB_POOL_SIZE = 10
+DB_MAX_OVERFLOW = 20
+DB_POOL_RECYCLE = 1800
+
+# Rows pulled from the server per round trip by stream_query
+STREAM_FETCH_SIZE = 10000
+
+# Most rows an interactive callback reads from one query (see execute_bounded_query)
+INTERACTIVE_ROW_BUDGET = 200000
+
+# One engine per connection string, so changing the DB_* settings gets a new pool
+_engines = {}
+_engines_lock = threading.Lock()
+
 def get_connection():
     """Establish a connection to the PostgreSQL database"""
     try:
@@ -25,14 +46,31 @@ def get_connection():
         return None
 
 def get_engine():
-    """Create SQLAlchemy engine for database connection"""
-    try:
-        connection_string = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-        engine = create_engine(connection_string)
+    """Get the shared SQLAlchemy engine, creating its connection pool on first use"""
+    connection_string = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    engine = _engines.get(connection_string)
+    if engine is not None:
         return engine
-    except Exception as e:
-        print(f"Error creating SQLAlchemy engine: {e}")
-        return None
+
+    with _engines_lock:
+        engine = _engines.get(connection_string)
+        if engine is None:
+            try:
+                engine = create_engine(
+                    connection_string,
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_pre_ping=True,
+                    pool_recycle=DB_POOL_RECYCLE
+                )
+                _engines[connection_string] = engine
+            except Exception as e:
+                print(f"Error creating SQLAlchemy engine: {e}")
+                return None
+    return engine
+
+class DataUnavailable(Exception):
+    """A query behind a result failed, as opposed to finding no data"""
 
 def execute_query(query, params=None, fetch=True):
     """Execute a SQL query and return results as a pandas DataFrame"""
@@ -41,19 +79,115 @@ def execute_query(query, params=None, fetch=True):
         return None
     
     try:
-        if fetch:
-            df = pd.read_sql_query(query, engine, params=params)
-            return df
-        else:
-            with engine.connect() as connection:
-                connection.execute(query, params)
-            return None
+        # Time spent here is reported as DB time on the /metrics endpoint
+        with track_db_time():
+            if fetch:
+                df = pd.read_sql_query(query, engine, params=params)
+                return df
+            else:
+                with engine.connect() as connection:
+                    connection.execute(query, params)
+                return None
     except Exception as e:
         print(f"Error executing query: {e}")
         return None
 
+def stream_query(query, params=None, fetch_size=STREAM_FETCH_SIZE, max_rows=None, dtypes=None, as_numpy=False,
+                 connection=None, empty_chunk=False):
+    """Execute a SQL query through a server-side cursor and yield the results in chunks
+
+    Only one chunk of fetch_size rows is held in memory at a time, so large
+    results can be aggregated or exported without materializing them.
+
+    Args:
+        fetch_size (int): Rows fetched from the server per chunk
+        max_rows (int): Stop after this many rows (with a warning), None for no limit
+        dtypes (dict): Column -> dtype to convert the chunks to, 'numeric' parses
+                       TEXT numbers with pd.to_numeric
+        as_numpy (bool): Yield dicts of column -> NumPy array instead of DataFrames
+        connection: DB-API connection to use (and close) instead of one from the engine
+        empty_chunk (bool): Yield one chunk without rows, with the result's columns, when
+                            the result is empty
+
+    Yields:
+        DataFrame or dict: The next chunk of rows
+    """
+    if connection is None:
+        engine = get_engine()
+        if not engine:
+            return
+        connection = engine.raw_connection()
+
+    try:
+        # A named cursor keeps the result on the server, rows are pulled fetch_size at a time
+        cursor = connection.cursor(name=f"stream_{uuid.uuid4().hex}")
+        cursor.itersize = fetch_size
+        with track_db_time():
+            cursor.execute(query, params)
+
+        row_count = 0
+        while True:
+            # Time spent here is reported as DB time on the /metrics endpoint
+            with track_db_time():
+                rows = cursor.fetchmany(fetch_size)
+            if not rows and not (empty_chunk and row_count == 0):
+                break
+            if max_rows is not None and row_count + len(rows) > max_rows:
+                rows = rows[:max_rows - row_count]
+                print(f"⚠️ Query result truncated at the row budget of {max_rows} rows")
+
+            columns = [column[0] for column in cursor.description]
+            chunk = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+            for column, dtype in (dtypes or {}).items():
+                if column in chunk.columns:
+                    chunk[column] = (pd.to_numeric(chunk[column], errors='coerce') if dtype == 'numeric'
+                                     else chunk[column].astype(dtype))
+            row_count += len(chunk)
+            yield {column: chunk[column].to_numpy() for column in chunk.columns} if as_numpy else chunk
+
+            if not rows or (max_rows is not None and row_count >= max_rows):
+                break
+        cursor.close()
+    finally:
+        # Read-only, end the transaction the named cursor lived in and return the connection to the pool
+        connection.rollback()
+        connection.close()
+
+def execute_bounded_query(query, params=None, max_rows=INTERACTIVE_ROW_BUDGET, fetch_size=STREAM_FETCH_SIZE):
+    """Execute a SQL query like execute_query, reading at most max_rows rows
+
+    For queries behind interactive callbacks, whose filters may be left open.
+    Returns a DataFrame, or None if the query failed. When the result had more
+    rows, only the first max_rows are returned and df.attrs['truncated'] is set,
+    see is_truncated.
+    """
+    try:
+        # One row past the budget tells whether the result was cut
+        chunks = list(stream_query(query, params, fetch_size=fetch_size, max_rows=max_rows + 1))
+    except Exception as e:
+        print(f"Error executing query: {e}")
+        return None
+    if not chunks:
+        df = pd.DataFrame()
+    else:
+        df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    truncated = len(df) > max_rows
+    if truncated:
+        df = df.iloc[:max_rows]
+    df.attrs['truncated'] = truncated
+    df.attrs['row_budget'] = max_rows
+    return df
+
+def is_truncated(df):
+    """Whether a frame from execute_bounded_query holds only part of its query's rows"""
+    return df is not None and bool(df.attrs.get('truncated', False))
+
 def get_schedule_ids():
     """Get unique schedule IDs from seat_prices_partitioned table"""
+    dimensions = get_dimensions()
+    if dimensions is not None:
+        return list(dimensions['schedule_ids'])
+
     query = """
     SELECT DISTINCT "schedule_id" 
     FROM seat_prices_partitioned
@@ -66,6 +200,10 @@ def get_schedule_ids():
 
 def get_operators():
     """Get unique operators from seat_prices_partitioned table"""
+    dimensions = get_dimensions()
+    if dimensions is not None:
+        return list(dimensions['operators'])
+
     query = """
     SELECT DISTINCT "operator_id" 
     FROM seat_prices_partitioned
@@ -78,6 +216,10 @@ def get_operators():
 
 def get_seat_types():
     """Get unique seat types from seat_prices_partitioned table"""
+    dimensions = get_dimensions()
+    if dimensions is not None:
+        return list(dimensions['seat_types'])
+
     query = """
     SELECT DISTINCT "seat_type" 
     FROM seat_prices_partitioned
@@ -92,6 +234,10 @@ def get_seat_types_by_schedule_id(schedule_id):
     """Get unique seat types for a specific schedule_id from seat_wise_prices_partitioned table"""
     if not schedule_id:
         return []
+
+    schedule = get_schedule_dimension(schedule_id)
+    if schedule is not None and schedule['seat_types']:
+        return list(schedule['seat_types'])
         
     query = """
     SELECT DISTINCT "seat_type" 
@@ -111,73 +257,6 @@ def get_seat_types_by_schedule_id(schedule_id):
     
     return []
 
-def get_operator_id_by_schedule_id(schedule_id):
-    """Get operator_id for a specific schedule_id"""
-    if not schedule_id:
-        return None
-    
-    # Convert schedule_id to string to ensure consistency
-    schedule_id = str(schedule_id)
-    
-    try:
-        query = """
-        SELECT DISTINCT "operator_id"
-        FROM seat_prices_partitioned
-        WHERE "schedule_id" = %(schedule_id)s
-        LIMIT 1
-        """
-        
-        params = {'schedule_id': schedule_id}
-        df = execute_query(query, params)
-        
-        if df is not None and not df.empty and 'operator_id' in df.columns:
-            operator_id = df['operator_id'].iloc[0]
-            return operator_id
-        else:
-            return None
-    except Exception as e:
-        print(f"Error getting operator_id for schedule_id {schedule_id}: {e}")
-        return None
-
-
-def get_origin_destination_by_schedule_id(schedule_id):
-    """Get origin and destination information for a specific schedule_id"""
-    if not schedule_id:
-        return None, None, None, None
-    
-    # Convert schedule_id to string to ensure consistency
-    schedule_id = str(schedule_id)
-    
-    try:
-        query = """
-        SELECT DISTINCT "origin_id", "destination_id", "op_origin", "op_destination"
-        FROM seat_wise_prices_partitioned
-        WHERE "schedule_id" = %(schedule_id)s
-        LIMIT 1
-        """
-        
-        params = {'schedule_id': schedule_id}
-        df = execute_query(query, params)
-        
-        if df is not None and not df.empty:
-            origin_id = df['origin_id'].iloc[0] if 'origin_id' in df.columns else None
-            destination_id = df['destination_id'].iloc[0] if 'destination_id' in df.columns else None
-            op_origin = df['op_origin'].iloc[0] if 'op_origin' in df.columns else None
-            op_destination = df['op_destination'].iloc[0] if 'op_destination' in df.columns else None
-            
-            # Map origin_id to name
-            origin_name = "Santiago" if origin_id == 1646 else "Other"
-            
-            # Map destination_id to name
-            destination_name = "La Serena" if destination_id == 1821 else "Other"
-            
-            return origin_id, destination_id, origin_name, destination_name
-        else:
-            return None, None, None, None
-    except Exception as e:
-        print(f"Error getting origin/destination for schedule_id {schedule_id}: {e}")
-        return None, None, None, None
-
 def get_seat_wise_prices(schedule_id, hours_before_departure=None):
     """Get seat-wise pricing data for a specific schedule_id and hours_before_departure
     
@@ -368,8 +447,13 @@ def get_model_price(schedule_id, seat_type, hours_before_departure):
         print(f"Error getting model price: {e}")
         return None
 
-def get_filtered_data(schedule_id=None, operator_id=None, seat_type=None, hours_before_departure=None, date_of_journey=None):
-    """Get filtered data based on selected filters"""
+def build_filtered_data_query(schedule_id=None, operator_id=None, seat_type=None, hours_before_departure=None, date_of_journey=None,
+                              ordered=True):
+    """Query and params selecting the seat prices matching the dashboard filters, newest first if ordered
+
+    Returns:
+        tuple: (query, params, where_clause)
+    """
     where_clauses = ["1=1"]  # Default where clause that's always true
     params = {}
     
@@ -420,10 +504,17 @@ def get_filtered_data(schedule_id=None, operator_id=None, seat_type=None, hours_
         sp.*
     FROM seat_prices_partitioned sp
     WHERE {where_clause}
-    ORDER BY "TimeAndDateStamp" DESC
+    {'ORDER BY "TimeAndDateStamp" DESC' if ordered else ''}
     """
-    
-    df = execute_query(query, params)
+    return query, params, where_clause
+
+def get_filtered_data(schedule_id=None, operator_id=None, seat_type=None, hours_before_departure=None, date_of_journey=None):
+    """Get filtered data based on selected filters"""
+    query, params, where_clause = build_filtered_data_query(
+        schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
+
+    # Bounded, with no filters selected this would be the whole table
+    df = execute_bounded_query(query, params)
     
     # Debug output
     print(f"Query: {query}")
@@ -437,35 +528,56 @@ def get_filtered_data(schedule_id=None, operator_id=None, seat_type=None, hours_
     
     return df
 
+def get_route_names(origin_id, destination_id):
+    """Names of a route's origin and destination
+
+    This is a simplified mapping - in a real application, you would query a locations table.
+    Ids are compared as strings, they are TEXT in the route and dimension tables.
+    """
+    origin_name = "Santiago" if str(origin_id) == "1646" else "Other"
+    destination_name = "La Serena" if str(destination_id) == "1821" else "Other"
+    return origin_name, destination_name
+
 def get_origin_destination_by_schedule_id(schedule_id):
-    """Get origin and destination information for a schedule ID"""
+    """Get origin and destination information for a schedule ID
+
+    Read from the route dimension maintained by the loader (see route_dimension.py),
+    then the dimension cache, then the seat-wise rows.
+    """
     if not schedule_id:
         return None, None, None, None
-    
+
+    # Convert schedule_id to string to avoid type mismatch issues
+    params = {'schedule_id': str(schedule_id)}
+    df = execute_query("""
+    SELECT "origin_id", "destination_id"
+    FROM route_schedules
+    WHERE "schedule_id" = %(schedule_id)s AND "origin_id" IS NOT NULL
+    """, params)
+    if df is not None and not df.empty:
+        origin_id, destination_id = df['origin_id'].iloc[0], df['destination_id'].iloc[0]
+        return (origin_id, destination_id) + get_route_names(origin_id, destination_id)
+
+    schedule = get_schedule_dimension(schedule_id)
+    if schedule is not None and schedule['origin_id'] is not None:
+        origin_id = schedule['origin_id']
+        destination_id = schedule['destination_id']
+        return (origin_id, destination_id) + get_route_names(origin_id, destination_id)
+
     try:
-        # Convert schedule_id to string to avoid type mismatch issues
-        schedule_id_str = str(schedule_id)
-        
+        # Route dimension not built yet, or the schedule isn't in it
         query = """
         SELECT DISTINCT "origin_id", "destination_id" 
         FROM seat_wise_prices_partitioned
         WHERE "schedule_id" = %(schedule_id)s::text
         LIMIT 1
         """
-        
-        params = {'schedule_id': schedule_id_str}
         df = execute_query(query, params)
         
         if df is not None and not df.empty:
             origin_id = df['origin_id'].iloc[0] if 'origin_id' in df.columns else None
             destination_id = df['destination_id'].iloc[0] if 'destination_id' in df.columns else None
-            
-            # Map origin_id and destination_id to names
-            # This is a simplified mapping - in a real application, you would query a locations table
-            origin_name = "Santiago" if origin_id == 1646 else "Other"
-            destination_name = "La Serena" if destination_id == 1821 else "Other"
-            
-            return origin_id, destination_id, origin_name, destination_name
+            return (origin_id, destination_id) + get_route_names(origin_id, destination_id)
         else:
             print(f"No origin/destination data found for schedule ID: {schedule_id}")
             return None, None, "Unknown", "Unknown"
@@ -554,75 +666,80 @@ def get_distinct_prices_by_date_operator_time(date_of_journey, operator_id, depa
         return None
 
 
-def get_seat_wise_data(schedule_id=None, hours_before_departure=None, date_of_journey=None):
-    """Get seat-wise data based on selected filters"""
+# Columns of seat_wise_prices_partitioned that get_seat_wise_data can return
+SEAT_WISE_COLUMNS = (
+    "schedule_id", "seat_number", "seat_type", "final_price", "actual_fare",
+    "coach_layout_id", "sales_count", "sales_percentage", "operator_reservation_id",
+    "travel_id", "origin_id", "destination_id", "travel_date", "op_origin", "op_destination",
+    "TimeAndDateStamp"
+)
+
+# Columns returned by default, the ones the seat-wise charts use
+SEAT_WISE_DATA_COLUMNS = (
+    "schedule_id", "seat_number", "seat_type", "final_price", "actual_fare",
+    "sales_count", "sales_percentage", "TimeAndDateStamp"
+)
+
+def get_seat_wise_data(schedule_id=None, hours_before_departure=None, date_of_journey=None, columns=SEAT_WISE_DATA_COLUMNS):
+    """Get seat-wise data based on selected filters
+
+    The hour and date filters are resolved to snapshots of seat_prices_partitioned (the rows
+    behind the fnGetHoursBeforeDeparture and dateofjourney views) and joined in the same query,
+    so only the matching seat rows are transferred.
+    """
+    unknown_columns = [col for col in columns if col not in SEAT_WISE_COLUMNS]
+    if unknown_columns:
+        print(f"Error in get_seat_wise_data: unknown columns {unknown_columns}")
+        return None
+    select_list = ", ".join(f'swp."{col}"' for col in columns)
+    
     where_clauses = []
     params = {}
     
     if schedule_id:
-        where_clauses.append('"schedule_id" = %(schedule_id)s')
+        where_clauses.append('swp."schedule_id" = %(schedule_id)s')
         params['schedule_id'] = schedule_id
     
-    where_clause = " AND ".join(where_clauses) if where_clauses else "1=1"
+    # Snapshots matching the hour and date filters
+    snapshot_filters = []
+    snapshot_columns = []
+    if hours_before_departure is not None:
+        snapshot_filters.append('"hours_before_departure" = %(hours_before_departure)s')
+        snapshot_columns.append('"hours_before_departure"')
+        params['hours_before_departure'] = hours_before_departure
+    if date_of_journey is not None:
+        snapshot_filters.append('"date_of_journey" = %(date_of_journey)s')
+        snapshot_columns.append('"date_of_journey"')
+        params['date_of_journey'] = date_of_journey
     
-    query = f"""
-    SELECT * FROM seat_wise_prices_partitioned
-    WHERE {where_clause}
-    ORDER BY "TimeAndDateStamp" DESC
-    """    
-    df = execute_query(query, params)
+    where_clause = " AND ".join(where_clauses) if where_clauses else "1=1"
     
-    # If hours_before_departure is specified, filter the data further
-    if df is not None and not df.empty and hours_before_departure is not None:
-        # Get the hours_before_departure data for the current schedule_id
-        hbd_query = f"""
-        SELECT * FROM fnGetHoursBeforeDeparture
-        WHERE "schedule_id" = %(schedule_id)s
-        AND "hours_before_departure" = %(hours_before_departure)s
+    if snapshot_filters:
+        if schedule_id:
+            snapshot_filters.insert(0, '"schedule_id" = %(schedule_id)s')
+        query = f"""
+        WITH snapshots AS (
+            SELECT DISTINCT "schedule_id", "TimeAndDateStamp", {", ".join(snapshot_columns)}
+            FROM seat_prices_partitioned
+            WHERE {" AND ".join(snapshot_filters)}
+        )
+        SELECT {select_list}, {", ".join(f"s.{col}" for col in snapshot_columns)}
+        FROM seat_wise_prices_partitioned swp
+        JOIN snapshots s
+            ON s."schedule_id" = swp."schedule_id"
+            AND s."TimeAndDateStamp" = swp."TimeAndDateStamp"
+        WHERE {where_clause}
+        ORDER BY swp."TimeAndDateStamp" DESC
         """
-        
-        hbd_params = {
-            'schedule_id': schedule_id,
-            'hours_before_departure': hours_before_departure
-        }
-        
-        hbd_df = execute_query(hbd_query, hbd_params)
-        
-        if hbd_df is not None and not hbd_df.empty:
-            # Merge the data based on schedule_id and TimeAndDateStamp
-            df = pd.merge(
-                df,
-                hbd_df,
-                on=['schedule_id', 'TimeAndDateStamp'],
-                how='inner'
-            )
-    
-    # If date_of_journey is specified, filter the data further
-    if df is not None and not df.empty and date_of_journey is not None:
-        # Get the date_of_journey data
-        doj_query = f"""
-        SELECT * FROM dateofjourney
-        WHERE "schedule_id" = %(schedule_id)s
-        AND "date_of_journey" = %(date_of_journey)s
+    else:
+        query = f"""
+        SELECT {select_list} FROM seat_wise_prices_partitioned swp
+        WHERE {where_clause}
+        ORDER BY swp."TimeAndDateStamp" DESC
         """
-        
-        doj_params = {
-            'schedule_id': schedule_id,
-            'date_of_journey': date_of_journey
-        }
-        
-        doj_df = execute_query(doj_query, doj_params)
-        
-        if doj_df is not None and not doj_df.empty:
-            # Merge the data based on schedule_id and TimeAndDateStamp
-            df = pd.merge(
-                df,
-                doj_df,
-                on=['schedule_id', 'TimeAndDateStamp'],
-                how='inner'
-            )
     
-    return df
+    # Bounded, a long-lived schedule without an hour or date filter has a lot of seat rows
+    return execute_bounded_query(query, params)
     
     # Now get all seat types that have data for this schedule and snapshot time
     seat_types_query = """
@@ -658,6 +775,10 @@ def get_seat_wise_data(schedule_id=None, hours_before_departure=None, date_of_jo
 
 def get_hours_before_departure(schedule_id=None):
     """Get hours before departure data from seat_prices_partitioned table"""
+    schedule = get_schedule_dimension(schedule_id)
+    if schedule is not None and schedule['hours_before_departure']:
+        return list(schedule['hours_before_departure'])
+
     # Use the query directly from the seat_prices_partitioned table as provided by the user
     if schedule_id:
         query = """
@@ -710,6 +831,10 @@ def get_hours_before_departure(schedule_id=None):
 
 def get_all_dates_of_journey():
     """Get all available dates of journey from dateofjourney view"""
+    dimensions = get_dimensions()
+    if dimensions is not None and dimensions['dates_of_journey']:
+        return list(dimensions['dates_of_journey'])
+
     query = """
     SELECT DISTINCT "date_of_journey" 
     FROM dateofjourney
@@ -734,7 +859,14 @@ def get_all_dates_of_journey():
     return []
 
 def get_schedule_ids_by_date(date_of_journey=None):
-    """Get schedule IDs for a specific date of journey"""
+    """Get schedule IDs for a specific date of journey, None if the query failed"""
+    dimensions = get_dimensions()
+    if dimensions is not None:
+        if not date_of_journey:
+            return list(dimensions['schedule_ids'])
+        if date_of_journey in dimensions['schedules_by_date']:
+            return list(dimensions['schedules_by_date'][date_of_journey])
+
     where_clauses = []
     params = {}
     
@@ -756,11 +888,14 @@ def get_schedule_ids_by_date(date_of_journey=None):
     
     try:
         df = execute_query(query, params)
-        if df is not None and not df.empty:
+        if df is None:
+            return None
+        if not df.empty:
             print(f"Found {len(df)} schedule IDs for date {date_of_journey}")
             return df['schedule_id'].tolist()
     except Exception as e:
         print(f"Error getting schedule IDs by date: {e}")
+        return None
     
     return []
 
@@ -956,6 +1091,63 @@ def get_demand_index(schedule_id, hours_before_departure=None, seat_type=None):
         print(f"ERROR in get_demand_index: {e}")
         return None
 
+def get_occupancy_and_demand_by_seat_type(schedule_id, hours_before_departure=None):
+    """Latest occupancy, expected occupancy and demand index of every seat type of a schedule, in one query
+
+    Returns:
+        dict: seat_type -> {'actual_occupancy', 'expected_occupancy', 'demand_index_value', 'demand_index_label'},
+              empty if nothing was found, None if the query failed
+    """
+    if not schedule_id:
+        return {}
+    
+    params = {'schedule_id': str(schedule_id)}
+    hours_clause = ""
+    if hours_before_departure is not None:
+        hours_clause = 'AND ABS(("hours_before_departure")::float - %(hours_before_departure)s) < 0.01'
+        params['hours_before_departure'] = float(hours_before_departure)
+    
+    query_template = """
+    SELECT DISTINCT ON ("seat_type")
+        "seat_type",
+        "actual_occupancy"::NUMERIC(10,2) AS "actual_occupancy",
+        "expected_occupancy"::NUMERIC(10,2) AS "expected_occupancy",
+        {demand_index_columns}
+    FROM seat_prices_partitioned
+    WHERE "schedule_id" = %(schedule_id)s
+      {hours_clause}
+    ORDER BY "seat_type", "TimeAndDateStamp" DESC
+    """
+    
+    # demand_index_value and demand_index_label are filled by the loader (see demand_index.py)
+    df = execute_query(query_template.format(
+        demand_index_columns='"demand_index_value", "demand_index_label", "demand_index"',
+        hours_clause=hours_clause), params)
+    if df is None:
+        # Typed columns not added yet, normalize the raw values of these few rows here
+        df = execute_query(query_template.format(demand_index_columns='"demand_index"', hours_clause=hours_clause), params)
+        if df is None:
+            return None
+        df['demand_index_value'] = np.nan
+        df['demand_index_label'] = None
+    if df.empty:
+        return {}
+    
+    # Rows loaded before the typed columns existed and not backfilled yet
+    untyped = df['demand_index_value'].isna() & df['demand_index_label'].isna() & df['demand_index'].notna()
+    if untyped.any():
+        values, labels = normalize_demand_index(df.loc[untyped, 'demand_index'])
+        df['demand_index_value'] = df['demand_index_value'].astype(float)
+        df['demand_index_label'] = df['demand_index_label'].astype(object)
+        df.loc[untyped, 'demand_index_value'] = values
+        df.loc[untyped, 'demand_index_label'] = labels
+    
+    df['actual_occupancy'] = pd.to_numeric(df['actual_occupancy'], errors='coerce').fillna(0).round(2)
+    df['expected_occupancy'] = pd.to_numeric(df['expected_occupancy'], errors='coerce').fillna(0).round(2)
+    
+    columns = ['actual_occupancy', 'expected_occupancy', 'demand_index_value', 'demand_index_label']
+    return df.set_index('seat_type')[columns].to_dict('index')
+
 def get_operator_name_by_id(operator_id):
     """Get operator name based on operator_id
     
@@ -999,6 +1191,10 @@ def get_operator_id_by_schedule_id(schedule_id):
     if not schedule_id:
         print("DEBUG: schedule_id is None or empty")
         return None
+
+    schedule = get_schedule_dimension(schedule_id)
+    if schedule is not None and schedule['operator_id'] is not None:
+        return schedule['operator_id']
         
     query = """
     SELECT DISTINCT "operator_id" 
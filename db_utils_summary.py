@@ -4,7 +4,8 @@ from db_utils import execute_query, get_schedule_ids_by_date, get_seat_types_by_
 def get_price_summary_by_date(date_of_journey):
     """
     Get summary of actual and model prices for all schedule IDs on a given date
-    Returns total actual price, total model price, and delta for both seat_prices_raw and seat_wise_prices_raw
+    Returns total actual price, total model price, and delta for both seat_prices_raw and seat_wise_prices_raw,
+    or None if a query failed
     """
     print(f"DEBUG: Getting price summary for date: {date_of_journey}")
     
@@ -19,6 +20,9 @@ def get_price_summary_by_date(date_of_journey):
         # Get all schedule IDs for the selected date
         schedule_ids = get_schedule_ids_by_date(date_of_journey)
         print(f"DEBUG: Found schedule IDs for date {date_of_journey}: {schedule_ids}")
+        if schedule_ids is None:
+            print(f"Error calculating price summary: could not get schedule IDs for date {date_of_journey}")
+            return None
         
         if not schedule_ids:
             print(f"DEBUG: No schedule IDs found for date {date_of_journey}")
@@ -118,6 +122,10 @@ def get_price_summary_by_date(date_of_journey):
         seat_wise_prices_df = execute_query(seat_wise_prices_query)
         print(f"DEBUG: Seat wise prices query result shape: {seat_wise_prices_df.shape if seat_wise_prices_df is not None else 'None'}")
         
+        if seat_prices_df is None or seat_wise_prices_df is None:
+            print(f"Error calculating price summary: query failed for date {date_of_journey}")
+            return None
+        
         # Calculate sums for seat_prices_raw
         seat_prices_summary = {
             'actual_sum': 0,
@@ -167,7 +175,4 @@ def get_price_summary_by_date(date_of_journey):
         
     except Exception as e:
         print(f"Error calculating price summary: {e}")
-        return {
-            'seat_prices': {'actual_sum': 0, 'model_sum': 0, 'delta': 0},
-            'seat_wise_prices': {'actual_sum': 0, 'model_sum': 0, 'delta': 0}
-        }
+        return None
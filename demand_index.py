@@ -0,0 +1,100 @@
+"""
+Typed demand index.
+
+The demand_index column of the seat price files holds either a number or a
+label such as 'M/L'. It is stored as TEXT, so every reader used to parse it row
+by row. The loader now splits it once at ingest into two typed columns:
+
+    demand_index_value  DOUBLE PRECISION  the numeric index, NULL for labels
+    demand_index_label  TEXT              the label, NULL for numbers
+
+Rows loaded before the columns existed are normalized with:
+    python demand_index.py
+"""
+import numpy as np
+import pandas as pd
+
+from seat_wise_aggregates import NUMERIC_PATTERN
+
+# Tables holding a demand_index column, partitioned tables are altered only if they exist
+DEMAND_INDEX_TABLES = (
+    "seat_prices_raw", "seat_prices_with_dt",
+    "seat_prices_partitioned", "seat_prices_with_dt_partitioned"
+)
+
+
+def normalize_demand_index(values):
+    """Split raw demand index values into (numeric values, labels)
+
+    Returns:
+        tuple: Two arrays, float64 with NaN for labels and missing values, and object
+               with the label or None
+    """
+    raw = pd.Series(values, dtype=object)
+    numeric = pd.to_numeric(raw, errors='coerce')
+    text = raw.astype(str).str.strip()
+    is_label = numeric.isna() & raw.notna() & (text != '')
+    labels = text.where(is_label, None).to_numpy(dtype=object)
+    return numeric.to_numpy(dtype=np.float64), labels
+
+
+def add_demand_index_columns(df):
+    """Add the typed demand index columns to a loaded seat price frame (in place)"""
+    if 'demand_index' in df.columns:
+        df['demand_index_value'], df['demand_index_label'] = normalize_demand_index(df['demand_index'])
+    return df
+
+
+def format_demand_index(value, label):
+    """Display text for a demand index, a label as is and a number with two decimals"""
+    if label is not None and not pd.isna(label):
+        return str(label)
+    if value is not None and not pd.isna(value):
+        return f"{float(value):.2f}"
+    return "N/A"
+
+
+def ensure_demand_index_columns(conn):
+    """Add the typed columns to the seat price tables"""
+    with conn.cursor() as cur:
+        for table_name in DEMAND_INDEX_TABLES:
+            cur.execute(f"""
+                ALTER TABLE IF EXISTS {table_name}
+                    ADD COLUMN IF NOT EXISTS "demand_index_value" DOUBLE PRECISION,
+                    ADD COLUMN IF NOT EXISTS "demand_index_label" TEXT;
+            """)
+    conn.commit()
+
+
+def backfill_demand_index(conn):
+    """Normalize rows that were loaded before the typed columns existed"""
+    ensure_demand_index_columns(conn)
+    updated = 0
+    with conn.cursor() as cur:
+        for table_name in DEMAND_INDEX_TABLES:
+            cur.execute("SELECT to_regclass(%s)", (table_name,))
+            if cur.fetchone()[0] is None:
+                continue
+            cur.execute(f"""
+                UPDATE {table_name}
+                SET "demand_index_value" = CASE WHEN TRIM("demand_index"::TEXT) ~ %(pattern)s
+                                                THEN TRIM("demand_index"::TEXT)::DOUBLE PRECISION END,
+                    "demand_index_label" = CASE WHEN TRIM("demand_index"::TEXT) !~ %(pattern)s
+                                                THEN TRIM("demand_index"::TEXT) END
+                WHERE "demand_index" IS NOT NULL AND TRIM("demand_index"::TEXT) <> ''
+                  AND "demand_index_value" IS NULL AND "demand_index_label" IS NULL
+            """, {'pattern': NUMERIC_PATTERN})
+            print(f"✅ {table_name}: {cur.rowcount} rows normalized")
+            updated += cur.rowcount
+            conn.commit()
+    return updated
+
+
+if __name__ == "__main__":
+    from load_to_postgres import get_connection
+
+    conn = get_connection()
+    try:
+        backfill_demand_index(conn)
+    finally:
+        conn.close()
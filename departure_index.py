@@ -0,0 +1,214 @@
+"""
+Departure time index for the price comparison page.
+
+Finding the departure times two operators share on a date used to take a
+self-join over seat_prices_with_dt_partitioned on every dropdown change. The
+loader now records, as files land, one row per (date_of_journey, operator_id,
+departure_time, seat_type) in a small index table. The dashboard reads the
+rows of a date once per data version into
+
+    operator_id -> {departure_time: frozenset(seat types)}
+
+and answers matching-times questions with set intersections.
+
+Existing data is indexed when the loader first creates the table, or with:
+    python departure_index.py
+
+Dates without index rows are read from the seat price table.
+"""
+import threading
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from db_utils import execute_query
+from data_version import get_data_version, get_scope_version
+
+INDEX_TABLE = "departure_time_index"
+INDEX_COLUMNS = ["date_of_journey", "operator_id", "departure_time", "seat_type"]
+
+# Table the index is built from
+SOURCE_TABLE = "seat_prices_with_dt_partitioned"
+
+# Dates kept in memory, the whole cache is dropped when it grows past this
+MAX_CACHED_DATES = 366
+
+_dates = {}  # date_of_journey -> (data version, operator_id -> {departure_time: frozenset(seat types)})
+_dates_lock = threading.Lock()
+
+
+def ensure_index_table(conn):
+    """Create the index table if it doesn't exist, indexing the data already loaded"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s)", (INDEX_TABLE,))
+        created = cur.fetchone()[0] is None
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {INDEX_TABLE} (
+                "date_of_journey" TEXT NOT NULL,
+                "operator_id" TEXT NOT NULL,
+                "departure_time" TEXT NOT NULL,
+                "seat_type" TEXT NOT NULL,
+                PRIMARY KEY ("date_of_journey", "operator_id", "departure_time", "seat_type")
+            );
+        """)
+    conn.commit()
+
+    if created:
+        print(f"🔄 Indexing existing departure times into {INDEX_TABLE}...")
+        print(f"✅ {_insert_source_rows(conn)} index rows written")
+
+
+def index_frame(df):
+    """Distinct index rows of a loaded seat_prices_with_dt frame
+
+    Returns:
+        DataFrame: INDEX_COLUMNS, empty if the frame lacks any of them
+    """
+    if df is None or df.empty or any(col not in df.columns for col in INDEX_COLUMNS):
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+    rows = df[INDEX_COLUMNS].dropna().astype(str)
+    return rows.drop_duplicates(ignore_index=True)
+
+
+def upsert_index(conn, rows):
+    """Insert index rows that aren't there yet"""
+    if rows is None or rows.empty:
+        return 0
+
+    with conn.cursor() as cur:
+        execute_values(cur, f"""
+            INSERT INTO {INDEX_TABLE} ("date_of_journey", "operator_id", "departure_time", "seat_type")
+            VALUES %s
+            ON CONFLICT DO NOTHING;
+        """, list(rows.itertuples(index=False, name=None)))
+    conn.commit()
+    return len(rows)
+
+
+def _insert_source_rows(conn):
+    """Insert the index rows of everything in SOURCE_TABLE, if it exists"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s)", (SOURCE_TABLE,))
+        if cur.fetchone()[0] is None:
+            return 0
+        cur.execute(f"""
+            INSERT INTO {INDEX_TABLE} ("date_of_journey", "operator_id", "departure_time", "seat_type")
+            SELECT DISTINCT "date_of_journey"::TEXT, "operator_id"::TEXT, "departure_time"::TEXT, "seat_type"::TEXT
+            FROM {SOURCE_TABLE}
+            WHERE "date_of_journey" IS NOT NULL AND "operator_id" IS NOT NULL
+              AND "departure_time" IS NOT NULL AND "seat_type" IS NOT NULL
+            ON CONFLICT DO NOTHING;
+        """)
+        row_count = cur.rowcount
+    conn.commit()
+    return row_count
+
+
+def backfill_index(conn):
+    """Index everything already in seat_prices_with_dt_partitioned"""
+    ensure_index_table(conn)
+    return _insert_source_rows(conn)
+
+
+def fetch_departure_times(date_of_journey):
+    """Read the index rows of one date
+
+    Falls back to the seat price table when the index has no rows for the date
+    (it wasn't indexed) or the index table doesn't exist yet.
+
+    Returns:
+        dict: operator_id -> {departure_time: frozenset(seat types)}, or None if both queries failed
+    """
+    params = {'date_of_journey': str(date_of_journey)}
+    df = execute_query(f"""
+        SELECT "operator_id", "departure_time", "seat_type"
+        FROM {INDEX_TABLE}
+        WHERE "date_of_journey" = %(date_of_journey)s
+    """, params=params)
+    if df is None or df.empty:
+        df = execute_query(f"""
+            SELECT DISTINCT "operator_id"::TEXT AS operator_id,
+                            "departure_time"::TEXT AS departure_time,
+                            "seat_type"::TEXT AS seat_type
+            FROM {SOURCE_TABLE}
+            WHERE "date_of_journey"::TEXT = %(date_of_journey)s
+              AND "departure_time" IS NOT NULL AND "seat_type" IS NOT NULL
+        """, params=params)
+    if df is None:
+        return None
+
+    departure_times = {}
+    for (operator_id, departure_time), seat_types in df.groupby(['operator_id', 'departure_time'], sort=False)['seat_type']:
+        departure_times.setdefault(str(operator_id), {})[str(departure_time)] = frozenset(seat_types.astype(str))
+    return departure_times
+
+
+def fetch_indexed_operators():
+    """Operators in the index, for the operator lists of the comparison pages
+
+    Returns:
+        DataFrame: operator_id, or None if the index table can't be read
+    """
+    return execute_query(f"""
+        SELECT DISTINCT "operator_id"
+        FROM {INDEX_TABLE}
+        ORDER BY "operator_id"
+    """)
+
+
+def get_departure_times(date_of_journey):
+    """Index of one date, read once per data version
+
+    Returns:
+        dict: operator_id -> {departure_time: frozenset(seat types)}, empty if it couldn't be read
+    """
+    key = str(date_of_journey)
+    version = (get_data_version(), get_scope_version([key]))
+    with _dates_lock:
+        entry = _dates.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    departure_times = fetch_departure_times(date_of_journey)
+    if departure_times is None:
+        return {}
+    with _dates_lock:
+        if len(_dates) >= MAX_CACHED_DATES:
+            _dates.clear()
+        _dates[key] = (version, departure_times)
+    return departure_times
+
+
+def matching_departure_times(date_of_journey, operator1_id, operator2_id, same_seat_types=False):
+    """Departure times both operators have on a date
+
+    Args:
+        same_seat_types (bool): Only keep times where the operators share at least one seat type
+
+    Returns:
+        list: Sorted departure times
+    """
+    departure_times = get_departure_times(date_of_journey)
+    times1 = departure_times.get(str(operator1_id), {})
+    times2 = departure_times.get(str(operator2_id), {})
+    matching = times1.keys() & times2.keys()
+    if same_seat_types:
+        matching = {time for time in matching if times1[time] & times2[time]}
+    return sorted(matching)
+
+
+def has_departure_times(date_of_journey, *operator_ids):
+    """Whether any of the operators has a departure time on the date"""
+    departure_times = get_departure_times(date_of_journey)
+    return any(departure_times.get(str(operator_id)) for operator_id in operator_ids)
+
+
+if __name__ == "__main__":
+    from load_to_postgres import get_connection
+
+    conn = get_connection()
+    try:
+        print(f"🔄 Backfilling {INDEX_TABLE}...")
+        print(f"✅ {backfill_index(conn)} index rows written")
+    finally:
+        conn.close()
@@ -0,0 +1,255 @@
+"""
+Dimension cache for the dropdown sources.
+
+Dates of journey, schedule ids, operators, seat types, hours before departure and
+origin/destination used to be DISTINCT scans over the fact tables on every
+dropdown interaction. They are kept here as one small snapshot per schedule:
+
+    schedule_id -> dates of journey, operator, origin, destination, seat types, hours
+
+from which the date -> schedules index and the global lists are derived in memory.
+
+The snapshot is a JSON file, so all gunicorn workers share it: each worker reloads
+it when the file's modification time changes. load_to_postgres.py updates it
+incrementally for the schedules it just loaded; if the file doesn't exist yet, the
+first worker that needs it builds it in the background. The getters in db_utils
+fall back to querying the database whenever the cache can't answer.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+DIMENSION_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "dimensions.json")
+
+# How often a worker checks whether the snapshot file changed
+SNAPSHOT_CHECK_SECONDS = 1.0
+
+# Minimum time between two attempts to build a missing snapshot
+BUILD_RETRY_SECONDS = 60
+
+_dimensions = None
+_snapshot_mtime = None
+_last_check = 0
+_dimensions_lock = threading.Lock()
+_build_thread = None
+_last_build_attempt = -BUILD_RETRY_SECONDS
+
+
+def _clean(values):
+    """Drop NULLs from an array_agg result"""
+    return [str(value) for value in values or [] if value is not None]
+
+
+def format_hours(values):
+    """Sort and format hours before departure the same way get_hours_before_departure does"""
+    hours = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').dropna()
+    unique_values = sorted(hours.unique().tolist(), reverse=True)
+    return [str(int(val)) if float(val).is_integer() else str(val) for val in unique_values]
+
+
+def query_schedule_dimensions(schedule_ids=None):
+    """Aggregate the dimension values per schedule, for all schedules or the given ones
+
+    Returns:
+        dict: schedule_id -> dimension values, or None if the queries failed
+    """
+    # Imported here, db_utils consults this module in its getters
+    from db_utils import execute_query
+
+    where_clause = 'WHERE "schedule_id" = ANY(%(schedule_ids)s)' if schedule_ids is not None else ""
+    params = {'schedule_ids': list(schedule_ids)} if schedule_ids is not None else None
+
+    prices_query = f"""
+    SELECT "schedule_id",
+           array_agg(DISTINCT "date_of_journey") AS dates_of_journey,
+           MIN("operator_id") AS operator_id,
+           array_agg(DISTINCT "seat_type") AS price_seat_types,
+           array_agg(DISTINCT "hours_before_departure") AS hours_before_departure
+    FROM seat_prices_partitioned
+    {where_clause}
+    GROUP BY "schedule_id"
+    """
+    seat_wise_query = f"""
+    SELECT "schedule_id",
+           array_agg(DISTINCT "seat_type") AS seat_types,
+           MIN("origin_id") AS origin_id,
+           MIN("destination_id") AS destination_id
+    FROM seat_wise_prices_partitioned
+    {where_clause}
+    GROUP BY "schedule_id"
+    """
+
+    prices_df = execute_query(prices_query, params)
+    seat_wise_df = execute_query(seat_wise_query, params)
+    if prices_df is None or seat_wise_df is None:
+        return None
+
+    schedules = {}
+    for row in prices_df.itertuples(index=False):
+        schedules[str(row.schedule_id)] = {
+            'dates_of_journey': sorted(_clean(row.dates_of_journey)),
+            'operator_id': row.operator_id,
+            'price_seat_types': sorted(_clean(row.price_seat_types)),
+            'hours_before_departure': format_hours(row.hours_before_departure),
+            'seat_types': [],
+            'origin_id': None,
+            'destination_id': None,
+        }
+    for row in seat_wise_df.itertuples(index=False):
+        schedule = schedules.setdefault(str(row.schedule_id), {
+            'dates_of_journey': [], 'operator_id': None, 'price_seat_types': [], 'hours_before_departure': []
+        })
+        schedule['seat_types'] = sorted(_clean(row.seat_types))
+        schedule['origin_id'] = row.origin_id
+        schedule['destination_id'] = row.destination_id
+    return schedules
+
+
+def _index_snapshot(snapshot):
+    """Derive the in-memory lookup structures from a snapshot"""
+    schedules = snapshot['schedules']
+    schedules_by_date = {}
+    operators = set()
+    seat_types = set()
+    for schedule_id, schedule in schedules.items():
+        for date_of_journey in schedule['dates_of_journey']:
+            schedules_by_date.setdefault(date_of_journey, []).append(schedule_id)
+        if schedule['operator_id'] is not None:
+            operators.add(schedule['operator_id'])
+        seat_types.update(schedule['price_seat_types'])
+
+    for schedule_ids in schedules_by_date.values():
+        schedule_ids.sort()
+
+    dates = pd.to_datetime(pd.Series(list(schedules_by_date), dtype=object), errors='coerce').dropna()
+    return {
+        'version': snapshot['version'],
+        'schedules': schedules,
+        'schedules_by_date': schedules_by_date,
+        'schedule_ids': sorted(schedules),
+        'dates_of_journey': sorted(set(dates.dt.strftime('%Y-%m-%d'))),
+        'operators': sorted(operators),
+        'seat_types': sorted(seat_types),
+    }
+
+
+def read_snapshot():
+    """Read the snapshot file, or None if it doesn't exist or can't be read"""
+    try:
+        with open(DIMENSION_SNAPSHOT_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error reading dimension snapshot: {e}")
+        return None
+
+
+def write_snapshot(snapshot):
+    """Write the snapshot atomically, so workers never read a partial file"""
+    os.makedirs(os.path.dirname(DIMENSION_SNAPSHOT_PATH), exist_ok=True)
+    temp_path = f"{DIMENSION_SNAPSHOT_PATH}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(snapshot, f, separators=(",", ":"), default=str)
+    os.replace(temp_path, DIMENSION_SNAPSHOT_PATH)
+
+
+def refresh_dimension_cache(schedule_ids=None):
+    """Rebuild the snapshot, fully or only for the given schedules
+
+    Called by the loader after new files were committed. An incremental refresh
+    falls back to a full rebuild when there is no snapshot yet.
+
+    Returns:
+        bool: True if the snapshot was written
+    """
+    snapshot = read_snapshot() if schedule_ids is not None else None
+    if snapshot is None:
+        schedule_ids = None
+
+    start = time.perf_counter()
+    schedules = query_schedule_dimensions(schedule_ids)
+    if schedules is None:
+        print("⚠️ Could not query dimensions, snapshot not updated")
+        return False
+
+    if snapshot is None:
+        snapshot = {'version': 0, 'schedules': schedules}
+    else:
+        snapshot['schedules'].update(schedules)
+    snapshot['version'] += 1
+    snapshot['built_at'] = datetime.now().isoformat(timespec="seconds")
+
+    write_snapshot(snapshot)
+    scope = "all" if schedule_ids is None else len(schedule_ids)
+    print(f"✅ Dimension snapshot updated ({scope} schedules) in {time.perf_counter() - start:.2f}s")
+    return True
+
+
+def _build_in_background():
+    """Build the first snapshot without blocking the request that needed it"""
+    global _build_thread, _last_build_attempt
+
+    def build():
+        global _build_thread
+        try:
+            refresh_dimension_cache()
+        finally:
+            with _dimensions_lock:
+                _build_thread = None
+
+    with _dimensions_lock:
+        # Don't hammer an unavailable database with full builds
+        if _build_thread is not None or time.monotonic() - _last_build_attempt < BUILD_RETRY_SECONDS:
+            return
+        _last_build_attempt = time.monotonic()
+        _build_thread = threading.Thread(target=build, name="dimension-build", daemon=True)
+        _build_thread.start()
+
+
+def get_dimensions():
+    """Get the current dimension cache, reloading the snapshot if another process updated it
+
+    Returns:
+        dict: The indexed dimensions, or None while no snapshot is available
+    """
+    global _dimensions, _snapshot_mtime, _last_check
+
+    now = time.monotonic()
+    if _dimensions is not None and now - _last_check < SNAPSHOT_CHECK_SECONDS:
+        return _dimensions
+
+    try:
+        mtime = os.path.getmtime(DIMENSION_SNAPSHOT_PATH)
+    except OSError:
+        mtime = None
+    _last_check = now
+
+    if mtime is None:
+        _build_in_background()
+        return _dimensions
+
+    if mtime != _snapshot_mtime:
+        snapshot = read_snapshot()
+        if snapshot is not None:
+            dimensions = _index_snapshot(snapshot)
+            with _dimensions_lock:
+                _dimensions = dimensions
+                _snapshot_mtime = mtime
+    return _dimensions
+
+
+def get_schedule_dimension(schedule_id):
+    """Cached dimension values for one schedule, or None if the cache doesn't know it"""
+    dimensions = get_dimensions()
+    if dimensions is None or not schedule_id:
+        return None
+    return dimensions['schedules'].get(str(schedule_id))
+
+
+if __name__ == "__main__":
+    refresh_dimension_cache()
@@ -0,0 +1,185 @@
+"""
+Bulk export of the dashboard's filtered seat prices.
+
+The data table only holds what update_dashboard loaded into the browser. The
+export route streams every row matching the same filters straight from
+Postgres, with chunked transfer encoding:
+
+    /export/seat-prices.csv?schedule_id=...&hours_before_departure=...&date_of_journey=...
+    /export/seat-prices.arrow?...   (needs pyarrow)
+
+CSV is produced by COPY (SELECT ...) TO STDOUT on its own connection, in a
+background thread feeding a small bounded queue, so neither side buffers the
+export and a slow client only holds its own request thread. The columnar
+output is an Arrow IPC stream built from db_utils.stream_query chunks, which
+pandas, pyarrow and polars read directly.
+"""
+import queue
+import re
+import threading
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+import flask
+
+from db_utils import get_connection, build_filtered_data_query, stream_query
+
+# Import pyarrow for the columnar export (optional)
+try:
+    import pyarrow as pa
+    PYARROW_MODULE_EXISTS = True
+except ImportError:
+    PYARROW_MODULE_EXISTS = False
+
+EXPORT_PATH = "/export/seat-prices.<fmt>"
+
+# Filters accepted as query string arguments, in get_filtered_data's order
+EXPORT_FILTERS = ["schedule_id", "operator_id", "seat_type", "hours_before_departure", "date_of_journey"]
+
+# COPY output chunks waiting to be sent, bounds the memory of one export
+EXPORT_QUEUE_CHUNKS = 16
+
+# How long the COPY thread waits for a stalled client to take a chunk before giving up
+EXPORT_STALL_SECONDS = 300
+
+# How often the response checks on the COPY thread while waiting for output
+EXPORT_POLL_SECONDS = 1
+
+# End of an Arrow IPC stream
+ARROW_EOS = b"\xff\xff\xff\xff\x00\x00\x00\x00"
+
+_copy_done = object()
+
+
+def export_url(fmt="csv", **filters):
+    """Export link for a filter set, filters that are None are left out"""
+    args = {name: value for name, value in filters.items() if name in EXPORT_FILTERS and value is not None}
+    return EXPORT_PATH.replace("<fmt>", fmt) + (f"?{urlencode(args)}" if args else "")
+
+
+def copy_csv_chunks(conn, query, params):
+    """Yield the CSV output of COPY (query) TO STDOUT, header included, as it is produced
+
+    Runs on conn, which it closes. If the COPY fails part way, the generator
+    raises, so the chunked response is aborted instead of ending like a complete
+    file. If the client goes away, the COPY is cancelled on the server.
+    """
+    chunks = queue.Queue(maxsize=EXPORT_QUEUE_CHUNKS)
+    cancelled = threading.Event()
+
+    def put(item):
+        # Wait for the client to catch up, unless it went away or stalled
+        waited = 0
+        while not cancelled.is_set():
+            try:
+                chunks.put(item, timeout=EXPORT_POLL_SECONDS)
+                return
+            except queue.Full:
+                waited += EXPORT_POLL_SECONDS
+                if waited >= EXPORT_STALL_SECONDS:
+                    raise TimeoutError(f"client took no data for {EXPORT_STALL_SECONDS}s")
+        raise InterruptedError("export cancelled")
+
+    def run_copy():
+        try:
+            try:
+                with conn.cursor() as cur:
+                    statement = cur.mogrify(query, params).decode()
+                    cur.copy_expert(f"COPY ({statement}) TO STDOUT WITH CSV HEADER",
+                                    SimpleNamespace(write=lambda data: put(data.encode() if isinstance(data, str) else data)))
+                put(_copy_done)
+            except Exception as e:
+                if not cancelled.is_set():
+                    try:
+                        chunks.put_nowait(e)
+                    except queue.Full:
+                        # The response notices the thread ended once it has sent what is queued
+                        print(f"Error exporting seat prices: {e}")
+            finally:
+                conn.rollback()
+        except Exception as e:
+            print(f"Error ending export transaction: {e}")
+        finally:
+            conn.close()
+
+    copy_thread = threading.Thread(target=run_copy, name="export-copy", daemon=True)
+    copy_thread.start()
+    finished = False
+    try:
+        while True:
+            try:
+                item = chunks.get(timeout=EXPORT_POLL_SECONDS)
+            except queue.Empty:
+                if not copy_thread.is_alive() and chunks.empty():
+                    raise RuntimeError("export thread ended without finishing the COPY")
+                continue
+            if item is _copy_done:
+                finished = True
+                return
+            if isinstance(item, Exception):
+                print(f"Error exporting seat prices: {item}")
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+        if not finished and copy_thread.is_alive():
+            # Stop the query on the server, not just the thread writing its output
+            try:
+                conn.cancel()
+            except Exception as e:
+                print(f"Error cancelling export query: {e}")
+
+
+def arrow_stream_chunks(conn, query, params):
+    """Yield an Arrow IPC stream of the query's rows, one record batch per fetched chunk
+
+    Runs on conn, which it closes. Without rows, the stream holds just the
+    schema, with the result's columns as strings.
+    """
+    schema = None
+    for chunk in stream_query(query, params, connection=conn, empty_chunk=True):
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if schema is None:
+            # Columns with only NULLs in the first chunk are exported as strings
+            schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                                for field in table.schema])
+            yield schema.serialize().to_pybytes()
+        for batch in table.cast(schema).to_batches():
+            yield batch.serialize().to_pybytes()
+    if schema is None:
+        raise RuntimeError("export query returned no columns")
+    yield ARROW_EOS
+
+
+def register_export_routes(app):
+    """Add the export route to the Dash app's Flask server"""
+
+    @app.server.route(EXPORT_PATH)
+    def export_seat_prices(fmt):
+        filters = {name: flask.request.args.get(name) or None for name in EXPORT_FILTERS}
+        # Unordered, sorting would delay the first byte until the whole selection is sorted
+        query, params, _ = build_filtered_data_query(**filters, ordered=False)
+        filename = "_".join(["seat_prices"] + [re.sub(r"[^\w.-]", "-", value) for value in filters.values() if value])
+
+        if fmt not in ("csv", "arrow"):
+            flask.abort(404)
+        if fmt == "arrow" and not PYARROW_MODULE_EXISTS:
+            return flask.Response("Columnar export needs pyarrow, install it or use .csv", status=501,
+                                  mimetype="text/plain")
+
+        # Connect before answering, once the response starts its status can't change
+        conn = get_connection()
+        if conn is None:
+            return flask.Response("Database unavailable, please retry later", status=503, mimetype="text/plain")
+
+        if fmt == "csv":
+            chunks, mimetype = copy_csv_chunks(conn, query, params), "text/csv"
+        else:
+            chunks, mimetype = arrow_stream_chunks(conn, query, params), "application/vnd.apache.arrow.stream"
+
+        # A generator response is sent with chunked transfer encoding as it is produced
+        return flask.Response(
+            flask.stream_with_context(chunks),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+        )
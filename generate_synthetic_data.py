@@ -0,0 +1,289 @@
+"""
+Generate a synthetic dataset in the same CSV layout the loader expects.
+
+Writes seat_prices, seat_wise_prices, seat_prices_with_DT and seat_wise_prices_with_DT
+directories with one file per snapshot (seat_prices_YYYY-MM-DD_HH-MM.csv etc.), so
+load_to_postgres.py can ingest them unchanged. The size of the dataset is controlled
+by the number of operators, schedules, seats and snapshots, which makes it possible
+to benchmark the dashboard at realistic and larger-than-production scales.
+
+Usage:
+    python generate_synthetic_data.py --output-dir synthetic_data --operators 4 --schedules-per-operator 50
+"""
+import argparse
+import json
+import os
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Operators that already appear in production data come first so the
+# price comparison page has its usual model/actual pair
+OPERATOR_IDS = [191, 296, 313, 348, 402, 455, 517, 563]
+
+# (origin_id, origin, destination_id, destination)
+ROUTES = [
+    (1646, "Santiago", 1821, "La Serena"),
+    (1646, "Santiago", 1500, "Valparaiso"),
+    (1646, "Santiago", 1702, "Concepcion"),
+    (1821, "La Serena", 1646, "Santiago"),
+]
+
+SEAT_TYPES = ["Semi Cama", "Salon Cama", "Cama Premium"]
+BASE_FARES = {"Semi Cama": 12000.0, "Salon Cama": 18000.0, "Cama Premium": 26000.0}
+
+# Departure slots shared by all operators, so matching times exist between operators
+DEPARTURE_TIMES = ["07:00:00", "08:30:00", "10:00:00", "13:30:00", "16:00:00", "19:00:00", "22:30:00", "23:45:00"]
+
+DEMAND_LABELS = np.array(["L", "M/L", "M", "M/H", "H"])
+
+SUBDIRECTORIES = {
+    "seat_prices": "seat_prices",
+    "seat_wise_prices": "seat_wise_prices",
+    "seat_prices_with_dt": "seat_prices_with_DT",
+    "seat_wise_prices_with_dt": "seat_wise_prices_with_DT",
+}
+
+
+def build_schedules(operators, schedules_per_operator, seat_types, start_date, days, rng):
+    """Build the schedule dimension shared by all snapshots
+
+    Returns:
+        DataFrame with one row per schedule
+    """
+    rows = []
+    schedule_id = 100000
+    for operator_index in range(operators):
+        operator_id = OPERATOR_IDS[operator_index] if operator_index < len(OPERATOR_IDS) else 600 + operator_index
+        for i in range(schedules_per_operator):
+            origin_id, origin, destination_id, destination = ROUTES[i % len(ROUTES)]
+            # Walk through the departure slots before moving to the next day, the same
+            # slot index for every operator so departures line up across operators
+            slot = i % len(DEPARTURE_TIMES)
+            day_offset = (i // len(DEPARTURE_TIMES)) % days
+            rows.append({
+                "schedule_id": schedule_id,
+                "operator_id": operator_id,
+                "date_of_journey": start_date + timedelta(days=day_offset),
+                "departure_time": DEPARTURE_TIMES[slot],
+                "origin_id": origin_id,
+                "origin": origin,
+                "destination_id": destination_id,
+                "destination": destination,
+                "coach_layout_id": 2000 + operator_index,
+                "travel_id": 500000 + schedule_id,
+                # Demand differs per schedule so the KPIs are not all identical
+                "demand_level": rng.uniform(0.3, 1.0),
+            })
+            schedule_id += 1
+
+    schedules = pd.DataFrame(rows)
+    schedules["departure"] = pd.to_datetime(
+        schedules["date_of_journey"].astype(str) + " " + schedules["departure_time"])
+    schedules["seat_types"] = [tuple(seat_types)] * len(schedules)
+    return schedules
+
+
+def build_snapshot(schedules, snapshot_time, seats, seat_types, history_hours, rng):
+    """Build the four CSV frames for a single snapshot
+
+    Returns:
+        dict: table name -> DataFrame, or None if no schedule is on sale at this time
+    """
+    hours_left = (schedules["departure"] - snapshot_time).dt.total_seconds() / 3600
+    on_sale = schedules[(hours_left > 0) & (hours_left <= history_hours)].copy()
+    if on_sale.empty:
+        return None
+    on_sale["hours_before_departure"] = np.round(hours_left[on_sale.index]).astype(int)
+
+    # Seats are split evenly between seat types
+    seats_per_type = max(seats // len(seat_types), 1)
+    seat_numbers = np.arange(1, seats_per_type * len(seat_types) + 1)
+    seat_type_of_seat = np.repeat(seat_types, seats_per_type)
+
+    # Sales progress as departure gets closer
+    progress = 1.0 - on_sale["hours_before_departure"].to_numpy() / history_hours
+    sold_ratio = np.clip(progress * on_sale["demand_level"].to_numpy() + rng.normal(0, 0.03, len(on_sale)), 0, 1)
+
+    # seat_prices - one row per schedule and seat type
+    summary = on_sale.loc[on_sale.index.repeat(len(seat_types))].reset_index(drop=True)
+    summary["seat_type"] = np.tile(seat_types, len(on_sale))
+    summary_sold = np.repeat(sold_ratio, len(seat_types))
+    base_fare = summary["seat_type"].map(BASE_FARES).to_numpy()
+    actual_fare = np.round(base_fare * (1 + 0.4 * summary_sold), 0)
+    model_price = np.round(actual_fare * rng.uniform(0.85, 1.2, len(summary)), 2)
+    actual_occupancy = np.round(summary_sold * seats_per_type).astype(int)
+    expected_occupancy = np.clip(actual_occupancy + rng.integers(-3, 4, len(summary)), 0, seats_per_type)
+    demand_index = DEMAND_LABELS[np.minimum((summary_sold * len(DEMAND_LABELS)).astype(int), len(DEMAND_LABELS) - 1)]
+    # Older feeds sent the demand index as a number, keep some of those around
+    numeric_demand = rng.random(len(summary)) < 0.2
+    demand_index = np.where(numeric_demand, np.round(summary_sold * 5, 2).astype(str), demand_index)
+
+    seat_prices = pd.DataFrame({
+        "expected_occupancy": expected_occupancy,
+        "actual_occupancy": actual_occupancy,
+        "demand_index": demand_index,
+        "time_step_to_check": summary["hours_before_departure"],
+        "operator_id": summary["operator_id"],
+        "date_of_journey": summary["date_of_journey"].astype(str),
+        "time_slot": summary["departure_time"].str.slice(0, 2),
+        "seat_type": summary["seat_type"],
+        "hours_before_departure": summary["hours_before_departure"],
+        "price": model_price,
+        "origin": summary["origin"],
+        "destination": summary["destination"],
+        "actual_fare": actual_fare,
+        "schedule_id": summary["schedule_id"],
+        "coach_layout_id": summary["coach_layout_id"],
+    })
+    seat_prices_with_dt = seat_prices.assign(departure_time=summary["departure_time"].to_numpy())
+
+    # seat_wise_prices - one row per schedule and seat
+    seat_rows = on_sale.loc[on_sale.index.repeat(len(seat_numbers))].reset_index(drop=True)
+    seat_sold = np.repeat(sold_ratio, len(seat_numbers))
+    seat_type_column = np.tile(seat_type_of_seat, len(on_sale))
+    seat_base_fare = pd.Series(seat_type_column).map(BASE_FARES).to_numpy()
+    seat_actual_fare = np.round(seat_base_fare * (1 + 0.4 * seat_sold), 0)
+    sales_count = rng.binomial(1, np.clip(seat_sold, 0, 1))
+
+    seat_wise_prices = pd.DataFrame({
+        "schedule_id": seat_rows["schedule_id"],
+        "seat_number": np.tile(seat_numbers, len(on_sale)),
+        "seat_type": seat_type_column,
+        "final_price": np.round(seat_actual_fare * rng.uniform(0.85, 1.2, len(seat_rows)), 2),
+        "actual_fare": seat_actual_fare,
+        "coach_layout_id": seat_rows["coach_layout_id"],
+        "sales_count": sales_count,
+        "sales_percentage": np.round(seat_sold * 100, 2),
+        "operator_reservation_id": seat_rows["operator_id"],
+        "travel_id": seat_rows["travel_id"],
+        "origin_id": seat_rows["origin_id"],
+        "destination_id": seat_rows["destination_id"],
+        "travel_date": seat_rows["date_of_journey"].astype(str),
+        "op_origin": seat_rows["origin"],
+        "op_destination": seat_rows["destination"],
+    })
+
+    return {
+        "seat_prices": seat_prices,
+        "seat_wise_prices": seat_wise_prices,
+        "seat_prices_with_dt": seat_prices_with_dt,
+        "seat_wise_prices_with_dt": seat_wise_prices,
+    }
+
+
+def generate_dataset(output_dir, operators=2, schedules_per_operator=16, seats=40, seat_types=2,
+                     snapshots_per_day=4, days=7, history_days=3, start_date=None, seed=42):
+    """Generate the synthetic CSV files and a manifest describing them
+
+    Args:
+        output_dir (str): Directory that receives the four CSV subdirectories
+        operators (int): Number of operators
+        schedules_per_operator (int): Schedules per operator, spread over the journey days
+        seats (int): Seats per coach
+        seat_types (int): Number of seat types per coach (max 3)
+        snapshots_per_day (int): Pricing snapshots taken per day
+        days (int): Number of journey days
+        history_days (int): How many days before departure a schedule is on sale
+        start_date (date): First journey date, defaults to tomorrow
+        seed (int): Random seed, the same parameters and seed give identical files
+
+    Returns:
+        dict: Manifest with file counts, row counts and sample selections
+    """
+    rng = np.random.default_rng(seed)
+    start_date = start_date or (date.today() + timedelta(days=1))
+    seat_type_names = SEAT_TYPES[:max(1, min(seat_types, len(SEAT_TYPES)))]
+    history_hours = history_days * 24
+
+    for subdirectory in SUBDIRECTORIES.values():
+        os.makedirs(os.path.join(output_dir, subdirectory), exist_ok=True)
+
+    schedules = build_schedules(operators, schedules_per_operator, seat_type_names, start_date, days, rng)
+
+    first_snapshot = datetime.combine(start_date - timedelta(days=history_days), datetime.min.time())
+    last_departure = schedules["departure"].max()
+    snapshot_interval = timedelta(hours=24 / snapshots_per_day)
+
+    file_count = 0
+    row_counts = {table_name: 0 for table_name in SUBDIRECTORIES}
+    snapshot_time = first_snapshot
+    while snapshot_time < last_departure:
+        frames = build_snapshot(schedules, snapshot_time, seats, seat_type_names, history_hours, rng)
+        if frames is not None:
+            stamp = snapshot_time.strftime("%Y-%m-%d_%H-%M")
+            for table_name, df in frames.items():
+                prefix = "seat_prices" if table_name.startswith("seat_prices") else "seat_wise_prices"
+                file_path = os.path.join(output_dir, SUBDIRECTORIES[table_name], f"{prefix}_{stamp}.csv")
+                df.to_csv(file_path, index=False)
+                row_counts[table_name] += len(df)
+                file_count += 1
+        snapshot_time += snapshot_interval
+
+    # Sample selections for benchmarks: the busiest date and one schedule on it
+    first_schedule = schedules.iloc[0]
+    manifest = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "parameters": {
+            "operators": operators,
+            "schedules_per_operator": schedules_per_operator,
+            "seats": seats,
+            "seat_types": seat_type_names,
+            "snapshots_per_day": snapshots_per_day,
+            "days": days,
+            "history_days": history_days,
+            "start_date": start_date.isoformat(),
+            "seed": seed,
+        },
+        "files": file_count,
+        "rows": row_counts,
+        "operator_ids": [str(operator_id) for operator_id in schedules["operator_id"].unique()],
+        "dates_of_journey": sorted(schedules["date_of_journey"].astype(str).unique().tolist()),
+        "sample": {
+            "schedule_id": str(first_schedule["schedule_id"]),
+            "date_of_journey": str(first_schedule["date_of_journey"]),
+            "departure_time": first_schedule["departure_time"],
+            "operator_id": str(first_schedule["operator_id"]),
+            "seat_type": seat_type_names[0],
+        },
+    }
+
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate synthetic pricing CSVs for benchmarking")
+    parser.add_argument("--output-dir", default="synthetic_data")
+    parser.add_argument("--operators", type=int, default=2)
+    parser.add_argument("--schedules-per-operator", type=int, default=16)
+    parser.add_argument("--seats", type=int, default=40)
+    parser.add_argument("--seat-types", type=int, default=2)
+    parser.add_argument("--snapshots-per-day", type=int, default=4)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--history-days", type=int, default=3)
+    parser.add_argument("--start-date", type=lambda value: datetime.strptime(value, "%Y-%m-%d").date(), default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    manifest = generate_dataset(
+        args.output_dir,
+        operators=args.operators,
+        schedules_per_operator=args.schedules_per_operator,
+        seats=args.seats,
+        seat_types=args.seat_types,
+        snapshots_per_day=args.snapshots_per_day,
+        days=args.days,
+        history_days=args.history_days,
+        start_date=args.start_date,
+        seed=args.seed,
+    )
+    print(f"✅ Wrote {manifest['files']} files to {args.output_dir}")
+    for table_name, row_count in manifest["rows"].items():
+        print(f"   {table_name}: {row_count:,} rows")
@@ -4,7 +4,9 @@ from dash import dcc
 import dash_bootstrap_components as dbc
 from dash import html
 import pandas as pd
+import numpy as np
 import re
+from component_cache import memoize_component
 from measures import get_price_trend_data, get_price_delta_data, get_occupancy_data, get_seat_wise_analysis, get_seat_wise_price_sum_by_hour
 
 def hex_to_rgba(hex_color, alpha=1.0):
@@ -99,7 +101,7 @@ def create_price_delta_chart(schedule_id=None, operator_id=None, seat_type=None,
         x=df['TimeAndDateStamp'],
         y=df['delta'],
         name='Price Delta',
-        marker_color=['#27AE60' if x >= 0 else '#E74C3C' for x in df['delta']]
+        marker_color=np.where(df['delta'] >= 0, '#27AE60', '#E74C3C')
     ))
     
     fig.update_layout(
@@ -118,6 +120,7 @@ def create_price_delta_chart(schedule_id=None, operator_id=None, seat_type=None,
         className="mb-4"
     )
 
+@memoize_component("occupancy_chart")
 def create_occupancy_chart(schedule_id=None, operator_id=None, seat_type=None, hours_before_departure=None, date_of_journey=None):
     """Create a chart showing actual vs expected occupancy, with separate charts for each seat type"""
     # Only proceed if we have a schedule_id
@@ -372,6 +375,7 @@ def create_seat_scatter_chart(schedule_id=None, hours_before_departure=None, dat
         className="mb-4"
     )
 
+@memoize_component("seat_wise_price_sum_chart")
 def create_seat_wise_price_sum_chart(schedule_id):
     """Create a chart showing sum of actual and model prices for all seats by hours before departure
     
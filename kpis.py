@@ -2,8 +2,10 @@ import dash
 from dash import html
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
-from measures import get_kpi_data
-from db_utils import get_actual_price, get_model_price, get_demand_index, get_occupancy_by_seat_type, get_seat_types_count
+from measures import get_kpi_data, get_filtered_kpi_data, detect_model_price_col
+from db_utils import get_actual_price, get_model_price, get_occupancy_and_demand_by_seat_type, get_seat_types_count, DataUnavailable
+from demand_index import format_demand_index
+from component_cache import memoize_component
 from price_utils import get_prices_by_schedule_and_hour, get_total_seat_prices, get_monthly_delta
 import calendar
 
@@ -94,18 +96,20 @@ def create_kpi_card(title, value, subtitle=None, color="primary", icon=None, tex
     
     return card
 
-def create_kpi_row(schedule_id=None, operator_id=None, seat_type=None, hours_before_departure=None, date_of_journey=None):
-    """Create a row of KPI cards that stack on mobile"""
-    # Get the data first, then pass to get_kpi_data
-    from db_utils import get_filtered_data, get_distinct_prices_by_date_operator_time, execute_query
-    
-    # Get the data using the same logic as before
-    df = None
-    model_price_col = None
+def get_kpi_summary(schedule_id=None, operator_id=None, seat_type=None, hours_before_departure=None, date_of_journey=None):
+    """Average actual fare, model price and delta behind the KPI row
+
+    Returns:
+        dict: avg_actual_fare, avg_model_price, avg_delta and avg_delta_pct, or None if there is no data
+
+    Raises:
+        DataUnavailable: if the data couldn't be read
+    """
+    from db_utils import get_distinct_prices_by_date_operator_time, execute_query
     
     try:
-        # First try to get data using the direct SQL query
-        if schedule_id and operator_id and hours_before_departure is not None:
+        # With a date, the distinct prices of the schedule's departure are used when available
+        if schedule_id and operator_id and hours_before_departure is not None and date_of_journey:
             # Get departure_time for this schedule
             departure_time_query = """
             SELECT DISTINCT departure_time 
@@ -118,54 +122,34 @@ def create_kpi_row(schedule_id=None, operator_id=None, seat_type=None, hours_bef
             if departure_time_df is not None and not departure_time_df.empty:
                 departure_time = departure_time_df['departure_time'].iloc[0]
                 
-                # Now use our new query with the found departure_time
-                if date_of_journey:
-                    try:
-                        # First check if the seat_prices_with_dt_partitioned table exists
-                        table_check_query = """
-                        SELECT EXISTS (
-                            SELECT FROM information_schema.tables 
-                            WHERE table_name = 'seat_prices_with_dt_partitioned'
-                        )
-                        """
-                        table_exists_df = execute_query(table_check_query, [])
-                        table_exists = table_exists_df.iloc[0][0] if table_exists_df is not None and not table_exists_df.empty else False
-                        
-                        if table_exists:
-                            df = get_distinct_prices_by_date_operator_time(date_of_journey, operator_id, departure_time)
-                            
-                            # If we got no data from the distinct prices query, fall back to regular query
-                            if df is None or df.empty:
-                                df = get_filtered_data(schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
-                        else:
-                            df = get_filtered_data(schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
-                    except Exception as e:
-                        df = get_filtered_data(schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
-                else:
-                    df = get_filtered_data(schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
-            else:
-                df = get_filtered_data(schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
-        else:
-            df = get_filtered_data(schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
-        
-        # Determine model price column
-        if df is not None and not df.empty:
-            if 'price' in df.columns:
-                model_price_col = 'price'
-            elif 'final_price' in df.columns:
-                model_price_col = 'final_price'
-            else:
-                model_price_col = 'actual_fare'  # fallback
+                # First check if the seat_prices_with_dt_partitioned table exists
+                table_check_query = """
+                SELECT EXISTS (
+                    SELECT FROM information_schema.tables 
+                    WHERE table_name = 'seat_prices_with_dt_partitioned'
+                )
+                """
+                table_exists_df = execute_query(table_check_query, [])
+                table_exists = table_exists_df.iloc[0][0] if table_exists_df is not None and not table_exists_df.empty else False
+                
+                if table_exists:
+                    df = get_distinct_prices_by_date_operator_time(date_of_journey, operator_id, departure_time)
+                    if df is not None and not df.empty:
+                        return get_kpi_data(df, detect_model_price_col(df))
         
-        # Get KPI data using the new function signature
-        if df is not None and not df.empty and model_price_col:
-            kpi_data = get_kpi_data(df, model_price_col)
-        else:
-            kpi_data = None
-            
+        # Otherwise aggregate every matching row in the database, the filtered
+        # frame is capped at the interactive row budget
+        return get_filtered_kpi_data(schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
+    except DataUnavailable:
+        raise
     except Exception as e:
         print(f"Error getting KPI data: {e}")
-        kpi_data = None
+        raise DataUnavailable(f"Error getting KPI data: {e}")
+
+@memoize_component("kpi_row")
+def create_kpi_row(schedule_id=None, operator_id=None, seat_type=None, hours_before_departure=None, date_of_journey=None):
+    """Create a row of KPI cards that stack on mobile"""
+    kpi_data = get_kpi_summary(schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
     
     # Handle case where kpi_data is None
     if kpi_data is None:
@@ -206,13 +190,15 @@ def create_kpi_row(schedule_id=None, operator_id=None, seat_type=None, hours_bef
     
     # Create a list to hold all the price KPI cards
     price_kpi_cards = []
+    # Occupancy cards are added after the price cards, kept per call so concurrent requests don't share them
+    occupancy_cards = []
     
     # Only calculate prices if required filters are selected
     if schedule_id and hours_before_departure is not None:
         print(f"KPI DEBUG: Getting prices for schedule_id={schedule_id}, hours_before_departure={hours_before_departure}")
         
         # Get all prices for this schedule ID and hour before departure
-        price_data = get_prices_by_schedule_and_hour(schedule_id, hours_before_departure)
+        price_data = get_prices_by_schedule_and_hour(schedule_id, hours_before_departure) or {}
         
         # If seat_type is specified, only show that one
         if seat_type and seat_type in price_data:
@@ -223,85 +209,9 @@ def create_kpi_row(schedule_id=None, operator_id=None, seat_type=None, hours_bef
         
         print(f"KPI DEBUG: Processing prices for seat types: {seat_types}")
         
-        # Get demand indexes for all seat types in the schedule
-        try:
-            demand_indexes = get_demand_index(schedule_id, hours_before_departure)
-            print(f"KPI DEBUG: Raw demand indexes: {demand_indexes}, type: {type(demand_indexes)}")
-            
-            # Initialize a dictionary to store formatted demand indexes by seat type
-            demand_index_displays = {}
-            
-            if demand_indexes is not None and isinstance(demand_indexes, dict):
-                # Process each seat type's demand index
-                for st, di in demand_indexes.items():
-                    if di is not None:
-                        # If it's already a string like 'M/L', use it directly
-                        if isinstance(di, str):
-                            # Check if it's a string like 'M/L'
-                            if '/' in di:
-                                demand_index_displays[st] = di
-                                print(f"KPI DEBUG: Using demand index string value directly for {st}: {di}")
-                            else:
-                                # Try to convert to float for formatting
-                                try:
-                                    di_float = float(di)
-                                    demand_index_displays[st] = f"{di_float:.2f}"
-                                    print(f"KPI DEBUG: Converted string demand index to float for {st}: {demand_index_displays[st]}")
-                                except (ValueError, TypeError):
-                                    demand_index_displays[st] = di
-                                    print(f"KPI DEBUG: Using demand index string value for {st}: {di}")
-                        # If it's a float or other numeric type
-                        else:
-                            try:
-                                di_float = float(di)
-                                demand_index_displays[st] = f"{di_float:.2f}"
-                                print(f"KPI DEBUG: Formatted numeric demand index for {st}: {demand_index_displays[st]}")
-                            except (ValueError, TypeError) as e:
-                                print(f"KPI DEBUG: Error formatting demand index for {st}: {e}")
-                                demand_index_displays[st] = str(di)
-                    else:
-                        demand_index_displays[st] = "N/A"
-                        print(f"KPI DEBUG: No demand index found for schedule {schedule_id}, seat type {st}")
-            elif demand_indexes is not None:
-                # If we got a single demand index (not a dict), use it as a fallback for all seat types
-                # Format it as before
-                if isinstance(demand_indexes, str):
-                    # Check if it's a string like 'M/L'
-                    if '/' in demand_indexes:
-                        demand_index_display = demand_indexes
-                        print(f"KPI DEBUG: Using single demand index string value directly: {demand_index_display}")
-                    else:
-                        # Try to convert to float for formatting
-                        try:
-                            demand_index_float = float(demand_indexes)
-                            demand_index_display = f"{demand_index_float:.2f}"
-                            print(f"KPI DEBUG: Converted single string demand index to float: {demand_index_display}")
-                        except (ValueError, TypeError):
-                            demand_index_display = demand_indexes
-                            print(f"KPI DEBUG: Using single demand index string value: {demand_index_display}")
-                # If it's a float or other numeric type
-                else:
-                    try:
-                        demand_index_float = float(demand_indexes)
-                        demand_index_display = f"{demand_index_float:.2f}"
-                        print(f"KPI DEBUG: Formatted single numeric demand index: {demand_index_display}")
-                    except (ValueError, TypeError) as e:
-                        print(f"KPI DEBUG: Error formatting single demand index: {e}")
-                        demand_index_display = str(demand_indexes)
-                
-                # Use this single value for all seat types
-                for st in seat_types:
-                    demand_index_displays[st] = demand_index_display
-            else:
-                # If no demand indexes found, set N/A for all seat types
-                for st in seat_types:
-                    demand_index_displays[st] = "N/A"
-                print(f"KPI DEBUG: No demand indexes found for schedule {schedule_id}")
-        except Exception as e:
-            print(f"Error getting demand indexes: {e}")
-            # Set N/A for all seat types
-            demand_index_displays = {st: "N/A" for st in seat_types}
-            
+        # Occupancy and demand index of all seat types, in one query
+        seat_type_data = get_occupancy_and_demand_by_seat_type(schedule_id, hours_before_departure) or {}
+        
         # For each seat type, create a KPI card
         for st in seat_types:
             # Get prices from the price data
@@ -413,20 +323,20 @@ def create_kpi_row(schedule_id=None, operator_id=None, seat_type=None, hours_bef
             
             # We'll create the demand index card only once, outside this loop
             
-            # Get occupancy data specific to this seat type
-            occupancy_data = get_occupancy_by_seat_type(schedule_id, st, hours_before_departure)
+            # Occupancy and demand index for this seat type
+            occupancy_data = seat_type_data.get(st, {})
             
             # Create occupancy card for this seat type with its specific data
             occupancy_card = create_kpi_card(
                 f"Historic Occupancies - {st}",
-                f"{occupancy_data['actual_occupancy']}%",
-                f"Expected: {occupancy_data['expected_occupancy']}%",
+                f"{occupancy_data.get('actual_occupancy', 0)}%",
+                f"Expected: {occupancy_data.get('expected_occupancy', 0)}%",
                 "primary",
                 "users"
             )
             
-            # Get the demand index for this seat type
-            demand_index_display = demand_index_displays.get(st, "N/A")
+            demand_index_display = format_demand_index(occupancy_data.get('demand_index_value'),
+                                                       occupancy_data.get('demand_index_label'))
             
             # Create demand index card for this seat type
             demand_index_card = create_kpi_card(
@@ -447,26 +357,19 @@ def create_kpi_row(schedule_id=None, operator_id=None, seat_type=None, hours_bef
             ])
             
             # Store occupancy cards separately to add them at the end
-            if not hasattr(create_kpi_row, 'occupancy_cards'):
-                create_kpi_row.occupancy_cards = []
-            
-            # Add this occupancy card to our collection
-            create_kpi_row.occupancy_cards.append(dbc.Col(occupancy_card, width=3))
+            occupancy_cards.append(dbc.Col(occupancy_card, width=3))
     
     # We've removed the Number of Seat Types KPI card as requested
     # The seat_types_count function is still available if needed elsewhere
     # seat_types_count = get_seat_types_count(schedule_id)
     
     # Add all occupancy cards at the end
-    if hasattr(create_kpi_row, 'occupancy_cards') and create_kpi_row.occupancy_cards:
+    if occupancy_cards:
         # Add spacing before occupancy cards
         price_kpi_cards.append(html.Div(style={"height": "20px"}))
         
         # Add all occupancy cards in a row
-        price_kpi_cards.extend(create_kpi_row.occupancy_cards)
-        
-        # Reset the occupancy cards collection for next call
-        create_kpi_row.occupancy_cards = []
+        price_kpi_cards.extend(occupancy_cards)
         
         # Add total price KPI cards for all seats at the selected hour
         if schedule_id and hours_before_departure is not None:
@@ -583,6 +486,14 @@ def create_kpi_row(schedule_id=None, operator_id=None, seat_type=None, hours_bef
             "exchange-alt"
         )
         
+        occupancy_card = create_kpi_card(
+            "Historic Occupancies",
+            "No data",
+            "Select filters",
+            "primary",
+            "users"
+        )
+        
         price_kpi_cards = [
             dbc.Col(current_actual_price_card, width=3),
             dbc.Col(current_model_price_card, width=3),
@@ -621,7 +532,11 @@ def create_monthly_delta_kpis(month, year, test_data=None):
         monthly_data = test_data
     else:
         # Get monthly delta data from database
-        monthly_data = get_monthly_delta(month, year)
+        try:
+            monthly_data = get_monthly_delta(month, year)
+        except DataUnavailable as e:
+            print(f"Error getting monthly delta: {e}")
+            monthly_data = None
         
         # If no data found for July 2025, use sample data for demonstration
         if month == 7 and year == 2025 and (
@@ -0,0 +1,339 @@
+"""
+Concurrent-user load test for the dashboard callbacks.
+
+Each virtual user replays the request sequence the browser sends to
+/_dash-update-component while an analyst works through the dashboard:
+open the page, pick a date, a schedule and an hours-before-departure value
+(which fires all the dashboard callbacks for that selection at once),
+then calculate the monthly delta. Every few iterations a user goes through
+the price comparison flow instead. Options are picked from the responses,
+so the load follows whatever data the database holds.
+
+Start the app first (python main.py), then for example:
+    python load_test.py --url http://127.0.0.1:8050 --users 30 --duration 120 --think-time 2
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from dash_requests import DEPENDENCIES_PATH, UPDATE_COMPONENT_PATH, build_update_request, find_dependency
+
+DASHBOARD_PATH = "/"
+PRICE_COMPARISON_PATH = "/price-difference"
+
+# Callbacks the browser fires together once a schedule and hours are selected
+SELECTION_CALLBACKS = [
+    ("update_operator_by_schedule_id", "operator-name-display.children"),
+    ("update_seat_types_by_schedule_id", "seat-type-dropdown.options"),
+    ("update_route_info", "origin-display.children"),
+    ("update_dashboard", "kpi-container.children"),
+    ("update_seat_visualizations", "seat-map-container.children"),
+    ("update_seat_details", "seat-details.children"),
+]
+
+# Parallel requests per virtual user, browsers open about this many connections per host
+BROWSER_CONNECTIONS = 6
+
+REQUEST_TIMEOUT = 120
+
+
+def new_stats():
+    """Create the shared collection of request timings per callback"""
+    return {'lock': threading.Lock(), 'timings': {}, 'errors': {}}
+
+
+def record_request(stats, name, seconds, ok):
+    """Record one request in the shared stats"""
+    with stats['lock']:
+        stats['timings'].setdefault(name, []).append(seconds)
+        if not ok:
+            stats['errors'][name] = stats['errors'].get(name, 0) + 1
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def summarize_stats(stats, elapsed):
+    """Per-callback throughput, latency percentiles and error rate"""
+    with stats['lock']:
+        timings = {name: sorted(values) for name, values in stats['timings'].items()}
+        errors = dict(stats['errors'])
+
+    callbacks = {}
+    for name, values in sorted(timings.items()):
+        callbacks[name] = {
+            "requests": len(values),
+            "errors": errors.get(name, 0),
+            "error_rate": errors.get(name, 0) / len(values),
+            "throughput": len(values) / elapsed if elapsed else 0,
+            "mean": statistics.fmean(values),
+            "p50": percentile(values, 0.50),
+            "p90": percentile(values, 0.90),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+            "max": values[-1],
+        }
+
+    total_requests = sum(len(values) for values in timings.values())
+    total_errors = sum(errors.values())
+    return {
+        "elapsed": elapsed,
+        "requests": total_requests,
+        "errors": total_errors,
+        "error_rate": total_errors / total_requests if total_requests else 0,
+        "throughput": total_requests / elapsed if elapsed else 0,
+        "callbacks": callbacks,
+    }
+
+
+def find_component(layout, component_id):
+    """Find a component by id in a serialized layout tree"""
+    if isinstance(layout, list):
+        for child in layout:
+            found = find_component(child, component_id)
+            if found is not None:
+                return found
+    elif isinstance(layout, dict):
+        props = layout.get("props", {})
+        if props.get("id") == component_id:
+            return layout
+        for value in props.values():
+            if isinstance(value, (dict, list)):
+                found = find_component(value, component_id)
+                if found is not None:
+                    return found
+    return None
+
+
+def option_values(options):
+    """Values from a dropdown options list"""
+    values = []
+    for option in options or []:
+        values.append(option.get("value") if isinstance(option, dict) else option)
+    return [value for value in values if value is not None]
+
+
+def send_callback(user, name, output, values, changed=None, pathname=DASHBOARD_PATH):
+    """Send one callback request for a virtual user and return its response payload (or None)"""
+    dependency = find_dependency(user['dependencies'], output)
+    if dependency is None:
+        record_request(user['stats'], name, 0.0, False)
+        return None
+
+    body = build_update_request(dependency, values, changed)
+    start = time.perf_counter()
+    try:
+        response = user['session'].post(user['base_url'] + UPDATE_COMPONENT_PATH, json=body,
+                                        headers={"Referer": user['base_url'] + pathname}, timeout=REQUEST_TIMEOUT)
+        ok = response.status_code in (200, 204)
+        payload = response.json() if response.status_code == 200 else None
+    except Exception as e:
+        print(f"User {user['id']}: {name} failed: {e}")
+        ok = False
+        payload = None
+    record_request(user['stats'], name, time.perf_counter() - start, ok)
+    return payload
+
+
+def send_callbacks(user, calls, values, pathname=DASHBOARD_PATH):
+    """Send callbacks concurrently, as the browser does for callbacks sharing an input"""
+    futures = [user['pool'].submit(send_callback, user, name, output, values, None, pathname)
+               for name, output in calls]
+    return [future.result() for future in futures]
+
+
+def think(user):
+    """Pause like an analyst looking at the screen"""
+    if user['think_time'] > 0:
+        time.sleep(user['rng'].uniform(0.5, 1.5) * user['think_time'])
+
+
+def dashboard_flow(user):
+    """date -> schedule -> hours -> dashboard callbacks -> monthly delta"""
+    rng = user['rng']
+    values = {"url.pathname": DASHBOARD_PATH, "operator-name-container.children": None}
+    page = send_callback(user, "display_page", "page-content.children", values)
+    if page is None:
+        return
+    date_dropdown = find_component(page["response"]["page-content"]["children"], "date-of-journey-dropdown")
+    dates = option_values(date_dropdown["props"].get("options") if date_dropdown else None)
+    if not dates:
+        return
+    think(user)
+
+    values["date-of-journey-dropdown.value"] = rng.choice(dates)
+    response = send_callbacks(user, [
+        ("update_schedule_id_slicer", "schedule-id-dropdown.options"),
+        ("update_date_summary_kpis", "date-summary-container.children"),
+    ], values)[0]
+    schedule_ids = option_values(response["response"]["schedule-id-dropdown"]["options"]) if response else []
+    if not schedule_ids:
+        return
+    think(user)
+
+    values["schedule-id-dropdown.value"] = rng.choice(schedule_ids)
+    response = send_callback(user, "update_hours_before_departure_slicer",
+                             "hours-before-departure-dropdown.options", values)
+    hours = option_values(response["response"]["hours-before-departure-dropdown"]["options"]) if response else []
+    values["hours-before-departure-dropdown.value"] = rng.choice(hours) if hours else None
+    values["seat-selector.value"] = "1"
+    send_callbacks(user, SELECTION_CALLBACKS, values)
+    think(user)
+
+    selected_date = datetime.strptime(str(values["date-of-journey-dropdown.value"])[:10], "%Y-%m-%d")
+    values["month-selector.value"] = selected_date.month
+    values["year-selector.value"] = selected_date.year
+    values["calculate-monthly-delta-button.n_clicks"] = 1
+    send_callback(user, "update_monthly_delta", "monthly-delta-kpis.children", values,
+                  ["calculate-monthly-delta-button.n_clicks"])
+
+
+def price_comparison_flow(user):
+    """date -> model operator -> actual operator -> time of journey -> comparison"""
+    rng = user['rng']
+    values = {"url.pathname": PRICE_COMPARISON_PATH}
+    page = send_callback(user, "display_page", "page-content.children", values, pathname=PRICE_COMPARISON_PATH)
+    if page is None:
+        return
+    layout = page["response"]["page-content"]["children"]
+    date_dropdown = find_component(layout, "price-comparison-doj")
+    operator_dropdown = find_component(layout, "model-operator")
+    dates = option_values(date_dropdown["props"].get("options") if date_dropdown else None)
+    operators = option_values(operator_dropdown["props"].get("options") if operator_dropdown else None)
+    if not dates or not operators:
+        return
+    think(user)
+
+    values["model-operator.value"] = rng.choice(operators)
+    response = send_callback(user, "update_actual_operator_dropdown", "actual-operator.options", values,
+                             pathname=PRICE_COMPARISON_PATH)
+    actual_operators = option_values(response["response"]["actual-operator"]["options"]) if response else []
+    if not actual_operators:
+        return
+    values["actual-operator.value"] = rng.choice(actual_operators)
+    values["price-comparison-doj.value"] = rng.choice(dates)
+    think(user)
+
+    response = send_callback(user, "update_time_of_journey_dropdown", "time-of-journey.options", values,
+                             pathname=PRICE_COMPARISON_PATH)
+    times = option_values(response["response"]["time-of-journey"]["options"]) if response else []
+    if not times:
+        return
+    values["time-of-journey.value"] = rng.choice(times)
+    send_callback(user, "update_price_comparison_data", "price-comparison-results.children", values,
+                  pathname=PRICE_COMPARISON_PATH)
+
+
+def run_virtual_user(user, stop_at, iterations, comparison_every):
+    """Replay flows for one simulated analyst until the deadline or the iteration limit"""
+    iteration = 0
+    try:
+        while time.time() < stop_at and (iterations is None or iteration < iterations):
+            iteration += 1
+            try:
+                if comparison_every and iteration % comparison_every == 0:
+                    price_comparison_flow(user)
+                else:
+                    dashboard_flow(user)
+            except Exception as e:
+                # A malformed response ends this iteration, the request itself was recorded
+                print(f"User {user['id']}: iteration {iteration} aborted: {e}")
+            think(user)
+    finally:
+        user['pool'].shutdown(wait=True)
+        user['session'].close()
+
+
+def run_load_test(base_url, users=10, duration=60, iterations=None, think_time=1.0, ramp_up=0.0,
+                  comparison_every=4, seed=None):
+    """Run the load test and return the summary
+
+    Args:
+        base_url (str): Address of a running dashboard
+        users (int): Number of concurrent virtual users
+        duration (float): Test length in seconds
+        iterations (int): Optional limit of flows per user
+        think_time (float): Average pause between user actions in seconds
+        ramp_up (float): Seconds over which users are started
+        comparison_every (int): Every n-th flow is a price comparison flow (0 disables it)
+        seed (int): Random seed for the selections
+
+    Returns:
+        dict: Summary from summarize_stats
+    """
+    dependencies = requests.get(base_url.rstrip("/") + DEPENDENCIES_PATH, timeout=REQUEST_TIMEOUT).json()
+    stats = new_stats()
+    rng = random.Random(seed)
+
+    start = time.time()
+    stop_at = start + duration
+    threads = []
+    for user_id in range(users):
+        user = {
+            'id': user_id,
+            'base_url': base_url.rstrip("/"),
+            'dependencies': dependencies,
+            'stats': stats,
+            'think_time': think_time,
+            'rng': random.Random(rng.random()),
+            'session': requests.Session(),
+            'pool': ThreadPoolExecutor(max_workers=BROWSER_CONNECTIONS),
+        }
+        thread = threading.Thread(target=run_virtual_user, args=(user, stop_at, iterations, comparison_every),
+                                  daemon=True)
+        thread.start()
+        threads.append(thread)
+        if ramp_up and users > 1:
+            time.sleep(ramp_up / (users - 1))
+
+    for thread in threads:
+        thread.join()
+
+    return summarize_stats(stats, time.time() - start)
+
+
+def print_summary(summary):
+    print(f"\n📊 {summary['requests']} requests in {summary['elapsed']:.1f}s "
+          f"({summary['throughput']:.1f} req/s, {summary['error_rate']:.1%} errors)")
+    print(f"{'callback':<38}{'reqs':>7}{'err%':>7}{'req/s':>8}{'p50 ms':>9}{'p90 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for name, result in summary["callbacks"].items():
+        print(f"{name:<38}{result['requests']:>7}{result['error_rate']:>7.1%}{result['throughput']:>8.2f}"
+              f"{result['p50'] * 1000:>9.0f}{result['p90'] * 1000:>9.0f}{result['p95'] * 1000:>9.0f}"
+              f"{result['p99'] * 1000:>9.0f}{result['max'] * 1000:>9.0f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay concurrent dashboard sessions against a running app")
+    parser.add_argument("--url", default="http://127.0.0.1:8050")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60, help="Test length in seconds")
+    parser.add_argument("--iterations", type=int, default=None, help="Flows per user, stops early when reached")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Average pause between actions in seconds")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds over which users are started")
+    parser.add_argument("--comparison-every", type=int, default=4,
+                        help="Every n-th flow of a user is the price comparison flow, 0 disables it")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default=None, help="Write the summary as JSON to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(f"🚀 {args.users} users against {args.url} for {args.duration:.0f}s (think time {args.think_time}s)")
+    summary = run_load_test(args.url, users=args.users, duration=args.duration, iterations=args.iterations,
+                            think_time=args.think_time, ramp_up=args.ramp_up,
+                            comparison_every=args.comparison_every, seed=args.seed)
+    print_summary(summary)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"📝 Summary written to {args.output}")
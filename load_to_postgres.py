@@ -26,6 +26,48 @@ except ImportError as e:
     print(f"⚠️ Error importing db_partitioning: {e}")
     PARTITIONING_MODULE_EXISTS = False
 
+# Import the dimension cache so the dashboard's dropdown sources are updated after a load
+try:
+    from dimension_cache import refresh_dimension_cache
+    DIMENSION_CACHE_MODULE_EXISTS = True
+except ImportError:
+    DIMENSION_CACHE_MODULE_EXISTS = False
+
+# Import the seat-wise aggregates so the price sum chart's rows are written as files land
+try:
+    from seat_wise_aggregates import ensure_aggregate_table, aggregate_seat_wise_frame, upsert_aggregates
+    AGGREGATES_MODULE_EXISTS = True
+except ImportError:
+    AGGREGATES_MODULE_EXISTS = False
+
+# Import the demand index normalization so the typed columns are filled at ingest
+try:
+    from demand_index import ensure_demand_index_columns, add_demand_index_columns
+    DEMAND_INDEX_MODULE_EXISTS = True
+except ImportError:
+    DEMAND_INDEX_MODULE_EXISTS = False
+
+# Import the departure time index so the price comparison's matching times are indexed at ingest
+try:
+    from departure_index import ensure_index_table, index_frame, upsert_index
+    DEPARTURE_INDEX_MODULE_EXISTS = True
+except ImportError:
+    DEPARTURE_INDEX_MODULE_EXISTS = False
+
+# Import the route dimension so routes and route rollups are kept up to date at ingest
+try:
+    from route_dimension import ensure_route_tables, route_frame, upsert_routes, refresh_route_rollups
+    ROUTE_MODULE_EXISTS = True
+except ImportError:
+    ROUTE_MODULE_EXISTS = False
+
+# Import the notifications so running dashboards invalidate what each load changed
+try:
+    from data_notifications import ensure_data_change_table, notify_data_loaded
+    NOTIFICATIONS_MODULE_EXISTS = True
+except ImportError:
+    NOTIFICATIONS_MODULE_EXISTS = False
+
 # ----------------- CONFIG -----------------
 SEAT_PRICES_DIR = r"D:\Programming\dynamic-pricing-apis-master\dynamic-pricing-apis-master\output_csvs\OneDrive\seat_prices"
 SEAT_WISE_PRICES_DIR = r"D:\Programming\dynamic-pricing-apis-master\dynamic-pricing-apis-master\output_csvs\OneDrive\seat_wise_prices"
@@ -38,6 +80,13 @@ DB_PASSWORD = "Ghost143"
 DB_HOST = "localhost"
 DB_PORT = "5432"
 
+# Schedules touched by this run, used to update the dimension cache incrementally
+loaded_schedule_ids = set()
+
+# Tables and dates of journey touched by this run, named in the notification sent at its end
+loaded_tables = set()
+loaded_dates = set()
+
 # ------------- UTILITY FUNCTIONS -------------
 
 
@@ -310,6 +359,16 @@ def load_csv_files(folder, table_name, conn, already_loaded):
             # Keep only expected columns
             df = df[columns_to_keep]
 
+            # Split the TEXT demand index into its numeric value and label once, here
+            if DEMAND_INDEX_MODULE_EXISTS and table_type == "seat_prices":
+                add_demand_index_columns(df)
+
+            if "schedule_id" in df.columns:
+                loaded_schedule_ids.update(df["schedule_id"].dropna().astype(str))
+            journey_date_column = "date_of_journey" if table_type == "seat_prices" else "travel_date"
+            if journey_date_column in df.columns:
+                loaded_dates.update(df[journey_date_column].dropna().astype(str))
+
             # Extract timestamp from filename using updated format
             snapshot_date, snapshot_time, time_and_date_stamp = extract_timestamp_from_filename(
                 filename, table_type)
@@ -355,6 +414,30 @@ def load_csv_files(folder, table_name, conn, already_loaded):
             conn.commit()
             new_files.append(filename)
 
+            # Pre-aggregate the seat prices of this snapshot for the price sum chart
+            if AGGREGATES_MODULE_EXISTS and table_name == "seat_wise_prices_raw":
+                try:
+                    upsert_aggregates(conn, aggregate_seat_wise_frame(df))
+                except Exception as e:
+                    print(f"⚠️ Error updating seat-wise aggregates for {filename}: {e}")
+                    conn.rollback()
+
+            # Record the route of each schedule, its rollups are rebuilt once all files are loaded
+            if ROUTE_MODULE_EXISTS and table_name == "seat_wise_prices_raw":
+                try:
+                    upsert_routes(conn, route_frame(df))
+                except Exception as e:
+                    print(f"⚠️ Error updating route dimension for {filename}: {e}")
+                    conn.rollback()
+
+            # Record the departure times and seat types of each operator for the price comparison
+            if DEPARTURE_INDEX_MODULE_EXISTS and table_name == "seat_prices_with_dt":
+                try:
+                    upsert_index(conn, index_frame(df))
+                except Exception as e:
+                    print(f"⚠️ Error updating departure time index for {filename}: {e}")
+                    conn.rollback()
+
     # Handle partitioning if needed and if we have data to partition
     if needs_partitioning and all_loaded_dfs:
         print(f"\n🔄 Processing partitioning for {table_name}...")
@@ -409,6 +492,9 @@ def load_csv_files(folder, table_name, conn, already_loaded):
             except Exception as e:
                 print(f"❌ Error during partitioning: {e}")
                 # Continue with regular processing even if partitioning fails
+
+    if new_files:
+        loaded_tables.add(table_name)
     
     return new_files
 
@@ -544,6 +630,26 @@ def main():
     # Ensure all tables exist once at the beginning
     print("🛠️ Ensuring tables with proper schema...")
     ensure_tables_exist_once(conn)
+    if DEMAND_INDEX_MODULE_EXISTS:
+        ensure_demand_index_columns(conn)
+    else:
+        print("⚠️ demand_index.py not found. Skipping demand index normalization.")
+    if AGGREGATES_MODULE_EXISTS:
+        ensure_aggregate_table(conn)
+    else:
+        print("⚠️ seat_wise_aggregates.py not found. Skipping seat-wise aggregates.")
+    if DEPARTURE_INDEX_MODULE_EXISTS:
+        ensure_index_table(conn)
+    else:
+        print("⚠️ departure_index.py not found. Skipping departure time index.")
+    if ROUTE_MODULE_EXISTS:
+        ensure_route_tables(conn)
+    else:
+        print("⚠️ route_dimension.py not found. Skipping route dimension.")
+    if NOTIFICATIONS_MODULE_EXISTS:
+        ensure_data_change_table(conn)
+    else:
+        print("⚠️ data_notifications.py not found. Running dashboards will pick up the load from its log.")
 
     # Load new files from each directory
     print(f"📂 Checking for new files in {SEAT_PRICES_DIR}...")
@@ -569,7 +675,33 @@ def main():
     print(f"📊 Found {len(new_seat_dt_files)} new seat_prices_with_dt files, and {len(new_wise_dt_files)} new seat_wise_prices_with_dt files")
 
     if all_new_files:
+        if ROUTE_MODULE_EXISTS and loaded_schedule_ids:
+            print(f"🔄 Rebuilding route rollups for {len(loaded_schedule_ids)} schedules...")
+            try:
+                refresh_route_rollups(conn, loaded_schedule_ids)
+                loaded_tables.add("route_hourly_rollups")
+            except Exception as e:
+                print(f"⚠️ Error rebuilding route rollups: {e}")
+                conn.rollback()
+
+        # Update the dashboard's dimension cache before the log, which is what tells
+        # running dashboards that a load finished
+        if DIMENSION_CACHE_MODULE_EXISTS:
+            print(f"🔄 Updating dimension cache for {len(loaded_schedule_ids)} schedules...")
+            refresh_dimension_cache(loaded_schedule_ids)
+        else:
+            print("⚠️ dimension_cache.py not found. Skipping dimension cache update.")
+
         update_log(all_new_files)
+
+        # Everything the dashboards read is in place, tell the running ones what changed
+        if NOTIFICATIONS_MODULE_EXISTS:
+            try:
+                notify_data_loaded(conn, loaded_tables, loaded_dates, loaded_schedule_ids)
+            except Exception as e:
+                print(f"⚠️ Error notifying dashboards of the load: {e}")
+                conn.rollback()
+
         print("🔄 Refreshing views...")
         refresh_views(conn)
         print(f"✅ Successfully loaded {len(all_new_files)} new files")
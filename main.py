@@ -7,7 +7,7 @@ from date_utils import is_past_date
 from date_summary_kpis import create_date_summary_kpis
 
 # Import custom modules
-from db_utils import get_filtered_data, get_seat_wise_data, get_seat_wise_prices
+from db_utils import get_filtered_data, get_seat_wise_data, get_origin_destination_by_schedule_id, is_truncated
 from slicers import create_slicers_panel
 from kpis import create_kpi_row
 from graphs import (
@@ -20,6 +20,19 @@ from graphs import (
 from seat_slider import create_seat_price_slider, create_seat_details_card
 from seat_map import create_seat_map
 from price_comparison import create_price_comparison_layout, register_price_comparison_callbacks
+from batch_comparison import register_batch_comparison_callbacks
+from route_view import create_route_layout, register_route_callbacks
+from callback_metrics import instrument_app
+from export import register_export_routes, export_url
+from api import register_api_routes
+from concurrent_fetch import request_deadline, submit_fetches, gather_fetches
+from schedule_bundle import get_schedule_bundle, get_shared_seat_wise_prices
+from metadata_cache import start_metadata_refresh, get_cached_layout
+from component_cache import memoize_component
+from data_version import get_data_version, get_scope_version
+from data_notifications import start_data_listener
+from schedule_search import search_schedule_ids
+from seat_pricing import get_seat_view_model
 
 # Initialize Dash app with Bootstrap theme - using DARKLY for a modern dark theme
 app = dash.Dash(
@@ -32,6 +45,28 @@ app = dash.Dash(
     suppress_callback_exceptions=True
 )
 
+# Let browsers cache the static assets (seat icons, seat map script) instead of revalidating them on each use
+ASSET_MAX_AGE_SECONDS = 24 * 60 * 60
+app.server.config['SEND_FILE_MAX_AGE_DEFAULT'] = ASSET_MAX_AGE_SECONDS
+
+# Record per-callback latency and expose it on /metrics (add ?profile=1 to profile a request)
+instrument_app(app)
+
+# Stream filtered seat prices as CSV (or Arrow) on /export/seat-prices.<fmt>
+register_export_routes(app)
+
+# Read-only JSON API with ETags on /api/v1/...
+register_api_routes(app)
+
+# Load the dropdown option lists in the background so page loads don't query the big tables
+start_metadata_refresh()
+
+# Invalidate cached data as the loader notifies new batches (see data_notifications.py)
+start_data_listener()
+
+# How often open dashboards check whether their selection's data changed, 0 to disable
+LIVE_REFRESH_SECONDS = 30
+
 # Custom CSS for better styling
 app.index_string = '''
 <!DOCTYPE html>
@@ -311,6 +346,12 @@ navbar = dbc.Navbar(
                         id="price-comparison-link",
                         className="px-3 nav-link-custom"
                     )),
+                    dbc.NavItem(dbc.NavLink(
+                        [html.I(className="fas fa-route mr-1"), " Routes"], 
+                        href="/routes", 
+                        id="routes-link",
+                        className="px-3 nav-link-custom"
+                    )),
                 ],
                 className="ml-auto",
                 navbar=True,
@@ -450,6 +491,12 @@ def create_dashboard_layout():
     
     # Store component for sharing data between callbacks
     dcc.Store(id="filtered-data-store"),
+
+    # Live refresh: the data version of the selection, and a counter bumped when it changed
+    dcc.Interval(id="live-refresh-interval", interval=max(LIVE_REFRESH_SECONDS, 1) * 1000,
+                 disabled=not LIVE_REFRESH_SECONDS),
+    dcc.Store(id="selection-data-version"),
+    dcc.Store(id="live-refresh-count"),
     
 ], fluid=True)
 
@@ -462,36 +509,36 @@ def create_dashboard_layout():
 )
 def update_hours_before_departure_slicer(schedule_id):
     """Update hours before departure dropdown options based on selected schedule ID"""
-    from db_utils import get_hours_before_departure
-    
     if schedule_id:
         # Get hours before departure options for the selected schedule ID
-        hours = get_hours_before_departure(schedule_id)
+        bundle = get_schedule_bundle(schedule_id)
+        hours = bundle['hours_before_departure'] if bundle else []
         options = [{'label': f'{h} hours', 'value': h} for h in hours]
         return [options]
     else:
         # No schedule ID selected, return empty options
         return [[]]
 
-# Callback to update schedule ID slicer when date of journey is selected
+# Callback to update schedule ID slicer when date of journey is selected or the user types in it
 @app.callback(
     Output("schedule-id-dropdown", "options"),
-    [Input("date-of-journey-dropdown", "value")]
+    [Input("date-of-journey-dropdown", "value"),
+     Input("schedule-id-dropdown", "search_value"),
+     Input("schedule-id-dropdown", "value")]
 )
-def update_schedule_id_slicer(date_of_journey):
-    """Update schedule ID slicer based on selected date of journey"""
-    from db_utils import get_schedule_ids_by_date, get_schedule_ids
-    
-    if date_of_journey:
-        # Get schedule IDs for the selected date of journey
-        schedule_ids = get_schedule_ids_by_date(date_of_journey)
-        options = [{'label': str(sid), 'value': sid} for sid in schedule_ids]
-        return options
-    else:
-        # If no date is selected, show all schedule IDs
-        schedule_ids = get_schedule_ids()
-        options = [{'label': str(sid), 'value': sid} for sid in schedule_ids]
-        return options
+def update_schedule_id_slicer(date_of_journey, search_value, selected_schedule_id):
+    """Update schedule ID slicer with the top matches for the typed value, within the selected date
+
+    Only SCHEDULE_SEARCH_LIMIT options are sent, the user narrows them down by typing.
+    """
+    schedule_ids = search_schedule_ids(search_value, date_of_journey or None)
+    
+    # The dropdown drops a value that isn't in its options, keep the selected schedule in the list
+    if selected_schedule_id and str(selected_schedule_id) not in schedule_ids:
+        schedule_ids = [str(selected_schedule_id)] + schedule_ids
+    
+    options = [{'label': str(sid), 'value': sid} for sid in schedule_ids]
+    return options
 
 # Callback to update KPIs and charts based on filters
 @app.callback(
@@ -506,18 +553,28 @@ def update_schedule_id_slicer(date_of_journey):
         Input("schedule-id-dropdown", "value"),
         Input("hours-before-departure-dropdown", "value"),
         Input("date-of-journey-dropdown", "value"),
-        Input("operator-name-container", "children")
+        Input("operator-name-container", "children"),
+        Input("live-refresh-count", "data")
     ]
 )
-def update_dashboard(schedule_id, hours_before_departure, date_of_journey, operator_name_div):
+def update_dashboard(schedule_id, hours_before_departure, date_of_journey, operator_name_div, refresh_count=None):
+    """Update dashboard components based on selected filters - seat type filter removed as requested
+
+    The KPI row, occupancy chart, data table and seat-wise price sum chart each
+    query the database independently, so they are fetched concurrently.
+    """
+    deadline = request_deadline()
+
+    # Seat-wise price sum chart only depends on schedule_id, start it before the operator lookup
+    futures = submit_fetches({'seat_wise_price_sum': (create_seat_wise_price_sum_chart, schedule_id)})
+
     # Extract operator_id from the operator-name-container div if available
     operator_id = None
     if operator_name_div is not None and len(operator_name_div) > 0:
         # The operator name is stored in the div, we can get the operator_id from the schedule_id
         if schedule_id:
-            from db_utils import get_operator_id_by_schedule_id
-            operator_id = get_operator_id_by_schedule_id(schedule_id)
-    """Update dashboard components based on selected filters - seat type filter removed as requested"""
+            bundle = get_schedule_bundle(schedule_id)
+            operator_id = bundle['operator_id'] if bundle else None
     # Set seat_type to None to show all seat types
     seat_type = None
     
@@ -527,17 +584,21 @@ def update_dashboard(schedule_id, hours_before_departure, date_of_journey, opera
     
     # Only show KPIs when hours_before_departure is selected
     if hours_before_departure is not None:
-        try:
-            print(f"Creating KPI row with: schedule_id={schedule_id}, operator_id={operator_id}, seat_type={seat_type}, hours_before_departure={hours_before_departure}")
-            kpi_row = create_kpi_row(schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
-        except Exception as e:
-            import traceback
-            print(f"Error creating KPI row: {str(e)}")
-            print(f"Error type: {type(e).__name__}")
-            print("Full traceback:")
-            traceback.print_exc()
-            kpi_row = html.Div([html.P(f"Error loading KPIs: {str(e)}")])
-    else:
+        print(f"Creating KPI row with: schedule_id={schedule_id}, operator_id={operator_id}, seat_type={seat_type}, hours_before_departure={hours_before_departure}")
+        futures.update(submit_fetches({
+            'kpi_row': (create_kpi_row, schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
+        }))
+    
+    # Price trend and price delta charts removed as requested
+    # Seat scatter chart removed as requested
+    futures.update(submit_fetches({
+        'occupancy_chart': (create_occupancy_chart, schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey),
+        'table_data': (get_filtered_data, schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
+    }))
+    
+    results, errors = gather_fetches(futures, deadline)
+    
+    if hours_before_departure is None:
         # Show a message prompting to select an hour before departure
         kpi_row = html.Div([
             html.Div([
@@ -546,21 +607,28 @@ def update_dashboard(schedule_id, hours_before_departure, date_of_journey, opera
                        style={'padding': '20px'})
             ], className="w-100")
         ], className="row justify-content-center")
+    elif 'kpi_row' in errors:
+        e = errors['kpi_row']
+        print(f"Error creating KPI row: {str(e)}")
+        print(f"Error type: {type(e).__name__}")
+        import traceback
+        print("Full traceback:")
+        traceback.print_exception(type(e), e, e.__traceback__)
+        kpi_row = html.Div([html.P(f"Error loading KPIs: {str(e)}")])
+    else:
+        kpi_row = results['kpi_row']
     
-    # Price trend and price delta charts removed as requested
-    
-    try:
-        # Get occupancy chart
-        occupancy_chart = create_occupancy_chart(schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
-    except Exception as e:
-        print(f"Error creating occupancy chart: {str(e)}")
+    if 'occupancy_chart' in errors:
+        print(f"Error creating occupancy chart: {str(errors['occupancy_chart'])}")
         occupancy_chart = default_message
-    
-    # Seat scatter chart removed as requested
+    else:
+        occupancy_chart = results['occupancy_chart']
     
     try:
+        if 'table_data' in errors:
+            raise errors['table_data']
         # Get data for table
-        df = get_filtered_data(schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
+        df = results['table_data']
         
         if df is not None and not df.empty:
             # Store data for sharing between callbacks
@@ -606,6 +674,25 @@ def update_dashboard(schedule_id, hours_before_departure, date_of_journey, opera
                 filter_action='native',
                 page_action='native'
             )
+
+            # The table only holds what was loaded here, the export streams every matching row
+            export_filters = dict(schedule_id=schedule_id, operator_id=operator_id, seat_type=seat_type,
+                                  hours_before_departure=hours_before_departure, date_of_journey=date_of_journey)
+            data_table = html.Div([
+                html.Div([
+                    html.A([html.I(className="fas fa-file-csv mr-1"), " Export CSV"],
+                           href=export_url("csv", **export_filters), className="btn btn-sm btn-outline-info mr-2"),
+                    html.A([html.I(className="fas fa-table mr-1"), " Export Arrow"],
+                           href=export_url("arrow", **export_filters), className="btn btn-sm btn-outline-info")
+                ], className="mb-2 text-right"),
+                data_table
+            ])
+            if is_truncated(df):
+                data_table.children.insert(0, dbc.Alert(
+                    f"Showing the newest {len(df):,} rows only, the selection has more. "
+                    "Narrow the filters or export to get every row.",
+                    color="warning", className="py-2"
+                ))
         else:
             data_json = None
             data_table = html.P("No data available for the selected filters.")
@@ -614,23 +701,35 @@ def update_dashboard(schedule_id, hours_before_departure, date_of_journey, opera
         data_table = default_message
         data_json = None
     
-    try:
-        # Get seat-wise price sum chart (only depends on schedule_id, not on hours_before_departure)
-        seat_wise_price_sum_chart = create_seat_wise_price_sum_chart(schedule_id)
-    except Exception as e:
+    if 'seat_wise_price_sum' in errors:
+        e = errors['seat_wise_price_sum']
         print(f"Error creating seat-wise price sum chart: {str(e)}")
         seat_wise_price_sum_chart = html.Div([html.P(f"Error loading seat-wise price sum chart: {str(e)}", className="text-danger text-center")])
+    else:
+        seat_wise_price_sum_chart = results['seat_wise_price_sum']
     
     return kpi_row, occupancy_chart, data_table, data_json, seat_wise_price_sum_chart
 
+@memoize_component("seat_visualizations")
+def build_seat_visualizations(schedule_id, hours_before_departure):
+    """Seat price slider and seat map for a schedule and hour, or None if there is no seat-wise data"""
+    # Seat prices for the selected schedule ID and hour before departure, formatted once for both components
+    view_model = get_seat_view_model(schedule_id, hours_before_departure)
+    if view_model is None or view_model.empty:
+        return None
+    
+    # Create the seat price slider and seat map components
+    return create_seat_price_slider(view_model), create_seat_map(view_model)
+
 # Callback to update seat price slider based on selected schedule ID and hours before departure
 @app.callback(
     [Output("seat-price-slider-container", "children"),
      Output("seat-map-container", "children")],
     [Input("schedule-id-dropdown", "value"),
-     Input("hours-before-departure-dropdown", "value")]
+     Input("hours-before-departure-dropdown", "value"),
+     Input("live-refresh-count", "data")]
 )
-def update_seat_visualizations(schedule_id, hours_before_departure):
+def update_seat_visualizations(schedule_id, hours_before_departure, refresh_count=None):
     """Update seat price slider and seat map based on selected schedule ID and hour before departure"""
     if not schedule_id:
         empty_message = html.Div([
@@ -646,14 +745,10 @@ def update_seat_visualizations(schedule_id, hours_before_departure):
         return empty_message, empty_message
     
     try:
-        # Get seat-wise pricing data for the selected schedule ID and hour before departure
-        df = get_seat_wise_prices(schedule_id, hours_before_departure)
+        seat_components = build_seat_visualizations(schedule_id, hours_before_departure)
         
-        if df is not None and not df.empty:
-            # Create the seat price slider and seat map components
-            seat_slider = create_seat_price_slider(df)
-            seat_map = create_seat_map(df)
-            return seat_slider, seat_map
+        if seat_components is not None:
+            return seat_components
         else:
             empty_message = html.Div([
                 html.P(f"No seat-wise pricing data available for schedule ID: {schedule_id} and hour before departure: {hours_before_departure}", 
@@ -667,6 +762,31 @@ def update_seat_visualizations(schedule_id, hours_before_departure):
         ])
         return error_message, error_message
 
+# Callback to refresh the dashboard when new data was loaded for the selected schedule or date
+@app.callback(
+    [Output("selection-data-version", "data"),
+     Output("live-refresh-count", "data")],
+    [Input("live-refresh-interval", "n_intervals")],
+    [State("schedule-id-dropdown", "value"),
+     State("date-of-journey-dropdown", "value"),
+     State("selection-data-version", "data"),
+     State("live-refresh-count", "data")]
+)
+def poll_selection_data_version(n_intervals, schedule_id, date_of_journey, last_version, refresh_count):
+    """Bump the refresh counter only when the data of an unchanged selection changed
+
+    Cheap enough to run on a timer: the version comes from memory, not the database.
+    """
+    selection = [schedule_id, date_of_journey]
+    scope = [value for value in selection if value]
+    version = {'selection': selection, 'version': repr((get_data_version(), get_scope_version(scope)))}
+    if version == last_version:
+        return dash.no_update, dash.no_update
+    if last_version is None or last_version.get('selection') != selection:
+        # First poll or a new selection, which the dashboard callbacks already render
+        return version, dash.no_update
+    return version, (refresh_count or 0) + 1
+
 # Callback to update origin and destination when schedule ID is selected
 @app.callback(
     [
@@ -680,12 +800,15 @@ def update_route_info(schedule_id):
     if not schedule_id:
         return "", ""
     
-    # For now, hardcode the origin and destination for all schedule IDs
-    # This is a temporary solution until we can fix the database query
-    origin_id = 1646
-    destination_id = 1821
-    origin_name = "Santiago"
-    destination_name = "La Serena"
+    # The route is in the prefetched bundle, shared with the other schedule callbacks
+    bundle = get_schedule_bundle(schedule_id)
+    if bundle is not None and bundle['origin_id'] is not None:
+        origin_id, destination_id = bundle['origin_id'], bundle['destination_id']
+        origin_name, destination_name = bundle['origin_name'], bundle['destination_name']
+    else:
+        origin_id, destination_id, origin_name, destination_name = get_origin_destination_by_schedule_id(schedule_id)
+    if origin_id is None:
+        return "Unknown", "Unknown"
     
     # Format the origin and destination display
     origin_display = f"{origin_name} (ID: {origin_id})"
@@ -706,7 +829,7 @@ def update_seat_details(selected_seat, schedule_id):
     
     try:
         # Get seat-wise pricing data for the selected schedule ID
-        df = get_seat_wise_prices(schedule_id)
+        df = get_shared_seat_wise_prices(schedule_id)
         
         if df is not None and not df.empty:
             # Filter data for the selected seat
@@ -843,6 +966,8 @@ app.layout = html.Div([
 
 # Register the price comparison callbacks
 register_price_comparison_callbacks(app)
+register_batch_comparison_callbacks(app)
+register_route_callbacks(app)
 
 # Callback to render the correct page content based on URL
 @app.callback(
@@ -850,22 +975,28 @@ register_price_comparison_callbacks(app)
     Input('url', 'pathname')
 )
 def display_page(pathname):
+    # Layouts are cached and only rebuilt when the option lists change
     if pathname == '/price-difference':
-        return create_price_comparison_layout()
+        return get_cached_layout('price_comparison', create_price_comparison_layout)
+    elif pathname == '/routes':
+        return get_cached_layout('routes', create_route_layout)
     else:  # Default to dashboard
-        return create_dashboard_layout()
+        return get_cached_layout('dashboard', create_dashboard_layout)
 
 # Callback to highlight active nav link
 @app.callback(
     [Output('dashboard-link', 'active'),
-     Output('price-comparison-link', 'active')],
+     Output('price-comparison-link', 'active'),
+     Output('routes-link', 'active')],
     [Input('url', 'pathname')]
 )
 def set_active_link(pathname):
     if pathname == '/price-difference':
-        return False, True
+        return False, True, False
+    elif pathname == '/routes':
+        return False, False, True
     else:
-        return True, False
+        return True, False, False
 
 # Run the app
 if __name__ == '__main__':
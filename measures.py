@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
-from db_utils import get_filtered_data, get_seat_wise_data, execute_query
+from db_utils import get_filtered_data, get_seat_wise_data, execute_query, build_filtered_data_query, DataUnavailable
+from schedule_bundle import coalesced_fetch
+from seat_wise_aggregates import AGGREGATE_TABLE, NUMERIC_PATTERN
 
 def calculate_price_delta(actual_fare, model_price):
     """Calculate the delta between actual fare and model price"""
@@ -14,234 +16,200 @@ def calculate_price_delta_percentage(actual_fare, model_price):
         return 0
     return (float(actual_fare) - float(model_price)) / float(model_price) * 100
 
+# KPI values returned when there is no data
+EMPTY_KPI_DATA = {
+    'avg_actual_fare': 0,
+    'avg_model_price': 0,
+    'avg_delta': 0,
+    'avg_delta_pct': 0,
+    'avg_occupancy': 0,
+    'avg_expected_occupancy': 0
+}
+
+# Columns of the numeric frame passed to compute_kpis, in order
+KPI_COLUMNS = ('actual_fare', 'model_price', 'actual_occupancy', 'expected_occupancy')
+
+def to_numeric_array(values, dtype=np.float64):
+    """Convert a column (numeric or TEXT) to a float array, empty strings and NULLs become NaN"""
+    if values is None:
+        return None
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        return values.to_numpy(dtype=dtype, na_value=np.nan)
+    try:
+        # Fast path: well-formed numbers, parsed by NumPy
+        return values.mask(values == '').to_numpy(dtype=dtype, na_value=np.nan)
+    except (ValueError, TypeError):
+        return pd.to_numeric(values, errors='coerce').to_numpy(dtype=dtype, na_value=np.nan)
+
+def detect_model_price_col(df):
+    """Column holding the model price, falling back to actual_fare"""
+    for col in ('price', 'final_price', 'actual_fare'):
+        if col in df.columns:
+            return col
+    return None
+
+def kpi_frame(df, model_price_col=None, dtype=np.float64):
+    """Build the compact numeric frame for compute_kpis from a filtered data frame
+
+    Each column is converted once and the caller's frame is not modified.
+
+    Returns:
+        np.ndarray: Array of shape (rows, 4) with the KPI_COLUMNS, NaN where a value is missing
+    """
+    if model_price_col is None or model_price_col not in df.columns:
+        model_price_col = detect_model_price_col(df)
+
+    values = np.full((len(df), len(KPI_COLUMNS)), np.nan, dtype=dtype)
+    sources = ('actual_fare', model_price_col, 'actual_occupancy', 'expected_occupancy')
+    for i, col in enumerate(sources):
+        if col is not None and col in df.columns:
+            values[:, i] = to_numeric_array(df[col], dtype)
+    return values
+
+def kpis_from_means(avg_actual_fare, avg_model_price, avg_occupancy, avg_expected_occupancy):
+    """KPI dict from the four means, with the delta derived from the fare and model price means"""
+    avg_delta = avg_actual_fare - avg_model_price
+    avg_delta_pct = avg_delta / avg_model_price * 100 if avg_model_price != 0 else 0.0
+
+    return {
+        'avg_actual_fare': round(avg_actual_fare, 2),
+        'avg_model_price': round(avg_model_price, 2),
+        'avg_delta': round(avg_delta, 2),
+        'avg_delta_pct': round(avg_delta_pct, 2),
+        'avg_occupancy': round(avg_occupancy, 2),
+        'avg_expected_occupancy': round(avg_expected_occupancy, 2)
+    }
+
+def compute_kpis(values):
+    """Compute the six KPI aggregates from a numeric frame built by kpi_frame
+
+    Means ignore missing values, a column without any value averages to 0.
+    """
+    values = np.asarray(values)
+    if values.size == 0:
+        return dict(EMPTY_KPI_DATA)
+
+    # One reduction over all columns: the sum and count of the non-missing values
+    present = ~np.isnan(values)
+    counts = present.sum(axis=0)
+    sums = np.nansum(values, axis=0, dtype=np.float64)
+    means = np.divide(sums, counts, out=np.zeros(len(KPI_COLUMNS)), where=counts > 0)
+
+    return kpis_from_means(*means.tolist())
+
+def get_filtered_kpi_data(schedule_id=None, operator_id=None, seat_type=None, hours_before_departure=None, date_of_journey=None):
+    """KPI aggregates over every row matching the dashboard filters, computed in the database
+
+    Unlike get_kpi_data over get_filtered_data's frame, this isn't limited by the
+    interactive row budget. Means ignore values that aren't numbers, as compute_kpis does.
+
+    Returns:
+        dict: as compute_kpis, or None if no row matches
+
+    Raises:
+        DataUnavailable: if the query failed
+    """
+    _, params, where_clause = build_filtered_data_query(
+        schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
+    averages = ",\n".join(
+        f"""COALESCE(AVG(CASE WHEN "{col}"::TEXT ~ %(kpi_pattern)s THEN "{col}"::TEXT::NUMERIC END), 0)::DOUBLE PRECISION AS {name}"""
+        for col, name in (('actual_fare', 'avg_actual_fare'), ('price', 'avg_model_price'),
+                          ('actual_occupancy', 'avg_occupancy'), ('expected_occupancy', 'avg_expected_occupancy'))
+    )
+    query = f"""
+    SELECT COUNT(*) AS row_count,
+    {averages}
+    FROM seat_prices_partitioned
+    WHERE {where_clause}
+    """
+    df = execute_query(query, dict(params, kpi_pattern=NUMERIC_PATTERN))
+    if df is None:
+        raise DataUnavailable("KPI query failed")
+    if df.empty or int(df['row_count'].iloc[0]) == 0:
+        return None
+    row = df.iloc[0]
+    return kpis_from_means(float(row['avg_actual_fare']), float(row['avg_model_price']),
+                           float(row['avg_occupancy']), float(row['avg_expected_occupancy']))
+
 def get_kpi_data(df, model_price_col=None):
     """Get KPI data for the dashboard"""
     try:
-        print(f"\n\n===== DEBUG: get_kpi_data called with: =====")
-        print(f"DataFrame shape: {df.shape if df is not None else 'None'}")
-        print(f"model_price_col: {model_price_col}")
-        
-        # Check if we have a valid DataFrame to work with
         if df is None or df.empty:
-            print("DataFrame is None or empty, returning zeros")
-            return {
-                'avg_actual_fare': 0,
-                'avg_model_price': 0,
-                'avg_delta': 0,
-                'avg_delta_pct': 0,
-                'avg_occupancy': 0,
-                'avg_expected_occupancy': 0
-            }
-        
-        print(f"DataFrame shape: {df.shape}")
-        print(f"DataFrame columns: {df.columns.tolist()}")
-        print(f"First row: {df.iloc[0].to_dict() if not df.empty else 'Empty DataFrame'}")
-        
-        # Convert columns to numeric
-        print("Converting columns to numeric")
-        
-        # Handle actual_fare column
-        if 'actual_fare' in df.columns:
-            # Convert TEXT column to numeric, handling empty strings and None values
-            df['actual_fare'] = df['actual_fare'].replace(['', None], '0')
-            df['actual_fare'] = pd.to_numeric(df['actual_fare'], errors='coerce').fillna(0)
-            print(f"actual_fare values (after conversion): {df['actual_fare'].tolist()}")
-        else:
-            print("WARNING: actual_fare column not found")
-            df['actual_fare'] = 0
-        
-        # Use the provided model_price_col or determine it from the DataFrame
-        if model_price_col is None:
-            # Auto-detect model price column if not provided
-            if 'price' in df.columns:
-                model_price_col = 'price'
-                print(f"Auto-detected model_price_col: 'price'")
-            elif 'final_price' in df.columns:
-                model_price_col = 'final_price'
-                print(f"Auto-detected model_price_col: 'final_price'")
-            else:
-                # If we have actual_fare but no model price, use actual_fare as model price
-                if 'actual_fare' in df.columns:
-                    print("Using actual_fare as model price")
-                    df['price'] = df['actual_fare']
-                    model_price_col = 'price'
-                else:
-                    print("WARNING: No suitable model price column found")
-                    model_price_col = None
-        
-        # Ensure the model_price_col exists and convert to numeric
-        if model_price_col and model_price_col in df.columns:
-            # Convert TEXT column to numeric, handling empty strings and None values
-            df[model_price_col] = df[model_price_col].replace(['', None], '0')
-            df[model_price_col] = pd.to_numeric(df[model_price_col], errors='coerce').fillna(0)
-            print(f"{model_price_col} values (after conversion): {df[model_price_col].tolist()}")
-        else:
-            print(f"WARNING: Model price column '{model_price_col}' not found in dataframe. Columns: {df.columns.tolist()}")
-            # Create a fallback if needed
-            if 'actual_fare' in df.columns:
-                df['price'] = df['actual_fare']
-                model_price_col = 'price'
-                print("Created fallback model price column using actual_fare")
-            else:
-                model_price_col = None
-        
-        # Handle TimeAndDateStamp more carefully
-        # Check for both uppercase and lowercase versions of the column
-        if 'timeanddatestamp' in df.columns:
-            try:
-                print("Found lowercase timeanddatestamp column")
-                df['timeanddatestamp'] = pd.to_datetime(df['timeanddatestamp'], errors='coerce')
-            except Exception as e:
-                print(f"Error converting timeanddatestamp: {str(e)}")
-        elif 'TimeAndDateStamp' in df.columns:
-            try:
-                print("Found uppercase TimeAndDateStamp column")
-                df['TimeAndDateStamp'] = pd.to_datetime(df['TimeAndDateStamp'], errors='coerce')
-            except Exception as e:
-                print(f"Error converting TimeAndDateStamp: {str(e)}")
-                # Continue without the conversion if it fails
-                pass
-        
-        # Handle occupancy columns
-        if 'actual_occupancy' in df.columns:
-            # Convert TEXT column to numeric, handling empty strings and None values
-            df['actual_occupancy'] = df['actual_occupancy'].replace(['', None], '0')
-            df['actual_occupancy'] = pd.to_numeric(df['actual_occupancy'], errors='coerce').fillna(0)
-        else:
-            print("WARNING: actual_occupancy column not found")
-            df['actual_occupancy'] = 0
-            
-        if 'expected_occupancy' in df.columns:
-            # Convert TEXT column to numeric, handling empty strings and None values
-            df['expected_occupancy'] = df['expected_occupancy'].replace(['', None], '0')
-            df['expected_occupancy'] = pd.to_numeric(df['expected_occupancy'], errors='coerce').fillna(0)
-        else:
-            print("WARNING: expected_occupancy column not found")
-            df['expected_occupancy'] = 0
-        
-        # Calculate KPIs
-        print("Calculating KPIs")
-        # Ensure numeric types before calculating means
-        # Already converted above, but ensure they are numeric for safety
-        df['actual_fare'] = pd.to_numeric(df['actual_fare'], errors='coerce').fillna(0)
-        
-        if model_price_col and model_price_col in df.columns:
-            df[model_price_col] = pd.to_numeric(df[model_price_col], errors='coerce').fillna(0)
-            # Calculate mean, ensuring it returns a float
-            avg_model_price = float(df[model_price_col].mean()) if len(df[model_price_col]) > 0 else 0.0
-        else:
-            avg_model_price = 0.0
-            
-        # Calculate mean, ensuring it returns a float
-        avg_actual_fare = float(df['actual_fare'].mean()) if len(df['actual_fare']) > 0 else 0.0
-        
-        # Calculate delta and delta percentage (values are already float)
-        print(f"DEBUG: Before delta calculation - avg_actual_fare type: {type(avg_actual_fare)}, value: {avg_actual_fare}")
-        print(f"DEBUG: Before delta calculation - avg_model_price type: {type(avg_model_price)}, value: {avg_model_price}")
-        
-        # Ensure both are numeric before subtraction
-        try:
-            avg_actual_fare = float(avg_actual_fare) if avg_actual_fare is not None else 0.0
-            avg_model_price = float(avg_model_price) if avg_model_price is not None else 0.0
-        except (ValueError, TypeError) as e:
-            print(f"ERROR: Failed to convert to float - avg_actual_fare: {avg_actual_fare}, avg_model_price: {avg_model_price}")
-            print(f"Error details: {e}")
-            avg_actual_fare = 0.0
-            avg_model_price = 0.0
-        
-        avg_delta = avg_actual_fare - avg_model_price
-        
-        # Avoid division by zero
-        if avg_model_price != 0:
-            avg_delta_pct = (avg_delta / avg_model_price) * 100
-        else:
-            avg_delta_pct = 0
-            
-        # Calculate occupancy means, ensuring they return floats
-        avg_occupancy = float(df['actual_occupancy'].mean()) if len(df['actual_occupancy']) > 0 else 0.0
-        avg_expected_occupancy = float(df['expected_occupancy'].mean()) if len(df['expected_occupancy']) > 0 else 0.0
-        
-        print(f"KPI Calculation Results:")
-        print(f"avg_actual_fare: {avg_actual_fare}")
-        print(f"avg_model_price: {avg_model_price}")
-        print(f"avg_delta: {avg_delta}")
-        print(f"avg_delta_pct: {avg_delta_pct}")
-        print(f"avg_occupancy: {avg_occupancy}")
-        print(f"avg_expected_occupancy: {avg_expected_occupancy}")
-        
-        # Return the KPI data
-        return {
-            'avg_actual_fare': round(avg_actual_fare, 2) if not pd.isna(avg_actual_fare) else 0,
-            'avg_model_price': round(avg_model_price, 2) if not pd.isna(avg_model_price) else 0,
-            'avg_delta': round(avg_delta, 2) if not pd.isna(avg_delta) else 0,
-            'avg_delta_pct': round(avg_delta_pct, 2) if not pd.isna(avg_delta_pct) else 0,
-            'avg_occupancy': round(avg_occupancy, 2) if not pd.isna(avg_occupancy) else 0,
-            'avg_expected_occupancy': round(avg_expected_occupancy, 2) if not pd.isna(avg_expected_occupancy) else 0
-        }
+            return dict(EMPTY_KPI_DATA)
+        return compute_kpis(kpi_frame(df, model_price_col))
     except Exception as e:
         print(f"Error in get_kpi_data: {str(e)}")
-        return {
-            'avg_actual_fare': 0,
-            'avg_model_price': 0,
-            'avg_delta': 0,
-            'avg_delta_pct': 0,
-            'avg_occupancy': 0,
-            'avg_expected_occupancy': 0
-        }
-
-def get_price_trend_data(schedule_id=None, operator_id=None, seat_type=None, hours_before_departure=None, date_of_journey=None):
-    """Get price trend data for the chart"""
+        return dict(EMPTY_KPI_DATA)
+
+# Upper bound on points per price series sent to a chart, None disables decimation
+PRICE_SERIES_MAX_POINTS = 2000
+
+def decimate_series(df, max_points, value_col='delta'):
+    """Reduce a time-sorted series to about max_points rows
+
+    The rows are split into max_points / 2 equal buckets and the minimum and
+    maximum of value_col are kept from each, so spikes survive the decimation.
+    """
+    if not max_points or len(df) <= max_points:
+        return df
+    buckets = max(max_points // 2, 1)
+    bucket = np.arange(len(df)) * buckets // len(df)
+    values = pd.Series(df[value_col].to_numpy(), index=np.arange(len(df)))
+    grouped = values.fillna(0).groupby(bucket)
+    keep = np.union1d(grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy())
+    return df.iloc[keep].reset_index(drop=True)
+
+def build_price_series(df, max_points=PRICE_SERIES_MAX_POINTS):
+    """Turn filtered data into the time-sorted price series used by the trend and delta charts
+
+    Returns a new frame with TimeAndDateStamp, actual_fare, price, delta and
+    delta_pct; delta and delta_pct are NaN where a price is missing.
+    """
+    actual_fare = to_numeric_array(df['actual_fare'])
+    price = to_numeric_array(df['price']) if 'price' in df.columns else actual_fare
+    delta = actual_fare - price
+    delta_pct = np.full(len(df), np.nan)
+    np.divide(delta * 100, price, out=delta_pct, where=(price != 0) & ~np.isnan(price))
+
+    series = pd.DataFrame({
+        # Specify format explicitly to avoid warnings
+        'TimeAndDateStamp': pd.to_datetime(df['TimeAndDateStamp'], format='%d-%m-%Y %H:%M:%S', errors='coerce'),
+        'actual_fare': actual_fare,
+        'price': price,
+        'delta': delta,
+        'delta_pct': delta_pct
+    })
+    series = series.sort_values('TimeAndDateStamp', kind='stable', ignore_index=True)
+    return decimate_series(series, max_points)
+
+def fetch_price_series(schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey, max_points):
+    """Query the filtered data and build the price series (None if the query returned nothing)"""
     df = get_filtered_data(schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
-    
     if df is None or df.empty:
+        return None
+    return build_price_series(df, max_points)
+
+def get_price_series(schedule_id=None, operator_id=None, seat_type=None, hours_before_departure=None, date_of_journey=None,
+                     max_points=PRICE_SERIES_MAX_POINTS):
+    """Price series for a selection, fetched once and shared by the trend and delta charts"""
+    key = ('price_series', str(schedule_id), operator_id, seat_type, hours_before_departure, date_of_journey, max_points)
+    try:
+        df = coalesced_fetch(key, fetch_price_series, schedule_id, operator_id, seat_type,
+                             hours_before_departure, date_of_journey, max_points)
+    except Exception as e:
+        print(f"Error getting price series: {str(e)}")
         return pd.DataFrame()
-    
-    # Convert columns to numeric and datetime (handle TEXT columns from partitioned tables)
-    df['actual_fare'] = df['actual_fare'].replace(['', None], '0')
-    df['actual_fare'] = pd.to_numeric(df['actual_fare'], errors='coerce').fillna(0)
-    
-    if 'price' in df.columns:
-        df['price'] = df['price'].replace(['', None], '0')
-        df['price'] = pd.to_numeric(df['price'], errors='coerce').fillna(0)
-    else:
-        df['price'] = df['actual_fare']
-    # Specify format explicitly to avoid warnings
-    df['TimeAndDateStamp'] = pd.to_datetime(df['TimeAndDateStamp'], format='%d-%m-%Y %H:%M:%S', errors='coerce')
-    
-    # Sort by timestamp
-    df = df.sort_values('TimeAndDateStamp')
-    
-    # Calculate delta
-    df['delta'] = df.apply(lambda row: calculate_price_delta(row['actual_fare'], row['price']), axis=1)
-    
-    return df
+    return df.copy() if df is not None else pd.DataFrame()
+
+def get_price_trend_data(schedule_id=None, operator_id=None, seat_type=None, hours_before_departure=None, date_of_journey=None,
+                         max_points=PRICE_SERIES_MAX_POINTS):
+    """Get price trend data for the chart"""
+    return get_price_series(schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey, max_points)
 
-def get_price_delta_data(schedule_id=None, operator_id=None, seat_type=None, hours_before_departure=None, date_of_journey=None):
+def get_price_delta_data(schedule_id=None, operator_id=None, seat_type=None, hours_before_departure=None, date_of_journey=None,
+                         max_points=PRICE_SERIES_MAX_POINTS):
     """Get price delta data for the chart"""
-    df = get_filtered_data(schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey)
-    
-    if df is None or df.empty:
-        return pd.DataFrame()
-    
-    # Convert columns to numeric and datetime (handle TEXT columns from partitioned tables)
-    df['actual_fare'] = df['actual_fare'].replace(['', None], '0')
-    df['actual_fare'] = pd.to_numeric(df['actual_fare'], errors='coerce').fillna(0)
-    
-    if 'price' in df.columns:
-        df['price'] = df['price'].replace(['', None], '0')
-        df['price'] = pd.to_numeric(df['price'], errors='coerce').fillna(0)
-    else:
-        df['price'] = df['actual_fare']
-    # Specify format explicitly to avoid warnings
-    df['TimeAndDateStamp'] = pd.to_datetime(df['TimeAndDateStamp'], format='%d-%m-%Y %H:%M:%S', errors='coerce')
-    
-    # Sort by timestamp
-    df = df.sort_values('TimeAndDateStamp')
-    
-    # Calculate delta
-    df['delta'] = df.apply(lambda row: calculate_price_delta(row['actual_fare'], row['price']), axis=1)
-    
-    return df
+    return get_price_series(schedule_id, operator_id, seat_type, hours_before_departure, date_of_journey, max_points)
 
 def get_occupancy_data(schedule_id=None, operator_id=None, seat_type=None, hours_before_departure=None, date_of_journey=None):
     """Get occupancy data for charts - using partitioned table for better performance"""
@@ -300,6 +268,58 @@ def get_occupancy_data(schedule_id=None, operator_id=None, seat_type=None, hours
     
     return df
 
+# Sum of actual and model prices over the seats of the latest snapshots, computed from the seat rows
+SEAT_WISE_PRICE_SUM_QUERY = """
+WITH all_hours AS (
+    -- Get all distinct hours before departure for this schedule
+    SELECT DISTINCT "hours_before_departure"
+    FROM seat_prices_partitioned
+    WHERE "schedule_id" = %(schedule_id)s
+    ORDER BY "hours_before_departure" DESC
+),
+all_seat_types AS (
+    -- Get all distinct seat types for this schedule
+    SELECT DISTINCT "seat_type"
+    FROM seat_prices_partitioned
+    WHERE "schedule_id" = %(schedule_id)s
+),
+latest_snapshots AS (
+    -- Get the latest snapshot for each hour before departure and seat type
+    SELECT DISTINCT ON (sp."hours_before_departure", sp."seat_type") 
+        sp."hours_before_departure", 
+        sp."seat_type",
+        sp."TimeAndDateStamp"
+    FROM seat_prices_partitioned sp
+    WHERE sp."schedule_id" = %(schedule_id)s
+    ORDER BY sp."hours_before_departure", sp."seat_type", sp."TimeAndDateStamp" DESC
+),
+latest_seat_data AS (
+    -- Get the latest data for each seat number within each snapshot
+    SELECT DISTINCT ON (swp."seat_number", ls."hours_before_departure", ls."seat_type")
+        ls."hours_before_departure",
+        ls."seat_type",
+        swp."seat_number",
+        CAST(swp."actual_fare" AS NUMERIC) as "actual_fare",
+        CAST(swp."final_price" AS NUMERIC) as "final_price"
+    FROM latest_snapshots ls
+    JOIN seat_wise_prices_partitioned swp 
+        ON swp."TimeAndDateStamp" = ls."TimeAndDateStamp" 
+        AND swp."seat_type" = ls."seat_type"
+        AND swp."schedule_id" = %(schedule_id)s
+    ORDER BY 
+        swp."seat_number", ls."hours_before_departure", ls."seat_type", swp."TimeAndDateStamp" DESC
+)
+SELECT 
+    "hours_before_departure",
+    "seat_type",
+    SUM("actual_fare") as "total_actual_price",
+    SUM("final_price") as "total_model_price",
+    COUNT(DISTINCT "seat_number") as "seat_count"
+FROM latest_seat_data
+GROUP BY "hours_before_departure", "seat_type"
+ORDER BY "hours_before_departure" DESC
+"""
+
 def get_seat_wise_price_sum_by_hour(schedule_id):
     """Get sum of actual and model prices for all seats by hours before departure
     
@@ -316,23 +336,12 @@ def get_seat_wise_price_sum_by_hour(schedule_id):
         # Convert schedule_id to string to ensure consistency
         schedule_id = str(schedule_id)
         
-        # Query to get the sum of actual_fare and final_price by hours before departure and seat_type
-        query = """
-        WITH all_hours AS (
-            -- Get all distinct hours before departure for this schedule
-            SELECT DISTINCT "hours_before_departure"
-            FROM seat_prices_partitioned
-            WHERE "schedule_id" = %(schedule_id)s
-            ORDER BY "hours_before_departure" DESC
-        ),
-        all_seat_types AS (
-            -- Get all distinct seat types for this schedule
-            SELECT DISTINCT "seat_type"
-            FROM seat_prices_partitioned
-            WHERE "schedule_id" = %(schedule_id)s
-        ),
-        latest_snapshots AS (
-            -- Get the latest snapshot for each hour before departure and seat type
+        # Sums precomputed by the loader for each snapshot (see seat_wise_aggregates.py),
+        # read for the latest snapshot of each hour before departure and seat type.
+        # Snapshots the loader didn't aggregate (a failed upsert, or loaded before the
+        # table existed and not backfilled) are summed from their seat rows.
+        query = f"""
+        WITH latest_snapshots AS (
             SELECT DISTINCT ON (sp."hours_before_departure", sp."seat_type") 
                 sp."hours_before_departure", 
                 sp."seat_type",
@@ -341,36 +350,57 @@ def get_seat_wise_price_sum_by_hour(schedule_id):
             WHERE sp."schedule_id" = %(schedule_id)s
             ORDER BY sp."hours_before_departure", sp."seat_type", sp."TimeAndDateStamp" DESC
         ),
-        latest_seat_data AS (
-            -- Get the latest data for each seat number within each snapshot
-            SELECT DISTINCT ON (swp."seat_number", ls."hours_before_departure", ls."seat_type")
+        snapshot_sums AS (
+            SELECT 
                 ls."hours_before_departure",
                 ls."seat_type",
-                swp."seat_number",
-                CAST(swp."actual_fare" AS NUMERIC) as "actual_fare",
-                CAST(swp."final_price" AS NUMERIC) as "final_price"
+                ls."TimeAndDateStamp",
+                agg."total_actual_price",
+                agg."total_model_price",
+                agg."seat_count"
             FROM latest_snapshots ls
+            LEFT JOIN {AGGREGATE_TABLE} agg
+                ON agg."schedule_id" = %(schedule_id)s
+                AND agg."TimeAndDateStamp" = ls."TimeAndDateStamp"
+                AND agg."seat_type" = ls."seat_type"
+        ),
+        missing_seat_data AS (
+            SELECT DISTINCT ON (swp."seat_number", ss."hours_before_departure", ss."seat_type")
+                ss."hours_before_departure",
+                ss."seat_type",
+                swp."seat_number",
+                CASE WHEN swp."actual_fare"::TEXT ~ %(pattern)s THEN swp."actual_fare"::TEXT::NUMERIC END AS "actual_fare",
+                CASE WHEN swp."final_price"::TEXT ~ %(pattern)s THEN swp."final_price"::TEXT::NUMERIC END AS "final_price"
+            FROM snapshot_sums ss
             JOIN seat_wise_prices_partitioned swp 
-                ON swp."TimeAndDateStamp" = ls."TimeAndDateStamp" 
-                AND swp."seat_type" = ls."seat_type"
+                ON swp."TimeAndDateStamp" = ss."TimeAndDateStamp" 
+                AND swp."seat_type" = ss."seat_type"
                 AND swp."schedule_id" = %(schedule_id)s
-            ORDER BY 
-                swp."seat_number", ls."hours_before_departure", ls."seat_type", swp."TimeAndDateStamp" DESC
+            WHERE ss."seat_count" IS NULL
+            ORDER BY swp."seat_number", ss."hours_before_departure", ss."seat_type"
         )
+        SELECT "hours_before_departure", "seat_type", "total_actual_price", "total_model_price", "seat_count"
+        FROM snapshot_sums
+        WHERE "seat_count" IS NOT NULL
+        UNION ALL
         SELECT 
             "hours_before_departure",
             "seat_type",
-            SUM("actual_fare") as "total_actual_price",
-            SUM("final_price") as "total_model_price",
-            COUNT(DISTINCT "seat_number") as "seat_count"
-        FROM latest_seat_data
+            SUM("actual_fare"),
+            SUM("final_price"),
+            COUNT(DISTINCT "seat_number")
+        FROM missing_seat_data
         GROUP BY "hours_before_departure", "seat_type"
         ORDER BY "hours_before_departure" DESC
         """
         
-        params = {'schedule_id': schedule_id}
+        params = {'schedule_id': schedule_id, 'pattern': NUMERIC_PATTERN}
         df = execute_query(query, params)
         
+        # The aggregate table doesn't exist yet, sum everything from the seat rows
+        if df is None:
+            df = execute_query(SEAT_WISE_PRICE_SUM_QUERY, params)
+        
         if df is None or df.empty:
             print(f"No seat-wise price sum data found for schedule_id={schedule_id}")
             return pd.DataFrame()
@@ -0,0 +1,142 @@
+"""
+Metadata cache for the option lists used while building page layouts.
+
+The dates of journey and seat types are full-table DISTINCT queries.
+They are loaded by a background thread when the app starts and refreshed on a
+timer, or as soon as the loader has written new files to its log, so building
+a layout or navigating between pages never waits on the big tables.
+Built layouts are cached too, and rebuilt when the metadata changes.
+"""
+import threading
+import time
+
+from db_utils import get_all_dates_of_journey, get_seat_types
+from concurrent_fetch import fetch_concurrently
+from data_version import get_load_log_mtime
+
+# How often the option lists are reloaded from the database
+METADATA_REFRESH_SECONDS = 300
+
+# How often the loader's log file is checked for a finished load
+LOAD_CHECK_SECONDS = 10
+
+# How long a layout waits for the first warm-up before rendering with empty options
+WARM_WAIT_SECONDS = 10
+
+_metadata = {}
+_metadata_version = 0
+_metadata_lock = threading.Lock()
+_warmed = threading.Event()
+_refresh_thread = None
+
+_layouts = {}  # name -> (metadata version, layout)
+_layouts_lock = threading.Lock()
+
+
+def _load_dates_of_journey_with_dt():
+    """Dates of journey for the price comparison page"""
+    from price_comparison import get_dates_of_journey_with_dt
+    df = get_dates_of_journey_with_dt()
+    return df['date_of_journey'].tolist() if df is not None else None
+
+
+def _load_operators_with_dt():
+    """Operators for the batch price comparison"""
+    from price_comparison import get_operators_with_dt
+    df = get_operators_with_dt()
+    return df['operator_id'].astype(str).tolist() if df is not None else None
+
+
+def _load_routes():
+    """Route options for the route view"""
+    from route_view import get_routes
+    return get_routes()
+
+
+# Name -> function returning the option values (None when the query failed)
+METADATA_LOADERS = {
+    'dates_of_journey': get_all_dates_of_journey,
+    'seat_types': get_seat_types,
+    'dates_of_journey_with_dt': _load_dates_of_journey_with_dt,
+    'operators_with_dt': _load_operators_with_dt,
+    'routes': _load_routes,
+}
+
+
+def refresh_metadata(names=None):
+    """Reload option lists from the database, keeping the previous values when a query fails"""
+    global _metadata_version
+
+    results, errors = fetch_concurrently({name: (METADATA_LOADERS[name],) for name in names or METADATA_LOADERS})
+    for name, values in results.items():
+        if values is None:
+            continue
+        with _metadata_lock:
+            if _metadata.get(name) != values:
+                _metadata[name] = values
+                _metadata_version += 1
+
+    _warmed.set()
+
+
+def _refresh_loop(interval):
+    """Warm the cache, then refresh it on the timer or when a load finished"""
+    last_refresh = 0
+    last_log_mtime = get_load_log_mtime()
+    while True:
+        log_mtime = get_load_log_mtime()
+        if time.monotonic() - last_refresh >= interval or log_mtime != last_log_mtime:
+            refresh_metadata()
+            last_refresh = time.monotonic()
+            last_log_mtime = log_mtime
+        time.sleep(LOAD_CHECK_SECONDS)
+
+
+def start_metadata_refresh(interval=METADATA_REFRESH_SECONDS):
+    """Start warming and refreshing the cache in the background (once per process)"""
+    global _refresh_thread
+
+    with _metadata_lock:
+        if _refresh_thread is not None:
+            return
+        _refresh_thread = threading.Thread(target=_refresh_loop, args=(interval,), name="metadata-refresh", daemon=True)
+        _refresh_thread.start()
+
+
+def get_metadata(name, wait=WARM_WAIT_SECONDS):
+    """Get a cached option list
+
+    Waits for the first warm-up at most `wait` seconds, and returns an empty
+    list if the values are still not available.
+    """
+    start_metadata_refresh()
+    with _metadata_lock:
+        values = _metadata.get(name)
+    if values is None and wait:
+        _warmed.wait(wait)
+        with _metadata_lock:
+            values = _metadata.get(name)
+    return list(values) if values is not None else []
+
+
+def get_metadata_version():
+    """Counter that changes whenever any cached option list changes"""
+    with _metadata_lock:
+        return _metadata_version
+
+
+def get_cached_layout(name, build_layout):
+    """Return a cached layout, rebuilding it when the metadata it was built from changed"""
+    # Let the first build see warmed option lists instead of caching an empty layout
+    start_metadata_refresh()
+    _warmed.wait(WARM_WAIT_SECONDS)
+    version = get_metadata_version()
+    with _layouts_lock:
+        cached = _layouts.get(name)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    layout = build_layout()
+    with _layouts_lock:
+        _layouts[name] = (version, layout)
+    return layout
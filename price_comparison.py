@@ -2,9 +2,16 @@ import dash
 from dash import html, dcc, callback_context, dash_table
 from dash.dependencies import Input, Output, State
 import dash_bootstrap_components as dbc
+import threading
+from collections import OrderedDict
+
 import pandas as pd
 import psycopg2
 from db_utils import get_connection, execute_query
+from metadata_cache import get_metadata
+from concurrent_fetch import fetch_concurrently
+from data_version import get_data_version, get_scope_version
+from departure_index import matching_departure_times, has_departure_times, fetch_indexed_operators
 
 def get_operator_name_by_id(operator_id):
     """Get operator name based on operator_id
@@ -43,7 +50,11 @@ def get_operator_name_by_id(operator_id):
             return "Other"
 
 def get_operators_with_dt():
-    """Get unique operators from seat_prices_with_dt_partitioned table"""
+    """Get unique operators from the departure time index, or seat_prices_with_dt_partitioned without it"""
+    result = fetch_indexed_operators()
+    if result is not None and not result.empty:
+        return result
+
     query = """
     SELECT DISTINCT operator_id
     FROM seat_prices_with_dt_partitioned
@@ -67,44 +78,19 @@ def get_matching_times_of_journey(date_of_journey, model_operator_id, actual_ope
     Get matching times of journey (departure_time) for two operators on a specific date
     """
     print(f"Searching for matching times: DOJ={date_of_journey}, Model Op={model_operator_id}, Actual Op={actual_operator_id}")
-    
-    # First check if departure_time is NULL for these operators
-    check_query = """
-    SELECT COUNT(*) as count
-    FROM seat_prices_with_dt_partitioned
-    WHERE operator_id IN (%s, %s)
-      AND date_of_journey = %s
-      AND departure_time IS NOT NULL
-    """
-    check_result = execute_query(check_query, params=(str(model_operator_id), str(actual_operator_id), date_of_journey))
-    
-    if check_result is None or check_result.empty or check_result['count'].iloc[0] == 0:
+
+    if not has_departure_times(date_of_journey, model_operator_id, actual_operator_id):
         print(f"No non-NULL departure_times found for these operators on {date_of_journey}")
-        # Return a default time for testing
-        import pandas as pd
-        return pd.DataFrame({'departure_time': ['08:00:00']})
-    
-    query = """
-    SELECT DISTINCT a.departure_time
-    FROM seat_prices_with_dt_partitioned a
-    JOIN seat_prices_with_dt_partitioned b ON a.departure_time = b.departure_time
-        AND a.date_of_journey = b.date_of_journey
-    WHERE a.date_of_journey = %s
-        AND a.operator_id = %s
-        AND b.operator_id = %s
-        AND a.departure_time IS NOT NULL
-    ORDER BY a.departure_time
-    """
-    result = execute_query(query, params=(date_of_journey, str(model_operator_id), str(actual_operator_id)))
-    
-    if result is None or result.empty:
-        print("No matching times found in database query")
+        return pd.DataFrame({'departure_time': []})
+
+    times = matching_departure_times(date_of_journey, model_operator_id, actual_operator_id)
+    if not times:
+        print("No matching times found in the departure time index")
         # Return an empty DataFrame with the correct column structure
-        import pandas as pd
         return pd.DataFrame({'departure_time': []})
-    
-    print(f"Found {len(result)} matching times: {result['departure_time'].tolist()}")
-    return result
+
+    print(f"Found {len(times)} matching times: {times}")
+    return pd.DataFrame({'departure_time': times})
 
 def get_matching_times_with_same_seat_types(date_of_journey, operator1_id, operator2_id):
     """
@@ -119,188 +105,166 @@ def get_matching_times_with_same_seat_types(date_of_journey, operator1_id, opera
     Returns:
         pandas.DataFrame: DataFrame containing matching departure times
     """
-    # Direct join approach as requested
-    query = """
-    SELECT DISTINCT a.departure_time
-    FROM seat_prices_with_dt_partitioned a
-    JOIN seat_prices_with_dt_partitioned b ON a.departure_time = b.departure_time
-        AND a.date_of_journey = b.date_of_journey
-        AND a.seat_type = b.seat_type
-    WHERE a.date_of_journey = %s
-        AND a.operator_id = %s
-        AND b.operator_id = %s
-        AND a.departure_time IS NOT NULL
-    ORDER BY a.departure_time
-    """
-    
-    result = execute_query(query, params=(date_of_journey, str(operator1_id), str(operator2_id)))
-    
-    if result is None or result.empty:
+    # Intersect the operators' departure times and seat types from the departure time index
+    times = matching_departure_times(date_of_journey, operator1_id, operator2_id, same_seat_types=True)
+
+    if not times:
         print(f"No matching times with same seat types found for operators {operator1_id} and {operator2_id} on {date_of_journey}")
         # Return an empty DataFrame with the correct column structure
         return pd.DataFrame({'departure_time': []})
-    
-    print(f"Found {len(result)} matching times with same seat types: {result['departure_time'].tolist()}")
-    return result
 
-def get_price_comparison_data(date_of_journey, model_operator_id, actual_operator_id, time_of_journey):
-    """
-    Get price comparison data for two operators on a specific date and time of journey
-    """
-    # Get model prices from partitioned table for better performance
-    model_query = """
-    -- Using partitioned table for better performance
-    SELECT 
-        sp.seat_type,
-        sp.price,
-        sp.hours_before_departure,
-        sp.schedule_id
-    FROM seat_prices_with_dt_partitioned sp
-    JOIN (
-        -- Get the latest timestamp for each schedule_id and seat_type combination
-        SELECT 
-            schedule_id,
-            seat_type,
-            MAX("TimeAndDateStamp") as latest_timestamp
-        FROM seat_prices_with_dt_partitioned
-        WHERE date_of_journey = %s
-            AND operator_id = %s
-            AND departure_time = %s
-        GROUP BY schedule_id, seat_type
-    ) latest ON 
-        sp.schedule_id = latest.schedule_id AND
-        sp.seat_type = latest.seat_type AND
-        sp."TimeAndDateStamp" = latest.latest_timestamp
-    WHERE sp.date_of_journey = %s
-        AND sp.operator_id = %s
-        AND sp.departure_time = %s
-    """
-    # Cast operator_id to string to match database column type
-    model_prices = execute_query(model_query, params=(date_of_journey, str(model_operator_id), time_of_journey, 
-                                                    date_of_journey, str(model_operator_id), time_of_journey))
-    
-    # Get actual prices from partitioned table for better performance
-    actual_query = """
-    -- Using partitioned table for better performance
-    SELECT 
-        sp.seat_type,
-        sp.actual_fare as price,  -- For non-dynamic pricing operator, use actual_fare column
-        sp.hours_before_departure,
-        sp.schedule_id
-    FROM seat_prices_with_dt_partitioned sp
-    JOIN (
-        -- Get the latest timestamp for each schedule_id and seat_type combination
-        SELECT 
-            schedule_id,
-            seat_type,
-            MAX("TimeAndDateStamp") as latest_timestamp
+    print(f"Found {len(times)} matching times with same seat types: {times}")
+    return pd.DataFrame({'departure_time': times})
+
+# Seat type prices at the latest snapshot of each date, schedule and seat type, as WITH items defining
+# latest_prices. Parameters: date_from, date_to, operator_ids and whatever departure_time_filter uses.
+# Shared by the single comparison and the batch comparison (batch_comparison.py).
+LATEST_PRICES_CTE = """
+    latest AS (
+        SELECT operator_id, date_of_journey, schedule_id, seat_type, MAX("TimeAndDateStamp") AS latest_timestamp
         FROM seat_prices_with_dt_partitioned
-        WHERE date_of_journey = %s
-            AND operator_id = %s
-            AND departure_time = %s
-        GROUP BY schedule_id, seat_type
-    ) latest ON 
-        sp.schedule_id = latest.schedule_id AND
-        sp.seat_type = latest.seat_type AND
-        sp."TimeAndDateStamp" = latest.latest_timestamp
-    WHERE sp.date_of_journey = %s
-        AND sp.operator_id = %s
-        AND sp.departure_time = %s
-    """
-    # Cast operator_id to string to match database column type
-    actual_prices = execute_query(actual_query, params=(date_of_journey, str(actual_operator_id), time_of_journey,
-                                                      date_of_journey, str(actual_operator_id), time_of_journey))
-    
-    # Get model seat-wise prices using partitioned tables
-    model_seat_wise_query = """
-    -- Using partitioned tables for better performance
-    SELECT 
+        WHERE date_of_journey BETWEEN %(date_from)s AND %(date_to)s
+            AND operator_id = ANY(%(operator_ids)s)
+            {departure_time_filter}
+        GROUP BY operator_id, date_of_journey, schedule_id, seat_type
+    ),
+    latest_prices AS (
+        SELECT sp.*
+        FROM seat_prices_with_dt_partitioned sp
+        JOIN latest ON
+            sp.operator_id = latest.operator_id AND
+            sp.date_of_journey = latest.date_of_journey AND
+            sp.schedule_id = latest.schedule_id AND
+            sp.seat_type = latest.seat_type AND
+            sp."TimeAndDateStamp" = latest.latest_timestamp
+        -- The latest snapshots already carry the selection, the dates keep partition pruning
+        WHERE sp.date_of_journey BETWEEN %(date_from)s AND %(date_to)s
+    )
+"""
+
+# Latest snapshots of one date and departure time, both operators are fetched together
+COMPARISON_CTE = LATEST_PRICES_CTE.format(departure_time_filter="AND departure_time = %(departure_time)s")
+
+# Seat type prices of both operators
+COMPARISON_PRICES_QUERY = f"""
+    WITH {COMPARISON_CTE}
+    SELECT operator_id, seat_type, price, actual_fare, hours_before_departure, schedule_id
+    FROM latest_prices
+"""
+
+# Seat-wise prices of the same schedules, the latest snapshot of each seat
+COMPARISON_SEAT_WISE_QUERY = f"""
+    WITH {COMPARISON_CTE},
+    schedules AS (
+        SELECT DISTINCT operator_id, schedule_id FROM latest
+    )
+    SELECT DISTINCT ON (swp.schedule_id, swp.seat_number)
+        schedules.operator_id,
         swp.seat_number,
         swp.seat_type,
         swp.final_price,
+        swp.actual_fare,
         swp.schedule_id
     FROM seat_wise_prices_with_dt_partitioned swp
-    JOIN (
-        -- Get schedule IDs for the selected date, operator, and time
-        SELECT DISTINCT schedule_id 
-        FROM seat_prices_with_dt_partitioned 
-        WHERE date_of_journey = %s 
-            AND operator_id = %s 
-            AND departure_time = %s
-    ) rs ON swp.schedule_id = rs.schedule_id
-    -- Only include rows where "TimeAndDateStamp" is the latest for each seat
-    JOIN (
-        SELECT 
-            schedule_id,
-            seat_number,
-            MAX("TimeAndDateStamp") as latest_timestamp
-        FROM seat_wise_prices_with_dt_partitioned
-        WHERE travel_date = %s
-        GROUP BY schedule_id, seat_number
-    ) latest ON 
-        swp.schedule_id = latest.schedule_id AND
-        swp.seat_number = latest.seat_number AND
-        swp."TimeAndDateStamp" = latest.latest_timestamp
-    -- Add explicit index hints
-    /* QUERY PLAN HINT: Use indexes on (schedule_id, seat_number, "TimeAndDateStamp") */
+    JOIN schedules ON swp.schedule_id = schedules.schedule_id
+    WHERE swp.travel_date BETWEEN %(date_from)s AND %(date_to)s
+    ORDER BY swp.schedule_id, swp.seat_number, swp."TimeAndDateStamp" DESC
+"""
+
+# Comparisons kept in memory, the least recently viewed are evicted first
+PRICE_COMPARISON_CACHE_MAX_ENTRIES = 128
+
+_comparison_cache = OrderedDict()  # (doj, model op, actual op, departure time) -> (data version, result)
+_comparison_cache_lock = threading.Lock()
+
+
+def _operator_rows(df, operator_id, price_col, columns):
+    """Rows of one operator, with price_col renamed to the last of the columns and made numeric"""
+    rows = df.loc[df['operator_id'].astype(str) == str(operator_id)]
+    rows = rows.rename(columns={price_col: columns[-1]})[columns]
+    rows[columns[-1]] = pd.to_numeric(rows[columns[-1]], errors='coerce')
+    return rows.reset_index(drop=True)
+
+
+def fetch_price_comparison_data(date_of_journey, model_operator_id, actual_operator_id, time_of_journey):
+    """Fetch the seat type and seat-wise prices of both operators
+
+    Both operators come back from the same two queries, which run concurrently.
+    The model operator is priced by its model price, the other operator by its
+    actual fare.
+
+    Returns:
+        dict: model_prices, actual_prices, model_seat_wise_prices and actual_seat_wise_prices,
+              or None if a query failed
     """
-    # Cast operator_id to string to match database column type
-    model_seat_wise_prices = execute_query(model_seat_wise_query, 
-                                           params=(date_of_journey, str(model_operator_id), time_of_journey, date_of_journey))
-    
+    params = {
+        'date_from': date_of_journey,
+        'date_to': date_of_journey,
+        # Cast operator_id to string to match database column type
+        'operator_ids': [str(model_operator_id), str(actual_operator_id)],
+        'departure_time': time_of_journey
+    }
+    results, errors = fetch_concurrently({
+        'prices': (execute_query, COMPARISON_PRICES_QUERY, params),
+        'seat_wise_prices': (execute_query, COMPARISON_SEAT_WISE_QUERY, params)
+    })
+    prices = results.get('prices')
+    seat_wise_prices = results.get('seat_wise_prices')
+    if errors or prices is None or seat_wise_prices is None:
+        return None
+
+    price_columns = ['seat_type', 'hours_before_departure', 'schedule_id', 'price']
+    seat_wise_columns = ['seat_number', 'seat_type', 'schedule_id', 'final_price']
+
+    comparison_data = {
+        'model_prices': _operator_rows(prices, model_operator_id, 'price', price_columns),
+        # For the non-dynamic pricing operator, use the actual_fare column
+        'actual_prices': _operator_rows(prices.drop(columns=['price']), actual_operator_id,
+                                        'actual_fare', price_columns),
+        'model_seat_wise_prices': _operator_rows(seat_wise_prices, model_operator_id,
+                                                 'final_price', seat_wise_columns),
+        'actual_seat_wise_prices': _operator_rows(seat_wise_prices.drop(columns=['final_price']),
+                                                  actual_operator_id, 'actual_fare', seat_wise_columns)
+    }
+
     # Sort by seat_number in ascending order
-    if model_seat_wise_prices is not None and not model_seat_wise_prices.empty:
-        model_seat_wise_prices['seat_number'] = pd.to_numeric(model_seat_wise_prices['seat_number'], errors='coerce')
-        model_seat_wise_prices = model_seat_wise_prices.sort_values('seat_number')
-    
-    # Get actual seat-wise prices using partitioned tables
-    actual_seat_wise_query = """
-    -- Using partitioned tables for better performance
-    SELECT 
-        swp.seat_number,
-        swp.seat_type,
-        swp.actual_fare as final_price,
-        swp.schedule_id
-    FROM seat_wise_prices_with_dt_partitioned swp
-    JOIN (
-        -- Get schedule IDs for the selected date, operator, and time
-        SELECT DISTINCT schedule_id 
-        FROM seat_prices_with_dt_partitioned 
-        WHERE date_of_journey = %s 
-            AND operator_id = %s 
-            AND departure_time = %s
-    ) rs ON swp.schedule_id = rs.schedule_id
-    -- Only include rows where "TimeAndDateStamp" is the latest for each seat
-    JOIN (
-        SELECT 
-            schedule_id,
-            seat_number,
-            MAX("TimeAndDateStamp") as latest_timestamp
-        FROM seat_wise_prices_with_dt_partitioned
-        WHERE travel_date = %s
-        GROUP BY schedule_id, seat_number
-    ) latest ON 
-        swp.schedule_id = latest.schedule_id AND
-        swp.seat_number = latest.seat_number AND
-        swp."TimeAndDateStamp" = latest.latest_timestamp
-    -- Add explicit index hints
-    /* QUERY PLAN HINT: Use indexes on (schedule_id, seat_number, "TimeAndDateStamp") */
+    for key in ('model_seat_wise_prices', 'actual_seat_wise_prices'):
+        seat_wise = comparison_data[key]
+        seat_wise['seat_number'] = pd.to_numeric(seat_wise['seat_number'], errors='coerce')
+        comparison_data[key] = seat_wise.sort_values('seat_number', ignore_index=True)
+    return comparison_data
+
+
+def get_price_comparison_data(date_of_journey, model_operator_id, actual_operator_id, time_of_journey):
     """
-    # Cast operator_id to string to match database column type
-    actual_seat_wise_prices = execute_query(actual_seat_wise_query, 
-                                            params=(date_of_journey, str(actual_operator_id), time_of_journey, date_of_journey))
-    
-    # Sort by seat_number in ascending order
-    if actual_seat_wise_prices is not None and not actual_seat_wise_prices.empty:
-        actual_seat_wise_prices['seat_number'] = pd.to_numeric(actual_seat_wise_prices['seat_number'], errors='coerce')
-        actual_seat_wise_prices = actual_seat_wise_prices.sort_values('seat_number')
-    
-    return {
-        'model_prices': model_prices,
-        'actual_prices': actual_prices,
-        'model_seat_wise_prices': model_seat_wise_prices,
-        'actual_seat_wise_prices': actual_seat_wise_prices
-    }
+    Get price comparison data for two operators on a specific date and time of journey
+
+    Results are cached per (date, operator pair, departure time) until new data
+    is loaded, so going back to a comparison already viewed doesn't query again.
+    Returns copies, callers may modify them.
+    """
+    key = (str(date_of_journey), str(model_operator_id), str(actual_operator_id), str(time_of_journey))
+    version = (get_data_version(), get_scope_version([key[0]]))
+    with _comparison_cache_lock:
+        entry = _comparison_cache.get(key)
+        if entry is not None and entry[0] == version:
+            _comparison_cache.move_to_end(key)
+            comparison_data = entry[1]
+        else:
+            comparison_data = None
+
+    if comparison_data is None:
+        comparison_data = fetch_price_comparison_data(date_of_journey, model_operator_id,
+                                                      actual_operator_id, time_of_journey)
+        if comparison_data is None:
+            return None
+        with _comparison_cache_lock:
+            _comparison_cache[key] = (version, comparison_data)
+            _comparison_cache.move_to_end(key)
+            while len(_comparison_cache) > PRICE_COMPARISON_CACHE_MAX_ENTRIES:
+                _comparison_cache.popitem(last=False)
+
+    return {name: df.copy() for name, df in comparison_data.items()}
 
 def get_operator_name_by_id(operator_id):
     """Get operator name based on operator_id"""
@@ -313,17 +277,14 @@ def get_operator_name_by_id(operator_id):
 
 def create_price_comparison_layout():
     """Create the layout for the price comparison page"""
-    # Get available operators
-    operators_df = get_operators_with_dt()
     # Create options with explicit names instead of using operator IDs
     operator_options = [
         {'label': 'Pullman San Andreas', 'value': 191},
         {'label': 'Pullman Bus TS', 'value': 296}
     ]
     
-    # Get available dates
-    dates_df = get_dates_of_journey_with_dt()
-    date_options = [{'label': date, 'value': date} for date in dates_df['date_of_journey'].tolist()]
+    # Get available dates (from the metadata cache, refreshed in the background)
+    date_options = [{'label': date, 'value': date} for date in get_metadata('dates_of_journey_with_dt')]
     
     return html.Div([
         dbc.Card(
@@ -403,9 +364,17 @@ def create_price_comparison_layout():
                 )
             ]),
             className="shadow-sm mb-4 bg-dark text-white"
-        )
+        ),
+
+        # Date range and multi-operator comparison (imported here, batch_comparison imports this module)
+        create_batch_comparison_section()
     ])
 
+def create_batch_comparison_section():
+    """Batch comparison card shown below the single comparison"""
+    from batch_comparison import create_batch_comparison_layout
+    return create_batch_comparison_layout()
+
 def create_price_comparison_kpi_cards(comparison_data, model_operator_name, actual_operator_name):
     """Create KPI cards for price comparison"""
     if comparison_data is None or any(df.empty for df in comparison_data.values()):
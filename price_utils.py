@@ -1,6 +1,6 @@
-import pandas as pd
 import calendar
-from db_utils import execute_query, get_seat_types_by_schedule_id
+from db_utils import execute_query, get_seat_types_by_schedule_id, DataUnavailable
+from seat_wise_aggregates import NUMERIC_PATTERN
 from datetime import datetime
 import numpy as np
 
@@ -13,7 +13,8 @@ def get_prices_by_schedule_and_hour(schedule_id, hours_before_departure):
         hours_before_departure (int): Hours before departure
         
     Returns:
-        dict: Dictionary with seat types as keys and price data as values
+        dict: Dictionary with seat types as keys and price data as values,
+              empty if there is no data, None if a query failed
     """
     # Ensure schedule_id is a string and hours_before_departure is a float
     schedule_id = str(schedule_id)
@@ -50,8 +51,10 @@ def get_prices_by_schedule_and_hour(schedule_id, hours_before_departure):
     
     print(f"DEBUG: Executing snapshot query for schedule_id={schedule_id}, hours_before_departure={hours_before_departure}")
     snapshot_df = execute_query(snapshot_query, snapshot_params)
+    if snapshot_df is None:
+        return None
     
-    if snapshot_df is None or snapshot_df.empty:
+    if snapshot_df.empty:
         print(f"No snapshot time found for schedule_id={schedule_id}, hours_before_departure={hours_before_departure}")
         # Try with a broader range as a fallback
         broader_query = """
@@ -62,8 +65,10 @@ def get_prices_by_schedule_and_hour(schedule_id, hours_before_departure):
         LIMIT 1
         """
         broader_df = execute_query(broader_query, snapshot_params)
+        if broader_df is None:
+            return None
         
-        if broader_df is None or broader_df.empty:
+        if broader_df.empty:
             print(f"Still no snapshot time found with broader query")
             return {}
         
@@ -100,6 +105,8 @@ def get_prices_by_schedule_and_hour(schedule_id, hours_before_departure):
         }
         
         price_df = execute_query(price_query, price_params)
+        if price_df is None:
+            return None
         
         # Extract prices or set to None if not available
         actual_price = None
@@ -162,7 +169,7 @@ def get_price_by_seat_type(schedule_id, seat_type, hours_before_departure=None):
         tuple: (actual_price, model_price)
     """
     # Get all prices
-    prices = get_prices_by_schedule_and_hour(schedule_id, hours_before_departure)
+    prices = get_prices_by_schedule_and_hour(schedule_id, hours_before_departure) or {}
     
     # Return prices for the specified seat type
     if seat_type in prices:
@@ -183,44 +190,62 @@ def get_total_seat_prices(schedule_id=None, hours_before_departure=None, date_of
     Returns:
         dict: Dictionary with total prices
     """
-    from db_utils import get_seat_wise_data
+    empty_totals = {
+        'total_actual_price': 0,
+        'total_model_price': 0,
+        'price_difference': 0,
+        'seat_count': 0
+    }
+    if not schedule_id:
+        return empty_totals
     
-    # Get seat-wise data
-    df = get_seat_wise_data(schedule_id, hours_before_departure, date_of_journey)
+    # The hour and date filters select snapshots from seat_prices_partitioned (the rows behind
+    # the fnGetHoursBeforeDeparture and dateofjourney views), the sums are computed in the database
+    snapshot_filters = []
+    params = {'schedule_id': str(schedule_id), 'pattern': NUMERIC_PATTERN}
+    if hours_before_departure is not None:
+        snapshot_filters.append('sp."hours_before_departure" = %(hours_before_departure)s')
+        params['hours_before_departure'] = str(hours_before_departure)
+    if date_of_journey is not None:
+        snapshot_filters.append('sp."date_of_journey" = %(date_of_journey)s')
+        params['date_of_journey'] = str(date_of_journey)
     
-    if df is None or df.empty:
-        print(f"No seat-wise data found for schedule_id={schedule_id}, hours_before_departure={hours_before_departure}")
-        return {
-            'total_actual_price': 0,
-            'total_model_price': 0,
-            'price_difference': 0,
-            'seat_count': 0
-        }
+    snapshot_clause = ""
+    if snapshot_filters:
+        snapshot_clause = f"""
+        AND EXISTS (
+            SELECT 1 FROM seat_prices_partitioned sp
+            WHERE sp."schedule_id" = swp."schedule_id"
+            AND sp."TimeAndDateStamp" = swp."TimeAndDateStamp"
+            AND {" AND ".join(snapshot_filters)}
+        )
+        """
+    
+    query = f"""
+    SELECT
+        COALESCE(SUM(CASE WHEN swp."actual_fare" ~ %(pattern)s THEN swp."actual_fare"::NUMERIC END), 0) AS "total_actual_price",
+        COALESCE(SUM(CASE WHEN swp."final_price" ~ %(pattern)s THEN swp."final_price"::NUMERIC END), 0) AS "total_model_price",
+        COUNT(*) AS "seat_count"
+    FROM seat_wise_prices_partitioned swp
+    WHERE swp."schedule_id" = %(schedule_id)s
+    {snapshot_clause}
+    """
     
-    # Convert TEXT columns to numeric before calculating totals
-    # Handle empty strings and None values
-    df['actual_fare'] = df['actual_fare'].replace(['', None, 'None'], '0')
-    df['actual_fare'] = pd.to_numeric(df['actual_fare'], errors='coerce').fillna(0)
+    df = execute_query(query, params)
     
-    if 'price' in df.columns:
-        df['price'] = df['price'].replace(['', None, 'None'], '0')
-        df['price'] = pd.to_numeric(df['price'], errors='coerce').fillna(0)
-    elif 'final_price' in df.columns:
-        df['final_price'] = df['final_price'].replace(['', None, 'None'], '0')
-        df['final_price'] = pd.to_numeric(df['final_price'], errors='coerce').fillna(0)
+    if df is None or df.empty or int(df['seat_count'].iloc[0]) == 0:
+        print(f"No seat-wise data found for schedule_id={schedule_id}, hours_before_departure={hours_before_departure}")
+        return empty_totals
     
-    # Calculate totals (now guaranteed to be numeric)
-    total_actual_price = float(df['actual_fare'].sum())
-    # Use price column for model price in seat_prices_partitioned
-    total_model_price = float(df['price'].sum()) if 'price' in df.columns else float(df.get('final_price', pd.Series([0])).sum())
-    price_difference = total_actual_price - total_model_price
-    seat_count = len(df)
+    row = df.iloc[0]
+    total_actual_price = float(row['total_actual_price'])
+    total_model_price = float(row['total_model_price'])
     
     return {
         'total_actual_price': total_actual_price,
         'total_model_price': total_model_price,
-        'price_difference': price_difference,
-        'seat_count': seat_count
+        'price_difference': total_actual_price - total_model_price,
+        'seat_count': int(row['seat_count'])
     }
 
 
@@ -233,7 +258,10 @@ def get_monthly_delta(month, year):
         year (int): Year
         
     Returns:
-        dict: Dictionary with monthly delta data
+        dict: Dictionary with monthly delta data, None if there are no schedules
+
+    Raises:
+        DataUnavailable: if a query failed
     """
     print(f"Calculating monthly delta for {calendar.month_name[month]} {year}")
     
@@ -251,8 +279,10 @@ def get_monthly_delta(month, year):
     }
     
     schedules_df = execute_query(schedules_query, schedules_params)
+    if schedules_df is None:
+        raise DataUnavailable(f"Schedules query failed for {calendar.month_name[month]} {year}")
     
-    if schedules_df is None or schedules_df.empty:
+    if schedules_df.empty:
         print(f"No schedules found for {calendar.month_name[month]} {year}")
         return None
     
@@ -303,8 +333,10 @@ def get_monthly_delta(month, year):
         """
         
         seat_prices_df = execute_query(seat_prices_query)
+        if seat_prices_df is None:
+            raise DataUnavailable(f"Seat prices query failed for {calendar.month_name[month]} {year}")
         
-        if seat_prices_df is not None and not seat_prices_df.empty:
+        if not seat_prices_df.empty:
             total_actual_price = seat_prices_df['total_actual_price'].iloc[0] or 0
             total_model_price = seat_prices_df['total_model_price'].iloc[0] or 0
             price_difference = total_actual_price - total_model_price
@@ -337,8 +369,10 @@ def get_monthly_delta(month, year):
         """
         
         seat_wise_prices_df = execute_query(seat_wise_prices_query)
+        if seat_wise_prices_df is None:
+            raise DataUnavailable(f"Seat wise prices query failed for {calendar.month_name[month]} {year}")
         
-        if seat_wise_prices_df is not None and not seat_wise_prices_df.empty:
+        if not seat_wise_prices_df.empty:
             total_actual_price = seat_wise_prices_df['total_actual_price'].iloc[0] or 0
             total_model_price = seat_wise_prices_df['total_model_price'].iloc[0] or 0
             price_difference = total_actual_price - total_model_price
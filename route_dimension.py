@@ -0,0 +1,219 @@
+"""
+Route dimension and route-level rollups.
+
+Origin and destination are only on the seat-wise rows, so anything by route
+meant a DISTINCT scan over seat_wise_prices_partitioned. The loader now keeps:
+
+    route_schedules        schedule_id -> origin_id, destination_id, op_origin, op_destination
+    route_hourly_rollups   one row per (schedule_id, date_of_journey, hours_before_departure) with
+                           the sums and counts of actual fares, model prices and occupancy over
+                           the latest snapshot of each seat type at that hour
+
+Sums and counts are stored rather than averages, so any set of schedules (a
+route over a week) re-aggregates exactly. Rollups are rebuilt per schedule for
+the schedules each load touched. A schedule whose seat prices are loaded before
+its seat-wise rows gets rollups without a route, filled in when its route is
+recorded.
+
+Existing data is indexed once with:
+    python route_dimension.py
+"""
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from seat_wise_aggregates import NUMERIC_PATTERN
+
+ROUTE_TABLE = "route_schedules"
+ROLLUP_TABLE = "route_hourly_rollups"
+ROUTE_COLUMNS = ["schedule_id", "origin_id", "destination_id", "op_origin", "op_destination"]
+
+
+def ensure_route_tables(conn):
+    """Create the route tables if they don't exist
+
+    Rollups keyed by schedule only, from before schedule ids were known to
+    repeat across dates, are dropped and have to be rebuilt with the backfill.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT a.attname
+            FROM pg_index i
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+            WHERE i.indrelid = to_regclass(%s) AND i.indisprimary
+        """, (ROLLUP_TABLE,))
+        key_columns = {row[0] for row in cur.fetchall()}
+        if key_columns and "date_of_journey" not in key_columns:
+            print(f"⚠️ {ROLLUP_TABLE} is keyed by schedule only, dropping it. Run python route_dimension.py to rebuild it.")
+            cur.execute(f"DROP TABLE {ROLLUP_TABLE}")
+
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {ROUTE_TABLE} (
+                "schedule_id" TEXT PRIMARY KEY,
+                "origin_id" TEXT,
+                "destination_id" TEXT,
+                "op_origin" TEXT,
+                "op_destination" TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_{ROUTE_TABLE}_route
+                ON {ROUTE_TABLE} ("origin_id", "destination_id");
+
+            CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+                "schedule_id" TEXT NOT NULL,
+                "hours_before_departure" DOUBLE PRECISION NOT NULL,
+                "origin_id" TEXT,
+                "destination_id" TEXT,
+                "date_of_journey" TEXT NOT NULL,
+                "operator_id" TEXT,
+                "seat_type_count" INTEGER NOT NULL,
+                "actual_fare_sum" NUMERIC,
+                "actual_fare_count" INTEGER NOT NULL,
+                "model_price_sum" NUMERIC,
+                "model_price_count" INTEGER NOT NULL,
+                "delta_sum" NUMERIC,
+                "delta_count" INTEGER NOT NULL,
+                "actual_occupancy_sum" NUMERIC,
+                "expected_occupancy_sum" NUMERIC,
+                "occupancy_count" INTEGER NOT NULL,
+                PRIMARY KEY ("schedule_id", "date_of_journey", "hours_before_departure")
+            );
+            CREATE INDEX IF NOT EXISTS idx_{ROLLUP_TABLE}_route_date
+                ON {ROLLUP_TABLE} ("origin_id", "destination_id", "date_of_journey");
+        """)
+    conn.commit()
+
+
+def _as_text(values):
+    """Values as TEXT, keeping ids that pandas read as floats (because of blanks) integral"""
+    if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+        values = values.astype("Int64")
+    return values.astype(str).where(values.notna(), None)
+
+
+def route_frame(df):
+    """One route row per schedule of a loaded seat_wise frame
+
+    Returns:
+        DataFrame: ROUTE_COLUMNS, empty if the frame has no schedule_id
+    """
+    if df is None or df.empty or "schedule_id" not in df.columns:
+        return pd.DataFrame(columns=ROUTE_COLUMNS)
+    routes = pd.DataFrame({col: _as_text(df[col]) if col in df.columns else None for col in ROUTE_COLUMNS})
+    return routes.dropna(subset=["schedule_id"]).drop_duplicates(subset=["schedule_id"], keep="last")
+
+
+def upsert_routes(conn, routes):
+    """Insert or update route rows"""
+    if routes is None or routes.empty:
+        return 0
+
+    with conn.cursor() as cur:
+        execute_values(cur, f"""
+            INSERT INTO {ROUTE_TABLE} ("schedule_id", "origin_id", "destination_id", "op_origin", "op_destination")
+            VALUES %s
+            ON CONFLICT ("schedule_id") DO UPDATE SET
+                "origin_id" = COALESCE(EXCLUDED."origin_id", {ROUTE_TABLE}."origin_id"),
+                "destination_id" = COALESCE(EXCLUDED."destination_id", {ROUTE_TABLE}."destination_id"),
+                "op_origin" = COALESCE(EXCLUDED."op_origin", {ROUTE_TABLE}."op_origin"),
+                "op_destination" = COALESCE(EXCLUDED."op_destination", {ROUTE_TABLE}."op_destination");
+        """, list(routes[ROUTE_COLUMNS].itertuples(index=False, name=None)))
+
+        # Rollups built before the schedule's route was known
+        cur.execute(f"""
+            UPDATE {ROLLUP_TABLE} rollups
+            SET "origin_id" = routes."origin_id", "destination_id" = routes."destination_id"
+            FROM {ROUTE_TABLE} routes
+            WHERE rollups."schedule_id" = routes."schedule_id"
+                AND rollups."schedule_id" = ANY(%(schedule_ids)s)
+                AND (rollups."origin_id" IS DISTINCT FROM routes."origin_id"
+                     OR rollups."destination_id" IS DISTINCT FROM routes."destination_id")
+        """, {'schedule_ids': routes["schedule_id"].tolist()})
+    conn.commit()
+    return len(routes)
+
+
+def refresh_route_rollups(conn, schedule_ids=None):
+    """Rebuild the hourly rollups of the given schedules, or of all schedules"""
+    where_clause = 'WHERE "schedule_id" = ANY(%(schedule_ids)s)' if schedule_ids is not None else ""
+    params = {'pattern': NUMERIC_PATTERN, 'schedule_ids': [str(s) for s in schedule_ids or []]}
+
+    with conn.cursor() as cur:
+        cur.execute(f"DELETE FROM {ROLLUP_TABLE} {where_clause}", params)
+        cur.execute(f"""
+            WITH latest AS (
+                -- Latest snapshot of each seat type at each hour before departure
+                SELECT DISTINCT ON ("schedule_id", "date_of_journey", "seat_type", "hours_before_departure")
+                    "schedule_id"::TEXT AS schedule_id,
+                    "date_of_journey"::TEXT AS date_of_journey,
+                    "operator_id"::TEXT AS operator_id,
+                    "hours_before_departure"::TEXT::DOUBLE PRECISION AS hours_before_departure,
+                    CASE WHEN "actual_fare"::TEXT ~ %(pattern)s THEN "actual_fare"::TEXT::NUMERIC END AS actual_fare,
+                    CASE WHEN "price"::TEXT ~ %(pattern)s THEN "price"::TEXT::NUMERIC END AS model_price,
+                    CASE WHEN "actual_occupancy"::TEXT ~ %(pattern)s THEN "actual_occupancy"::TEXT::NUMERIC END AS actual_occupancy,
+                    CASE WHEN "expected_occupancy"::TEXT ~ %(pattern)s THEN "expected_occupancy"::TEXT::NUMERIC END AS expected_occupancy
+                FROM seat_prices_partitioned
+                {where_clause}
+                {"AND" if where_clause else "WHERE"} "hours_before_departure"::TEXT ~ %(pattern)s
+                    AND "date_of_journey" IS NOT NULL
+                ORDER BY "schedule_id", "date_of_journey", "seat_type", "hours_before_departure", "TimeAndDateStamp" DESC
+            )
+            INSERT INTO {ROLLUP_TABLE} (
+                "schedule_id", "hours_before_departure", "origin_id", "destination_id", "date_of_journey",
+                "operator_id", "seat_type_count", "actual_fare_sum", "actual_fare_count", "model_price_sum",
+                "model_price_count", "delta_sum", "delta_count", "actual_occupancy_sum",
+                "expected_occupancy_sum", "occupancy_count"
+            )
+            SELECT
+                latest.schedule_id,
+                latest.hours_before_departure,
+                MIN(routes."origin_id"),
+                MIN(routes."destination_id"),
+                latest.date_of_journey,
+                MIN(latest.operator_id),
+                COUNT(*),
+                SUM(latest.actual_fare),
+                COUNT(latest.actual_fare),
+                SUM(latest.model_price),
+                COUNT(latest.model_price),
+                SUM(latest.actual_fare - latest.model_price),
+                COUNT(latest.actual_fare - latest.model_price),
+                SUM(latest.actual_occupancy),
+                SUM(latest.expected_occupancy),
+                COUNT(latest.actual_occupancy)
+            FROM latest
+            -- Schedules without a route yet still get rollups, upsert_routes fills the route in
+            LEFT JOIN {ROUTE_TABLE} routes ON routes."schedule_id" = latest.schedule_id
+            GROUP BY latest.schedule_id, latest.date_of_journey, latest.hours_before_departure
+        """, params)
+        row_count = cur.rowcount
+    conn.commit()
+    return row_count
+
+
+def backfill_routes(conn):
+    """Build the route dimension and the rollups from the data already loaded"""
+    ensure_route_tables(conn)
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            INSERT INTO {ROUTE_TABLE} ("schedule_id", "origin_id", "destination_id", "op_origin", "op_destination")
+            SELECT DISTINCT ON ("schedule_id")
+                "schedule_id"::TEXT, "origin_id"::TEXT, "destination_id"::TEXT, "op_origin"::TEXT, "op_destination"::TEXT
+            FROM seat_wise_prices_partitioned
+            WHERE "schedule_id" IS NOT NULL
+            ORDER BY "schedule_id", "TimeAndDateStamp" DESC
+            ON CONFLICT ("schedule_id") DO NOTHING;
+        """)
+        route_count = cur.rowcount
+    conn.commit()
+    return route_count, refresh_route_rollups(conn)
+
+
+if __name__ == "__main__":
+    from load_to_postgres import get_connection
+
+    conn = get_connection()
+    try:
+        print(f"🔄 Backfilling {ROUTE_TABLE} and {ROLLUP_TABLE}...")
+        route_count, rollup_count = backfill_routes(conn)
+        print(f"✅ {route_count} routes and {rollup_count} rollup rows written")
+    finally:
+        conn.close()
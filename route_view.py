@@ -0,0 +1,236 @@
+"""
+Route view: fares, model prices and occupancy of a corridor over a range of dates.
+
+Reads the route rollups maintained by the loader (route_dimension.py), so
+"average delta on this corridor this week" sums a few rows per schedule and
+hour instead of scanning every seat price of every schedule on the route.
+"""
+from datetime import datetime, timedelta
+
+from dash import html, dcc
+from dash.dependencies import Input, Output
+import dash_bootstrap_components as dbc
+import plotly.graph_objects as go
+import numpy as np
+import pandas as pd
+
+from db_utils import execute_query, DataUnavailable
+from kpis import create_kpi_card
+from component_cache import memoize_component
+from data_version import dates_between
+from metadata_cache import get_metadata
+from route_dimension import ROUTE_TABLE, ROLLUP_TABLE
+
+# Default range of the view, ending at the latest date of journey
+ROUTE_VIEW_DEFAULT_DAYS = 7
+
+# Per hour before departure, plus an overall row with hours_before_departure NULL
+ROUTE_ROLLUP_QUERY = f"""
+    SELECT
+        "hours_before_departure",
+        COUNT(DISTINCT "schedule_id") AS schedules,
+        SUM("actual_fare_sum") / NULLIF(SUM("actual_fare_count"), 0) AS avg_actual_fare,
+        SUM("model_price_sum") / NULLIF(SUM("model_price_count"), 0) AS avg_model_price,
+        SUM("delta_sum") / NULLIF(SUM("delta_count"), 0) AS avg_delta,
+        SUM("actual_occupancy_sum") / NULLIF(SUM("occupancy_count"), 0) AS avg_actual_occupancy,
+        SUM("expected_occupancy_sum") / NULLIF(SUM("occupancy_count"), 0) AS avg_expected_occupancy
+    FROM {ROLLUP_TABLE}
+    WHERE "origin_id" = %(origin_id)s
+        AND "destination_id" = %(destination_id)s
+        AND "date_of_journey" BETWEEN %(date_from)s AND %(date_to)s
+    GROUP BY GROUPING SETS (("hours_before_departure"), ())
+"""
+
+
+def get_routes():
+    """Routes with their names and number of schedules, for the route selector
+
+    Returns:
+        list: {'label', 'value'} options, the value being 'origin_id|destination_id', or None if the query failed
+    """
+    df = execute_query(f"""
+        SELECT "origin_id", "destination_id",
+               MIN("op_origin") AS op_origin, MIN("op_destination") AS op_destination,
+               COUNT(*) AS schedules
+        FROM {ROUTE_TABLE}
+        WHERE "origin_id" IS NOT NULL AND "destination_id" IS NOT NULL
+        GROUP BY "origin_id", "destination_id"
+        ORDER BY op_origin, op_destination
+    """)
+    if df is None:
+        return None
+    return [
+        {
+            'label': f"{row.op_origin or row.origin_id} → {row.op_destination or row.destination_id} ({row.schedules} schedules)",
+            'value': f"{row.origin_id}|{row.destination_id}"
+        }
+        for row in df.itertuples(index=False)
+    ]
+
+
+def get_route_rollups(origin_id, destination_id, date_from, date_to):
+    """Route averages per hour before departure
+
+    Returns:
+        tuple: (overall Series, DataFrame per hour sorted from furthest to closest), or (None, None)
+               without rollups
+
+    Raises:
+        DataUnavailable: if the query failed
+    """
+    df = execute_query(ROUTE_ROLLUP_QUERY, {
+        'origin_id': str(origin_id), 'destination_id': str(destination_id),
+        'date_from': str(date_from), 'date_to': str(date_to)
+    })
+    if df is None:
+        raise DataUnavailable("route rollup query failed")
+    if df.empty:
+        return None, None
+
+    value_columns = [col for col in df.columns if col != 'hours_before_departure']
+    df[value_columns] = df[value_columns].apply(pd.to_numeric, errors='coerce')
+    is_overall = df['hours_before_departure'].isna().to_numpy()
+    overall = df.loc[is_overall].iloc[0] if is_overall.any() else None
+    by_hour = df.loc[~is_overall].sort_values('hours_before_departure', ascending=False, ignore_index=True)
+    return overall, by_hour
+
+
+def default_date_range(dates):
+    """(from, to) covering the last ROUTE_VIEW_DEFAULT_DAYS days of the available dates"""
+    if not dates:
+        return None, None
+    date_to = max(dates)
+    try:
+        start = datetime.strptime(date_to, '%Y-%m-%d') - timedelta(days=ROUTE_VIEW_DEFAULT_DAYS - 1)
+    except (TypeError, ValueError):
+        return min(dates), date_to
+    date_from = start.strftime('%Y-%m-%d')
+    return min((date for date in dates if date >= date_from), default=date_to), date_to
+
+
+def format_amount(value):
+    """'$1234.50', or N/A for a missing value"""
+    return f"${value:,.2f}" if value is not None and not np.isnan(value) else "N/A"
+
+
+def create_route_chart(by_hour):
+    """Average fare, model price and occupancy by hours before departure"""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=by_hour['hours_before_departure'], y=by_hour['avg_actual_fare'],
+                             mode='lines+markers', name='Avg Actual Fare', line=dict(color='#1d8cf8')))
+    fig.add_trace(go.Scatter(x=by_hour['hours_before_departure'], y=by_hour['avg_model_price'],
+                             mode='lines+markers', name='Avg Model Price', line=dict(color='#00bf9a')))
+    fig.add_trace(go.Bar(x=by_hour['hours_before_departure'], y=by_hour['avg_actual_occupancy'],
+                         name='Avg Actual Occupancy', yaxis='y2', marker_color='rgba(245, 166, 35, 0.4)'))
+    fig.add_trace(go.Scatter(x=by_hour['hours_before_departure'], y=by_hour['avg_expected_occupancy'],
+                             mode='lines', name='Avg Expected Occupancy', yaxis='y2',
+                             line=dict(color='#f5a623', dash='dash')))
+
+    fig.update_layout(
+        paper_bgcolor='#27293d',
+        plot_bgcolor='#27293d',
+        font=dict(family="Poppins, sans-serif", size=12, color="white"),
+        title=dict(text="Route Prices and Occupancy by Hours Before Departure", font=dict(size=18, color="white")),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, bgcolor="rgba(39, 41, 61, 0.5)"),
+        margin=dict(l=50, r=50, t=80, b=50),
+        height=450,
+        hovermode="x unified",
+        xaxis=dict(title="Hours Before Departure", autorange="reversed", color="#eee",
+                   gridcolor="rgba(255, 255, 255, 0.1)"),
+        yaxis=dict(title="Price", color="#eee", gridcolor="rgba(255, 255, 255, 0.1)"),
+        yaxis2=dict(title="Occupancy", overlaying='y', side='right', color="#eee", showgrid=False)
+    )
+    return dcc.Graph(figure=fig)
+
+
+@memoize_component("route_view", scope=lambda route, date_from, date_to: dates_between(date_from, date_to))
+def build_route_view(route, date_from, date_to):
+    """KPI cards and chart of a route ('origin_id|destination_id') over a range of dates"""
+    origin_id, _, destination_id = route.partition('|')
+    overall, by_hour = get_route_rollups(origin_id, destination_id, date_from, date_to)
+    if overall is None:
+        return html.Div("No rollups for this route and dates. Run python route_dimension.py to build them.",
+                        className="mt-3")
+
+    avg_delta = overall['avg_delta']
+    return html.Div([
+        dbc.Row([
+            dbc.Col(create_kpi_card("Schedules", f"{int(overall['schedules'])}", icon="bus"), width=3),
+            dbc.Col(create_kpi_card("Avg Actual Fare", format_amount(overall['avg_actual_fare']),
+                                    color="info", icon="ticket-alt"), width=3),
+            dbc.Col(create_kpi_card("Avg Model Price", format_amount(overall['avg_model_price']),
+                                    color="success", icon="calculator"), width=3),
+            dbc.Col(create_kpi_card("Avg Delta", format_amount(avg_delta),
+                                    subtitle="Actual fare - model price",
+                                    color="danger" if avg_delta is not None and avg_delta < 0 else "warning",
+                                    icon="balance-scale"), width=3)
+        ]),
+        create_route_chart(by_hour)
+    ])
+
+
+def create_route_layout():
+    """Layout of the route view"""
+    route_options = get_metadata('routes')
+    dates = get_metadata('dates_of_journey')
+    date_options = [{'label': date, 'value': date} for date in dates]
+    date_from, date_to = default_date_range(dates)
+    dropdown_style = {'color': 'black', 'background-color': 'white'}
+
+    return html.Div([
+        dbc.Card(
+            dbc.CardBody([
+                html.H2("Route Analytics", className="mb-4 text-center"),
+                dbc.Row([
+                    dbc.Col([
+                        html.Label("Route"),
+                        dcc.Dropdown(id='route-view-route', options=route_options,
+                                     value=route_options[0]['value'] if route_options else None,
+                                     clearable=False, className="mb-3", style=dropdown_style, optionHeight=35)
+                    ], width=6),
+                    dbc.Col([
+                        html.Label("From Date"),
+                        dcc.Dropdown(id='route-view-date-from', options=date_options, value=date_from,
+                                     clearable=False, className="mb-3", style=dropdown_style, optionHeight=35)
+                    ], width=3),
+                    dbc.Col([
+                        html.Label("To Date"),
+                        dcc.Dropdown(id='route-view-date-to', options=date_options, value=date_to,
+                                     clearable=False, className="mb-3", style=dropdown_style, optionHeight=35)
+                    ], width=3)
+                ]),
+                dcc.Loading(
+                    id="loading-route-view",
+                    type="circle",
+                    children=html.Div(id='route-view-results', className="mt-4")
+                )
+            ]),
+            className="shadow-sm mb-4 bg-dark text-white"
+        )
+    ])
+
+
+def register_route_callbacks(app):
+    """Register callbacks for the route view"""
+
+    @app.callback(
+        Output('route-view-results', 'children'),
+        Input('route-view-route', 'value'),
+        Input('route-view-date-from', 'value'),
+        Input('route-view-date-to', 'value')
+    )
+    def update_route_view(route, date_from, date_to):
+        if None in [route, date_from, date_to]:
+            return html.Div("Please select a route and a date range.", className="mt-3")
+        if str(date_from) > str(date_to):
+            date_from, date_to = date_to, date_from
+
+        try:
+            return build_route_view(route, date_from, date_to)
+        except DataUnavailable as e:
+            # Raised out of build_route_view, so the message isn't memoized
+            print(f"Error updating route view: {e}")
+            return html.Div("Route data is unavailable right now, please try again.", className="mt-3 text-danger")
+        except Exception as e:
+            print(f"Error updating route view: {e}")
+            return html.Div(f"An error occurred: {str(e)}", className="mt-3 text-danger")
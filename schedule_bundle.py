@@ -0,0 +1,158 @@
+"""
+Selection-scoped prefetch shared by the callbacks that fire on a schedule change.
+
+Selecting a schedule fires about seven callbacks at once, and each of them used
+to look up the same operator, seat types, route and hours before departure.
+The first callback to arrive now fetches one bundle for the schedule; sibling
+callbacks arriving while it is in flight wait on the same future instead of
+issuing duplicate queries. Finished bundles are kept for a few seconds so the
+rest of the burst is served from memory.
+"""
+import threading
+import time
+from concurrent.futures import Future
+
+from db_utils import (
+    get_operator_id_by_schedule_id,
+    get_seat_types_by_schedule_id,
+    get_origin_destination_by_schedule_id,
+    get_hours_before_departure,
+    get_seat_wise_prices
+)
+from concurrent_fetch import fetch_concurrently, REQUEST_DEADLINE_SECONDS
+
+# How long a finished fetch is reused, long enough to cover one burst of callbacks
+BUNDLE_TTL_SECONDS = 30
+
+# Upper bound on cached entries before expired ones are pruned
+MAX_ENTRIES = 512
+
+_entries = {}  # key -> (expires_at, Future), expires_at is None while in flight
+_entries_lock = threading.Lock()
+
+
+def _prune_expired(now):
+    """Drop finished entries that have expired (called with the lock held)"""
+    expired = [key for key, (expires_at, _) in _entries.items() if expires_at is not None and expires_at <= now]
+    for key in expired:
+        del _entries[key]
+
+
+def coalesced_fetch(key, func, *args, keep=None):
+    """Run func(*args) once per key, sharing the result with concurrent and recent callers
+
+    The first caller runs the fetch on its own thread, callers arriving while it
+    is in flight wait for the same result. A None result, a result for which
+    keep(result) is false, or an exception is not kept, so the next caller
+    fetches again.
+    """
+    now = time.monotonic()
+    with _entries_lock:
+        entry = _entries.get(key)
+        if entry is not None and (entry[0] is None or entry[0] > now):
+            future = entry[1]
+            owner = False
+        else:
+            if len(_entries) >= MAX_ENTRIES:
+                _prune_expired(now)
+            future = Future()
+            _entries[key] = (None, future)
+            owner = True
+
+    if not owner:
+        return future.result(timeout=REQUEST_DEADLINE_SECONDS)
+
+    try:
+        result = func(*args)
+    except Exception as e:
+        with _entries_lock:
+            _entries.pop(key, None)
+        future.set_exception(e)
+        raise
+
+    with _entries_lock:
+        if result is None or (keep is not None and not keep(result)):
+            _entries.pop(key, None)
+        else:
+            _entries[key] = (time.monotonic() + BUNDLE_TTL_SECONDS, future)
+    future.set_result(result)
+    return result
+
+
+def invalidate_schedule(schedule_id=None):
+    """Forget prefetched data for one schedule, or for all schedules"""
+    with _entries_lock:
+        if schedule_id is None:
+            _entries.clear()
+            return
+        for key in [key for key in _entries if key[1] == str(schedule_id)]:
+            del _entries[key]
+
+
+def fetch_schedule_bundle(schedule_id):
+    """Fetch everything the schedule-scoped callbacks need, with the lookups run concurrently"""
+    results, errors = fetch_concurrently({
+        'operator_id': (get_operator_id_by_schedule_id, schedule_id),
+        'seat_types': (get_seat_types_by_schedule_id, schedule_id),
+        'route': (get_origin_destination_by_schedule_id, schedule_id),
+        'hours_before_departure': (get_hours_before_departure, schedule_id)
+    })
+    if errors:
+        # Don't keep a partial bundle around
+        return None
+
+    origin_id, destination_id, origin_name, destination_name = results['route'] or (None, None, None, None)
+    return {
+        'schedule_id': str(schedule_id),
+        'operator_id': results['operator_id'],
+        'seat_types': results['seat_types'] or [],
+        'origin_id': origin_id,
+        'destination_id': destination_id,
+        'origin_name': origin_name,
+        'destination_name': destination_name,
+        'hours_before_departure': results['hours_before_departure'] or []
+    }
+
+
+def is_complete_bundle(bundle):
+    """Whether every lookup of a bundle found something
+
+    The db_utils getters return None or an empty list both when there is no
+    data and when their query failed, so an incomplete bundle may come from a
+    transient error and is not kept for the sibling callbacks.
+    """
+    return (bundle['operator_id'] is not None and bool(bundle['seat_types'])
+            and bundle['origin_id'] is not None and bool(bundle['hours_before_departure']))
+
+
+def get_schedule_bundle(schedule_id):
+    """Get the prefetched bundle for a schedule
+
+    Returns:
+        dict: operator_id, seat_types, origin/destination and hours_before_departure,
+              or None if no schedule is given or the fetch failed
+    """
+    if not schedule_id:
+        return None
+    try:
+        return coalesced_fetch(('schedule', str(schedule_id)), fetch_schedule_bundle, schedule_id,
+                               keep=is_complete_bundle)
+    except Exception as e:
+        print(f"Error getting schedule bundle for schedule_id {schedule_id}: {e}")
+        return None
+
+
+def get_shared_seat_wise_prices(schedule_id, hours_before_departure=None):
+    """get_seat_wise_prices, shared between the callbacks showing the same selection
+
+    Returns a copy, the seat components modify the frame they are given.
+    """
+    if not schedule_id:
+        return None
+    try:
+        df = coalesced_fetch(('seat_wise_prices', str(schedule_id), hours_before_departure),
+                             get_seat_wise_prices, schedule_id, hours_before_departure)
+    except Exception as e:
+        print(f"Error getting seat-wise prices for schedule_id {schedule_id}: {e}")
+        return None
+    return df.copy() if df is not None else None
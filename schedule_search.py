@@ -0,0 +1,121 @@
+"""
+In-memory search index for schedule IDs.
+
+The schedule dropdown used to receive every schedule ID (tens of thousands when no
+date is selected). It now asks this index for the top matches of whatever the user
+typed: prefix matches come from a binary search over the sorted IDs, and substring
+matches from a single scan over the IDs joined into one string, both well under a
+millisecond. One index is kept per date filter and rebuilt when the dimension cache
+changes.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from db_utils import get_schedule_ids, get_schedule_ids_by_date
+from dimension_cache import get_dimensions
+
+# Number of options sent to the dropdown per keystroke
+SCHEDULE_SEARCH_LIMIT = 100
+
+# How long an index is reused when the dimension cache isn't available
+INDEX_TTL_SECONDS = 60
+
+# Separator between IDs in the joined string, never part of an ID
+_SEPARATOR = "\n"
+
+_indexes = {}  # date_of_journey (or None) -> index
+_indexes_lock = threading.Lock()
+
+
+def build_index(schedule_ids):
+    """Build a search index from a list of schedule IDs"""
+    ids = sorted({str(schedule_id) for schedule_id in schedule_ids})
+    offsets = []
+    position = 0
+    for schedule_id in ids:
+        offsets.append(position)
+        position += len(schedule_id) + len(_SEPARATOR)
+    return {
+        'ids': ids,
+        'joined': _SEPARATOR.join(ids),
+        'offsets': offsets
+    }
+
+
+def search_index(index, query, limit=SCHEDULE_SEARCH_LIMIT):
+    """Find schedule IDs starting with the query, then IDs containing it
+
+    Returns:
+        list: At most `limit` schedule IDs, prefix matches first
+    """
+    ids = index['ids']
+    query = str(query or "").strip()
+    if not query:
+        return ids[:limit]
+
+    # Prefix matches are a contiguous range of the sorted list
+    start = bisect_left(ids, query)
+    end = bisect_right(ids, query + "\uffff", lo=start)
+    matches = ids[start:min(end, start + limit)]
+    if len(matches) >= limit:
+        return matches
+
+    # Substring matches, found by scanning the joined string in C
+    offsets = index['offsets']
+    last_position = -1
+    for match in re.finditer(re.escape(query), index['joined']):
+        position = bisect_right(offsets, match.start()) - 1
+        if position == last_position:
+            continue
+        last_position = position
+        if offsets[position] == match.start():
+            # Starts with the query, already a prefix match
+            continue
+        matches.append(ids[position])
+        if len(matches) >= limit:
+            break
+    return matches
+
+
+def _index_version():
+    """Version of the data the indexes are built from"""
+    dimensions = get_dimensions()
+    if dimensions is not None:
+        return ('dimensions', dimensions['version'])
+    return ('ttl', int(time.monotonic() // INDEX_TTL_SECONDS))
+
+
+def get_schedule_index(date_of_journey=None):
+    """Get the search index for a date (or for all schedules), building it if needed"""
+    version = _index_version()
+    with _indexes_lock:
+        cached = _indexes.get(date_of_journey)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    schedule_ids = get_schedule_ids_by_date(date_of_journey) if date_of_journey else get_schedule_ids()
+    if not schedule_ids and (schedule_ids is None or not date_of_journey):
+        # The query failed (get_schedule_ids returns [] then), don't keep an
+        # empty index until the next load
+        return build_index([])
+    index = build_index(schedule_ids)
+    with _indexes_lock:
+        _indexes[date_of_journey] = (version, index)
+    return index
+
+
+def search_schedule_ids(query, date_of_journey=None, limit=SCHEDULE_SEARCH_LIMIT):
+    """Top matches for a typed schedule ID, within the selected date if there is one"""
+    return search_index(get_schedule_index(date_of_journey), query, limit)
+
+
+def find_schedule_id(schedule_id, date_of_journey=None):
+    """Exact lookup of a schedule ID, returns the ID as stored or None"""
+    ids = get_schedule_index(date_of_journey)['ids']
+    schedule_id = str(schedule_id).strip()
+    position = bisect_left(ids, schedule_id)
+    if position < len(ids) and ids[position] == schedule_id:
+        return ids[position]
+    return None
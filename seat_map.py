@@ -1,19 +1,21 @@
 import dash
-from dash import html, dcc
+from dash import html, dcc, clientside_callback, ClientsideFunction, Output, Input
 import dash_bootstrap_components as dbc
-import pandas as pd
-import base64
-import os
+from seat_pricing import build_seat_view_model
+
+# Seats drawn per row of the seat map
+SEATS_PER_ROW = 13
 
 def create_seat_map(df):
     """
     Create a seat map visualization for seat-wise pricing data
     
     Args:
-        df: DataFrame containing seat_number, actual_fare, final_price columns
+        df: Seat view model (see seat_pricing.py), or a DataFrame containing
+            seat_number, actual_fare, final_price columns
         
     Returns:
-        A Dash component with the seat map visualization
+        A Dash component with the seat map visualization, laid out client-side
     """
     if df is None or df.empty:
         return html.Div([
@@ -23,150 +25,55 @@ def create_seat_map(df):
             ], className="text-center p-5 bg-dark rounded shadow-sm")
         ])
     
-    # Ensure we have distinct seat numbers only
-    df = df.drop_duplicates(subset=['seat_number'])
-    
-    # Convert seat_number to numeric for proper sorting
-    df['seat_number'] = pd.to_numeric(df['seat_number'], errors='coerce')
-    
-    # Sort by seat number in ascending order (numerically)
-    df = df.sort_values('seat_number', ascending=True)
-    
-    # Calculate delta (model_price - actual_price)
-    # Positive delta means model price is higher than actual price
-    df['actual_numeric'] = pd.to_numeric(df['actual_fare'], errors='coerce')
-    df['final_numeric'] = pd.to_numeric(df['final_price'], errors='coerce')
-    df['price_delta'] = df['final_numeric'] - df['actual_numeric']
-    
-    # Format prices with dollar sign and 2 decimal places
-    df['actual_fare_formatted'] = df['actual_numeric'].apply(lambda x: f"${x:.2f}")
-    df['final_price_formatted'] = df['final_numeric'].apply(lambda x: f"${x:.2f}")
-    df['delta_formatted'] = df['price_delta'].apply(lambda x: f"${abs(x):.2f}")
-    
-    # Get the SVG files
-    positive_svg_path = os.path.join('d:\\Programming\\DP-Dashboard', 'positive_delta.svg')
-    negative_svg_path = os.path.join('d:\\Programming\\DP-Dashboard', 'negative_delta.svg')
-    
-    # Read SVG files
-    try:
-        with open(positive_svg_path, 'rb') as f:
-            positive_svg = f.read()
-            positive_svg_base64 = base64.b64encode(positive_svg).decode('utf-8')
-        
-        with open(negative_svg_path, 'rb') as f:
-            negative_svg = f.read()
-            negative_svg_base64 = base64.b64encode(negative_svg).decode('utf-8')
-    except Exception as e:
-        print(f"Error reading SVG files: {e}")
-        return html.Div(f"Error loading SVG files: {str(e)}", className="text-danger")
-    
-    # Create a dynamic seat map layout based on the actual seat numbers available
-    # Sort seat numbers numerically
-    seat_numbers = sorted([int(row['seat_number']) for _, row in df.iterrows() if pd.notna(row['seat_number'])])
-    
-    # Create a dictionary for quick seat lookup
-    seat_dict = {int(row['seat_number']): row for _, row in df.iterrows() if pd.notna(row['seat_number'])}
-    
-    # Group seats into rows with max 13 seats per row
-    seats_per_row = 13
-    seat_rows = [seat_numbers[i:i+seats_per_row] for i in range(0, len(seat_numbers), seats_per_row)]
-    
-    # Create rows based on the dynamic layout
-    rows = []
+    payload = seat_map_payload(df)
     
-    # Process each row of seats
-    for row_seats in seat_rows:
-        seat_items = []
-        
-        for seat_number in row_seats:
-            # Get seat data from dictionary
-            seat = seat_dict[seat_number]
-            actual_price = seat['actual_fare_formatted']
-            model_price = seat['final_price_formatted']
-            delta = seat['delta_formatted']
-            delta_value = seat['price_delta']
-            
-            # Choose SVG based on delta
-            svg_base64 = positive_svg_base64 if delta_value > 0 else negative_svg_base64
-            
-            # Create tooltip content
-            tooltip_content = html.Div([
-                html.H6(f"Seat: {seat_number}", className="mb-2 font-weight-bold"),
-                html.P(f"Actual Price: {actual_price}", className="mb-1"),
-                html.P(f"Model Price: {model_price}", className="mb-1"),
-                html.P([
-                    "Delta: ",
-                    html.Span(
-                        delta, 
-                        style={"color": "#51ff45" if delta_value > 0 else "#f54040"}
-                    )
-                ], className="mb-0")
-            ], className="p-2 text-dark")
-            
-            # Always use white text for seat numbers
-            text_color = "white"
-            
-            # Create seat item with tooltip
-            seat_item = html.Div(
-                [
-                    html.Div(
-                        [
-                            html.Img(
-                                src=f"data:image/svg+xml;base64,{svg_base64}",
-                                style={"width": "45px", "height": "45px", "position": "relative"}
-                            ),
-                            html.Div(
-                                f"{seat_number}",
-                                style={
-                                    "position": "absolute",
-                                    "top": "36%",  # Adjusted to account for SVG shape
-                                    "left": "46%",
-                                    "transform": "translate(-50%, -50%)",
-                                    "color": text_color,
-                                    "fontWeight": "bold",
-                                    "fontSize": "10px",
-                                    "textAlign": "center",
-                                    "width": "100%",
-                                    "height": "100%",
-                                    "display": "flex",
-                                    "justifyContent": "center",
-                                    "alignItems": "center",
-                                    "margin": "0",
-                                    "padding": "0",
-                                    "pointerEvents": "none"  # Ensures text doesn't interfere with click events
-                                }
-                            )
-                        ],
-                        style={"position": "relative"}
-                    ),
-                    dbc.Tooltip(
-                        tooltip_content,
-                        target=f"seat-{seat_number}",
-                        placement="top"
-                    )
-                ],
-                id=f"seat-{seat_number}",
-                className="mx-1 my-1",
-                style={"display": "inline-block", "cursor": "pointer"}
-            )
-            
-            seat_items.append(seat_item)
-        
-        # Add row to layout with proper styling
-        rows.append(
-            dbc.Row(
-                [dbc.Col(seat_item, width="auto", className="px-0") for seat_item in seat_items],
-                className="mb-2 justify-content-center"
-            )
-        )
-    
-    # Create the final layout
+    # The grid is laid out in the browser from the payload (assets/seat_map.js)
     return dbc.Card([
         dbc.CardHeader([
             html.H5("Seat Map Visualization", className="mb-0 text-white"),
-            html.Span(f"{len(df)} Seats", className="badge bg-success ms-2")
+            html.Span(f"{payload['seat_count']} Seats", className="badge bg-success ms-2")
         ], className="d-flex align-items-center"),
         dbc.CardBody([
-            html.Div(rows, className="text-center")
+            dcc.Store(id="seat-map-data", data=payload),
+            html.Div(id="seat-map-grid", className="text-center")
         ], className="bg-dark")
     ], className="mb-4")
+
+
+def seat_map_payload(df):
+    """Columnar seat map data: seat numbers, actual and model prices and deltas as arrays
+
+    The delta sent is model price - actual price, positive (and drawn with the
+    positive icon) when the model price is higher.
+    """
+    # Numeric prices and deltas, shared with the seat price table
+    if 'price_delta' not in df.columns:
+        df = build_seat_view_model(df)
+    
+    # Seats without a number aren't drawn
+    seats = df[df['seat_number'].notna()]
+    
+    def to_list(values):
+        values = values.round(2).astype(object)
+        return values.where(values.notna(), None).tolist()
+    
+    return {
+        'seat_count': len(df),
+        'seat_numbers': seats['seat_number'].astype(int).tolist(),
+        'actual': to_list(seats['actual_fare']),
+        'model': to_list(seats['final_price']),
+        'delta': to_list(-seats['price_delta']),
+        'seats_per_row': SEATS_PER_ROW,
+        'icons': {
+            'positive': dash.get_asset_url('positive_delta.svg'),
+            'negative': dash.get_asset_url('negative_delta.svg')
+        }
+    }
+
+
+# Render the seat grid in the browser whenever a new payload arrives
+clientside_callback(
+    ClientsideFunction(namespace="seat_map", function_name="render"),
+    Output("seat-map-grid", "children"),
+    Input("seat-map-data", "data")
+)
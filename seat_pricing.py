@@ -0,0 +1,81 @@
+"""
+Seat pricing view model shared by the seat price table and the seat map.
+
+Both components used to take the raw seat-wise prices, convert the same columns
+with pd.to_numeric, compute their own delta and format every price with a
+per-cell lambda. The view model is built once per (schedule, hour), with the
+formatting done on whole arrays, and is shared through the same coalesced
+fetch cache as the seat-wise prices it is built from.
+"""
+import numpy as np
+import pandas as pd
+
+from schedule_bundle import coalesced_fetch, get_shared_seat_wise_prices
+
+# Columns of the view model, one row per seat sorted by seat number
+SEAT_VIEW_COLUMNS = [
+    'seat_number', 'actual_fare', 'final_price', 'price_delta',
+    'actual_fare_formatted', 'final_price_formatted', 'delta_formatted'
+]
+
+
+def format_prices(values, absolute=False):
+    """Format an array of prices as '$1234.50' strings"""
+    values = np.asarray(values, dtype=np.float64)
+    if absolute:
+        values = np.abs(values)
+    return np.char.add('$', np.char.mod('%.2f', values))
+
+
+def build_seat_view_model(df):
+    """Build the seat view model from seat-wise prices
+
+    price_delta is actual fare - model price, as in measures.calculate_price_delta.
+
+    Returns:
+        DataFrame: SEAT_VIEW_COLUMNS, one row per distinct seat number
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=SEAT_VIEW_COLUMNS)
+
+    # Ensure we have distinct seat numbers only
+    df = df.drop_duplicates(subset=['seat_number'])
+
+    actual = pd.to_numeric(df['actual_fare'], errors='coerce').to_numpy(dtype=np.float64)
+    model = pd.to_numeric(df['final_price'], errors='coerce').to_numpy(dtype=np.float64)
+    delta = actual - model
+
+    view_model = pd.DataFrame({
+        'seat_number': pd.to_numeric(df['seat_number'], errors='coerce').to_numpy(),
+        'actual_fare': actual,
+        'final_price': model,
+        'price_delta': delta,
+        'actual_fare_formatted': format_prices(actual),
+        'final_price_formatted': format_prices(model),
+        'delta_formatted': format_prices(delta, absolute=True)
+    })
+
+    # Sort by seat number in ascending order (numerically)
+    return view_model.sort_values('seat_number', kind='stable', ignore_index=True)
+
+
+def get_seat_view_model(schedule_id, hours_before_departure=None):
+    """Seat view model for a selection, built once and shared like the seat-wise prices
+
+    Returns a copy, or None if there is no seat-wise data.
+    """
+    if not schedule_id:
+        return None
+
+    def build():
+        df = get_shared_seat_wise_prices(schedule_id, hours_before_departure)
+        if df is None or df.empty:
+            return None
+        return build_seat_view_model(df)
+
+    try:
+        view_model = coalesced_fetch(('seat_view_model', str(schedule_id), hours_before_departure), build)
+    except Exception as e:
+        print(f"Error building seat view model for schedule_id {schedule_id}: {e}")
+        return None
+    return view_model.copy() if view_model is not None else None
@@ -2,13 +2,15 @@ import dash
 from dash import html, dcc, dash_table
 import dash_bootstrap_components as dbc
 import pandas as pd
+from seat_pricing import build_seat_view_model
 
 def create_seat_price_slider(df):
     """
     Create a modern table to display seat-wise pricing data
     
     Args:
-        df: DataFrame containing seat_number, actual_fare, and final_price columns
+        df: Seat view model (see seat_pricing.py), or a DataFrame containing
+            seat_number, actual_fare, and final_price columns
         
     Returns:
         A Dash component with the table view of seat prices
@@ -21,40 +23,30 @@ def create_seat_price_slider(df):
             ], className="text-center p-5 bg-dark rounded shadow-sm")
         ])
     
-    # Ensure we have distinct seat numbers only
-    df = df.drop_duplicates(subset=['seat_number'])
+    # Numeric deltas and formatted prices, shared with the seat map
+    if 'price_delta' not in df.columns:
+        df = build_seat_view_model(df)
     
-    # Convert seat_number to numeric for proper sorting
-    df['seat_number'] = pd.to_numeric(df['seat_number'], errors='coerce')
-    
-    # Sort by seat number in ascending order (numerically)
-    df = df.sort_values('seat_number', ascending=True)
-    
-    # Calculate delta (actual_fare - final_price) before formatting
-    df['actual_numeric'] = pd.to_numeric(df['actual_fare'], errors='coerce')
-    df['final_numeric'] = pd.to_numeric(df['final_price'], errors='coerce')
-    df['price_delta'] = df['actual_numeric'] - df['final_numeric']
-    
-    # Format prices with dollar sign and 2 decimal places
-    df['actual_fare'] = df['actual_fare'].apply(lambda x: f"${x:.2f}")
-    df['final_price'] = df['final_price'].apply(lambda x: f"${x:.2f}")
-    
-    # Format delta with dollar sign, 2 decimal places, and color coding
-    df['delta_formatted'] = df['price_delta'].apply(lambda x: f"${abs(x):.2f}")
-    
-    # Create color condition for delta values
-    df['delta_color'] = df['price_delta'].apply(lambda x: 'green' if x > 0 else 'red' if x < 0 else 'white')
+    seat_numbers = df['seat_number'].astype('Int64').astype(object)
+    records = pd.DataFrame({
+        'seat_number': seat_numbers.where(seat_numbers.notna(), None),
+        'actual_fare_formatted': df['actual_fare_formatted'],
+        'final_price_formatted': df['final_price_formatted'],
+        'delta_formatted': df['delta_formatted'],
+        # Used by the delta colour rules below
+        'price_delta': df['price_delta'].astype(object).where(df['price_delta'].notna(), None)
+    }, dtype=object)
     
     # Create a modern table with seat number, actual price, model price and delta
     table = dash_table.DataTable(
         id='seat-price-table',
         columns=[
             {"name": ["Seat Details", "Seat Number"], "id": "seat_number"},
-            {"name": ["Price Information", "Actual Price"], "id": "actual_fare"},
-            {"name": ["Price Information", "Model Price"], "id": "final_price"},
+            {"name": ["Price Information", "Actual Price"], "id": "actual_fare_formatted"},
+            {"name": ["Price Information", "Model Price"], "id": "final_price_formatted"},
             {"name": ["Price Information", "Delta"], "id": "delta_formatted"}
         ],
-        data=df[['seat_number', 'actual_fare', 'final_price', 'delta_formatted', 'delta_color']].to_dict('records'),
+        data=records.to_dict('records'),
         page_action='none',  # Show all rows without pagination
         style_table={
             'overflowX': 'auto', 
@@ -89,11 +81,11 @@ def create_seat_price_slider(df):
                 'backgroundColor': '#2c2f43'
             },
             {
-                'if': {'column_id': 'actual_fare'},
+                'if': {'column_id': 'actual_fare_formatted'},
                 'color': '#00f2c3'
             },
             {
-                'if': {'column_id': 'final_price'},
+                'if': {'column_id': 'final_price_formatted'},
                 'color': '#fd5d93'
             },
             {
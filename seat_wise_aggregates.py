@@ -0,0 +1,120 @@
+"""
+Per-snapshot seat-wise price aggregates for the price sum chart.
+
+The price sum chart needs, for the latest snapshot of each hour before departure
+and seat type, the number of seats and the sums of actual_fare and final_price.
+Computing that from seat_wise_prices_partitioned means casting every seat row
+of the schedule on each dashboard update. Instead the loader aggregates each
+seat_wise file as it lands into one row per (schedule_id, TimeAndDateStamp,
+seat_type), and the chart reads those rows.
+
+Existing data is aggregated once with:
+    python seat_wise_aggregates.py
+"""
+import pandas as pd
+from psycopg2.extras import execute_values
+
+AGGREGATE_TABLE = "seat_wise_price_aggregates"
+
+# Same numeric guard as the dashboard queries, TEXT prices that aren't numbers count as NULL
+NUMERIC_PATTERN = r"^-?[0-9]+(\.[0-9]+)?$"
+
+
+def ensure_aggregate_table(conn):
+    """Create the aggregate table if it doesn't exist"""
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {AGGREGATE_TABLE} (
+                "schedule_id" TEXT NOT NULL,
+                "TimeAndDateStamp" TEXT NOT NULL,
+                "seat_type" TEXT NOT NULL,
+                "seat_count" INTEGER NOT NULL,
+                "total_actual_price" NUMERIC,
+                "total_model_price" NUMERIC,
+                PRIMARY KEY ("schedule_id", "TimeAndDateStamp", "seat_type")
+            );
+        """)
+    conn.commit()
+
+
+def aggregate_seat_wise_frame(df):
+    """Aggregate a loaded seat_wise frame to one row per schedule, snapshot and seat type
+
+    Returns:
+        DataFrame: schedule_id, TimeAndDateStamp, seat_type, seat_count, total_actual_price, total_model_price
+    """
+    keys = ["schedule_id", "TimeAndDateStamp", "seat_type"]
+    if df is None or df.empty or any(col not in df.columns for col in keys + ["seat_number"]):
+        return pd.DataFrame()
+
+    frame = df[keys + ["seat_number"]].astype(str)
+    for col in ("actual_fare", "final_price"):
+        frame[col] = pd.to_numeric(df[col], errors="coerce") if col in df.columns else float("nan")
+
+    # One row per seat in a snapshot, as in the chart's DISTINCT ON (seat_number, ...)
+    frame = frame.drop_duplicates(subset=keys + ["seat_number"], keep="last")
+    aggregates = frame.groupby(keys, sort=False).agg(
+        seat_count=("seat_number", "size"),
+        total_actual_price=("actual_fare", "sum"),
+        total_model_price=("final_price", "sum")
+    )
+    return aggregates.reset_index()
+
+
+def upsert_aggregates(conn, aggregates):
+    """Insert or replace aggregate rows"""
+    if aggregates is None or aggregates.empty:
+        return 0
+
+    rows = [
+        (row.schedule_id, row.TimeAndDateStamp, row.seat_type, int(row.seat_count),
+         float(row.total_actual_price), float(row.total_model_price))
+        for row in aggregates.itertuples(index=False)
+    ]
+    with conn.cursor() as cur:
+        execute_values(cur, f"""
+            INSERT INTO {AGGREGATE_TABLE}
+                ("schedule_id", "TimeAndDateStamp", "seat_type", "seat_count", "total_actual_price", "total_model_price")
+            VALUES %s
+            ON CONFLICT ("schedule_id", "TimeAndDateStamp", "seat_type") DO UPDATE SET
+                "seat_count" = EXCLUDED."seat_count",
+                "total_actual_price" = EXCLUDED."total_actual_price",
+                "total_model_price" = EXCLUDED."total_model_price";
+        """, rows)
+    conn.commit()
+    return len(rows)
+
+
+def backfill_aggregates(conn):
+    """Aggregate everything already in seat_wise_prices_partitioned"""
+    ensure_aggregate_table(conn)
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            INSERT INTO {AGGREGATE_TABLE}
+                ("schedule_id", "TimeAndDateStamp", "seat_type", "seat_count", "total_actual_price", "total_model_price")
+            SELECT "schedule_id", "TimeAndDateStamp", "seat_type",
+                   COUNT(DISTINCT "seat_number"),
+                   SUM(CASE WHEN "actual_fare" ~ %(pattern)s THEN "actual_fare"::NUMERIC END),
+                   SUM(CASE WHEN "final_price" ~ %(pattern)s THEN "final_price"::NUMERIC END)
+            FROM seat_wise_prices_partitioned
+            WHERE "schedule_id" IS NOT NULL AND "TimeAndDateStamp" IS NOT NULL AND "seat_type" IS NOT NULL
+            GROUP BY "schedule_id", "TimeAndDateStamp", "seat_type"
+            ON CONFLICT ("schedule_id", "TimeAndDateStamp", "seat_type") DO UPDATE SET
+                "seat_count" = EXCLUDED."seat_count",
+                "total_actual_price" = EXCLUDED."total_actual_price",
+                "total_model_price" = EXCLUDED."total_model_price";
+        """, {'pattern': NUMERIC_PATTERN})
+        row_count = cur.rowcount
+    conn.commit()
+    return row_count
+
+
+if __name__ == "__main__":
+    from load_to_postgres import get_connection
+
+    conn = get_connection()
+    try:
+        print(f"🔄 Backfilling {AGGREGATE_TABLE}...")
+        print(f"✅ {backfill_aggregates(conn)} aggregate rows written")
+    finally:
+        conn.close()
@@ -1,10 +1,13 @@
 import dash
 from dash import dcc, html, callback, Input, Output, State, no_update
 import dash_bootstrap_components as dbc
-from db_utils import get_schedule_ids, get_operators, get_seat_types, get_hours_before_departure, get_date_of_journey, get_operator_id_by_schedule_id, get_operator_name_by_id, get_seat_types_by_schedule_id, get_origin_destination_by_schedule_id, get_all_dates_of_journey
+from db_utils import get_schedule_ids, get_operators, get_seat_types, get_hours_before_departure, get_date_of_journey, get_operator_name_by_id, get_origin_destination_by_schedule_id, get_all_dates_of_journey
 import datetime
 import calendar
 from date_utils import is_past_date
+from schedule_bundle import get_schedule_bundle
+from metadata_cache import get_metadata
+from schedule_search import find_schedule_id
 
 def create_schedule_id_slicer():
     """Create a dropdown slicer for schedule IDs with search button"""
@@ -108,7 +111,7 @@ def create_operator_slicer():
 def create_seat_type_slicer():
     """Create a dropdown slicer for seat types"""
     # Initially get all seat types, will be filtered via callback when schedule_id is selected
-    seat_types = get_seat_types()
+    seat_types = get_metadata('seat_types')
     
     return html.Div([
         html.Label('Seat Type', className='fw-bold mb-2'),
@@ -364,7 +367,7 @@ def create_slicers_panel():
                             html.I(className="fas fa-calendar-alt me-2 text-warning"),
                             dcc.Dropdown(
                                 id='date-of-journey-dropdown',
-                                options=[{'label': date, 'value': date} for date in get_all_dates_of_journey()],
+                                options=[{'label': date, 'value': date} for date in get_metadata('dates_of_journey')],
                                 placeholder='Select Date',
                                 clearable=True,
                                 className='dark-dropdown',
@@ -474,7 +477,8 @@ def update_operator_by_schedule_id(schedule_id):
         return None, None, ''
     
     # Get the operator_id for the selected schedule_id
-    operator_id = get_operator_id_by_schedule_id(schedule_id)
+    bundle = get_schedule_bundle(schedule_id)
+    operator_id = bundle['operator_id'] if bundle else None
     
     if operator_id is None:
         # If no operator_id found, return empty values
@@ -498,22 +502,19 @@ def update_operator_by_schedule_id(schedule_id):
     Output('schedule-id-dropdown', 'value'),
     [Input('schedule-id-search-button', 'n_clicks')],
     [State('schedule-id-search', 'value'),
-     State('schedule-id-dropdown', 'options')]
+     State('date-of-journey-dropdown', 'value')]
 )
-def search_schedule_id(n_clicks, search_value, available_options):
-    """Search for a schedule ID and select it if found"""
+def search_schedule_id(n_clicks, search_value, date_of_journey):
+    """Search for a schedule ID (within the selected date) and select it if found"""
     if not n_clicks or not search_value:
         # No clicks or no search value, return no change
         return dash.no_update
     
-    # Convert search value to string for comparison
-    search_value = str(search_value).strip()
-    
-    # Check if the search value matches any available schedule ID
-    for option in available_options:
-        if str(option['value']) == search_value:
-            # Found a match, return this value to select it in the dropdown
-            return option['value']
+    # Exact lookup in the schedule ID index
+    schedule_id = find_schedule_id(search_value, date_of_journey or None)
+    if schedule_id is not None:
+        # Found a match, return this value to select it in the dropdown
+        return schedule_id
     
     # No match found
     return dash.no_update
@@ -531,7 +532,8 @@ def update_seat_types_by_schedule_id(schedule_id):
         seat_types = get_seat_types()
     else:
         # Get seat types specific to the selected schedule_id
-        seat_types = get_seat_types_by_schedule_id(schedule_id)
+        bundle = get_schedule_bundle(schedule_id)
+        seat_types = bundle['seat_types'] if bundle else []
         
         # If no seat types found for this schedule, fall back to all seat types
         if not seat_types:
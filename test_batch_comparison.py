@@ -0,0 +1,67 @@
+"""
+Tests for the chunked aggregation of the batch price comparison (batch_comparison.py)
+"""
+import numpy as np
+import pandas as pd
+
+from batch_comparison import SUMMARY_COLUMNS, summarize_batch_comparison
+
+
+def comparison_rows(row_count=1000, seed=7):
+    """Random rows shaped like BATCH_COMPARISON_QUERY's output"""
+    rng = np.random.default_rng(seed)
+    model_price = rng.uniform(5000, 20000, row_count).round(2)
+    actual_price = rng.uniform(5000, 20000, row_count).round(2)
+    return pd.DataFrame({
+        'date_of_journey': rng.choice(['2025-03-01', '2025-03-02'], row_count),
+        'departure_time': rng.choice(['08:00:00', '12:30:00'], row_count),
+        'seat_type': rng.choice(['Salon Cama', 'Semi Cama', 'Premium'], row_count),
+        'operator_id': rng.choice([191, 296, 300], row_count),
+        'model_price': model_price,
+        'actual_price': actual_price,
+        'delta': actual_price - model_price
+    })
+
+
+def sorted_summary(summary):
+    return summary.sort_values(['operator_id', 'seat_type'], ignore_index=True)
+
+
+def test_chunked_summary_equals_summary_of_all_rows():
+    rows = comparison_rows()
+    chunks = [rows.iloc[start:start + 97] for start in range(0, len(rows), 97)]
+
+    chunked, chunked_deltas = summarize_batch_comparison(chunks)
+    whole, whole_deltas = summarize_batch_comparison([rows])
+
+    assert list(chunked.columns) == SUMMARY_COLUMNS
+    pd.testing.assert_frame_equal(sorted_summary(chunked), sorted_summary(whole))
+    assert chunked_deltas.keys() == whole_deltas.keys()
+    for operator_id in whole_deltas:
+        np.testing.assert_array_equal(np.sort(chunked_deltas[operator_id]), np.sort(whole_deltas[operator_id]))
+
+
+def test_summary_matches_a_direct_groupby():
+    rows = comparison_rows(row_count=300, seed=11)
+    summary, deltas = summarize_batch_comparison([rows.iloc[:100], rows.iloc[100:]])
+
+    grouped = rows.assign(operator_id=rows['operator_id'].astype(str)).groupby(['operator_id', 'seat_type'])
+    expected = pd.DataFrame({
+        'comparisons': grouped['delta'].size(),
+        'avg_model_price': grouped['model_price'].mean(),
+        'avg_actual_price': grouped['actual_price'].mean(),
+        'avg_delta': grouped['delta'].mean(),
+        'min_delta': grouped['delta'].min(),
+        'max_delta': grouped['delta'].max(),
+        'model_cheaper_pct': grouped['delta'].apply(lambda delta: (delta > 0).mean() * 100)
+    }).reset_index()[SUMMARY_COLUMNS]
+
+    pd.testing.assert_frame_equal(sorted_summary(summary), sorted_summary(expected), check_dtype=False)
+    assert sum(len(values) for values in deltas.values()) == len(rows)
+    assert all(values.dtype == np.float32 for values in deltas.values())
+
+
+def test_empty_chunks():
+    summary, deltas = summarize_batch_comparison([comparison_rows().iloc[:0]])
+    assert summary.empty and list(summary.columns) == SUMMARY_COLUMNS
+    assert deltas == {}
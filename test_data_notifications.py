@@ -0,0 +1,81 @@
+"""
+Tests for the loader's data notifications (data_notifications.py) and the versions they set (data_version.py)
+"""
+import json
+
+import pandas as pd
+import pytest
+
+import data_version
+from data_notifications import (
+    NOTIFY_PAYLOAD_LIMIT,
+    handle_notification,
+    load_scope,
+    notification_payloads,
+    scope_versions
+)
+
+
+@pytest.fixture
+def listening():
+    data_version.set_notifications_active(True)
+    yield
+    data_version.set_notifications_active(False)
+
+
+def test_payloads_fit_and_name_every_schedule_once():
+    schedule_ids = [str(100000 + i) for i in range(5000)]
+    payloads = notification_payloads(["seat_prices_raw"], 7, ["2025-03-01"], schedule_ids)
+
+    assert len(payloads) > 1
+    assert all(len(payload.encode()) < 8000 for payload in payloads)
+    assert all(len(payload) <= NOTIFY_PAYLOAD_LIMIT for payload in payloads)
+    named = [schedule_id for payload in payloads for schedule_id in json.loads(payload)["schedule_ids"]]
+    assert sorted(named) == schedule_ids
+    assert all(json.loads(payload)["version"] == 7 for payload in payloads)
+
+
+def test_ids_and_dates_are_normalized():
+    dates, schedule_ids = load_scope(
+        ["2025-03-01 00:00:00", pd.Timestamp("2025-03-01"), "2025-03-02"],
+        ["1646.0", 1646.0, "1646", 1700, "abc", None]
+    )
+    assert dates == ["2025-03-01", "2025-03-02"]
+    assert schedule_ids == ["1646", "1700", "abc"]
+
+
+def test_too_many_dates_invalidate_everything():
+    dates = [d.strftime('%Y-%m-%d') for d in pd.date_range("2000-01-01", periods=1000)]
+    assert load_scope(dates, ["1646"]) == ([], [])
+    payload = json.loads(notification_payloads(["seat_prices_raw"], 3, dates, ["1646"])[0])
+    assert payload["dates"] == [] and payload["schedule_ids"] == []
+    assert scope_versions([], []) == [data_version.UNSCOPED_VERSION_KEY]
+
+
+def test_notification_sets_the_versions_the_loader_records(listening):
+    dates, schedule_ids = load_scope(["2025-03-01"], ["1646.0"])
+    for payload in notification_payloads(["seat_prices_raw"], 5, dates, schedule_ids):
+        handle_notification(payload)
+    notified = (data_version.get_data_version(), data_version.get_scope_version(["2025-03-01", "2025-03", "1646"]))
+
+    # A process connecting later reads the same versions from the table
+    data_version.set_notifications_active(True, {scope: 5 for scope in scope_versions(dates, schedule_ids)})
+    read = (data_version.get_data_version(), data_version.get_scope_version(["2025-03-01", "2025-03", "1646"]))
+
+    assert notified == read == (("notify", 0), (5, 5, 5))
+
+
+def test_versions_only_move_forward(listening):
+    handle_notification(json.dumps({"tables": [], "version": 9, "dates": [], "schedule_ids": ["1646"]}))
+    handle_notification(json.dumps({"tables": [], "version": 4, "dates": [], "schedule_ids": ["1646"]}))
+    assert data_version.get_scope_version(["1646"]) == (9,)
+
+    handle_notification(json.dumps({"tables": [], "version": 11, "dates": [], "schedule_ids": []}))
+    assert data_version.get_data_version() == ("notify", 11)
+
+
+def test_malformed_notification_raises():
+    with pytest.raises(ValueError):
+        handle_notification("not json")
+    with pytest.raises(ValueError):
+        handle_notification(json.dumps({"dates": ["2025-03-01"]}))
@@ -0,0 +1,40 @@
+"""
+Tests for the schedule ID search index (schedule_search.py)
+"""
+from schedule_search import build_index, search_index
+
+
+def test_prefix_matches_come_before_substring_matches():
+    index = build_index(["9123", "1234", "5123", "1200", "123"])
+    assert search_index(index, "12") == ["1200", "123", "1234", "5123", "9123"]
+
+
+def test_substring_matches_are_listed_once():
+    index = build_index(["1212", "3121", "4000"])
+    assert search_index(index, "12") == ["1212", "3121"]
+
+
+def test_ids_are_deduplicated_and_compared_as_strings():
+    index = build_index([1646, "1646", 16460])
+    assert search_index(index, "1646") == ["1646", "16460"]
+
+
+def test_empty_query_returns_the_first_ids():
+    index = build_index(["3", "1", "2"])
+    assert search_index(index, "  ") == ["1", "2", "3"]
+    assert search_index(index, None, limit=2) == ["1", "2"]
+
+
+def test_limit_applies_to_prefix_matches():
+    index = build_index([f"10{i:02d}" for i in range(50)] + ["2100"])
+    assert search_index(index, "10", limit=5) == ["1000", "1001", "1002", "1003", "1004"]
+
+
+def test_limit_applies_to_prefix_and_substring_matches_together():
+    index = build_index(["100", "101", "210", "310", "410"])
+    assert search_index(index, "10", limit=3) == ["100", "101", "210"]
+
+
+def test_no_match():
+    index = build_index(["100", "200"])
+    assert search_index(index, "9") == []